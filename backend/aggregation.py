@@ -0,0 +1,200 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List
+import numpy as np
+from models import DailyReport
+
+HOURS = 24
+
+
+def cents(amount: float) -> int:
+    """Money as whole cents. Every report path sums sales in cents and
+    divides once at the end, so they agree to the cent whatever order the
+    amounts are added in."""
+    return int(round(amount * 100))
+
+
+class DayAggregate:
+    """Per-dish x per-hour totals for one day, as produced by ReportAggregator."""
+
+    def __init__(self, aggregator: 'ReportAggregator', date: str,
+                 quantities: np.ndarray, counts: np.ndarray, sales: np.ndarray,
+                 dish_quantity: np.ndarray, dish_sales: np.ndarray, total_orders: int):
+        self.aggregator    = aggregator
+        self.date          = date
+        self.quantities    = quantities     # (dishes, 24) units sold per hour
+        self.counts        = counts         # (dishes, 24) orders per hour
+        self.sales         = sales          # (dishes, 24) revenue per hour, in cents
+        self.dish_quantity = dish_quantity  # (dishes,) units sold, incl. orders without an hour
+        self.dish_sales    = dish_sales     # (dishes,) revenue in cents, incl. orders without an hour
+        self.total_orders  = total_orders
+
+    def ingredient_usage(self) -> Dict[str, float]:
+        """Ingredient totals as dish quantities x the dish-by-ingredient recipe matrix."""
+        agg  = self.aggregator
+        used = self.dish_quantity @ agg.recipe
+        # Keep every ingredient of every dish that was ordered, even at 0.
+        present = agg.recipe_mask[self.dish_quantity > 0].any(axis=0)
+        return {agg.ingredient_names[j]: float(used[j]) for j in np.flatnonzero(present)}
+
+    def hourly_rows(self) -> List[tuple]:
+        """(dish_id, hour, quantity, order_count, sales) for every non-empty cell."""
+        ids = self.aggregator.dish_ids
+        rows, hours = np.nonzero(self.counts)
+        return [
+            (int(ids[r]), int(h), int(self.quantities[r, h]), int(self.counts[r, h]),
+             round(float(self.sales[r, h]) / 100, 2))
+            for r, h in zip(rows, hours)
+        ]
+
+    def to_report(self) -> DailyReport:
+        names  = self.aggregator.names
+        sold   = np.flatnonzero(self.dish_quantity)
+        hourly = np.flatnonzero(self.counts.sum(axis=1))
+        return DailyReport(
+            date=self.date,
+            total_sales=round(float(self.dish_sales.sum()) / 100, 2),
+            total_orders=int(self.total_orders),
+            dishes_sold={names[i]: int(self.dish_quantity[i]) for i in sold},
+            ingredients_used=self.ingredient_usage(),
+            peak_hours={names[i]: [int(q) for q in self.quantities[i]] for i in hourly},
+        )
+
+
+class ReportAggregator:
+    """Vectorized daily aggregation over order columns.
+
+    The dish-id index, price vector and dish x ingredient recipe matrix are
+    built once per menu, so aggregating a day is a handful of bincounts and a
+    matrix product instead of a menu scan and a recipe walk per order.
+    """
+
+    def __init__(self, dishes: List[Dict]):
+        dishes = sorted(dishes, key=lambda d: d['id'])
+        self.dish_ids = np.array([d['id'] for d in dishes], dtype=np.int64)
+        self.names    = [d['name'] for d in dishes]
+        self.prices   = np.array([d['price'] for d in dishes], dtype=np.float64)
+
+        self.ingredient_names = sorted({n for d in dishes for n in d['ingredients']})
+        col = {name: j for j, name in enumerate(self.ingredient_names)}
+        self.recipe = np.zeros((len(dishes), len(self.ingredient_names)), dtype=np.float64)
+        self.recipe_mask = np.zeros(self.recipe.shape, dtype=bool)
+        for i, d in enumerate(dishes):
+            for name, amount in d['ingredients'].items():
+                self.recipe[i, col[name]] = amount
+                self.recipe_mask[i, col[name]] = True
+
+    def index_of(self, dish_ids: np.ndarray) -> np.ndarray:
+        """Row index of each dish id in this menu, or -1 for unknown dishes."""
+        if not len(self.dish_ids):
+            return np.full(len(dish_ids), -1, dtype=np.int64)
+        pos = np.searchsorted(self.dish_ids, dish_ids)
+        pos = np.minimum(pos, len(self.dish_ids) - 1)
+        return np.where(self.dish_ids[pos] == dish_ids, pos, -1)
+
+    def aggregate(self, date: str, dish_ids, hours, quantities,
+                  order_counts=None, sales=None) -> DayAggregate:
+        """Aggregate parallel columns of one day's orders (or pre-grouped rows).
+
+        `hours` outside 0..23 (unparseable timestamps) still count towards
+        sales and quantities but are left out of the hourly histogram. When
+        `order_counts` / `sales` are omitted every row is one order priced at
+        the current menu price. Each row's sales are rounded to whole cents
+        before summing (see cents()).
+        """
+        dish_ids   = np.asarray(dish_ids, dtype=np.int64)
+        hours      = np.asarray(hours, dtype=np.int64)
+        quantities = np.asarray(quantities, dtype=np.int64)
+        counts     = (np.ones(len(dish_ids), dtype=np.int64) if order_counts is None
+                      else np.asarray(order_counts, dtype=np.int64))
+        total_orders = int(counts.sum())
+
+        idx   = self.index_of(dish_ids)
+        known = idx >= 0
+        idx, hours, quantities, counts = idx[known], hours[known], quantities[known], counts[known]
+        if sales is None:
+            sales = self.prices[idx] * quantities
+        else:
+            sales = np.asarray(sales, dtype=np.float64)[known]
+        sales = np.round(sales * 100)
+
+        # Rows with no usable hour go to a 25th overflow bucket: dropped from
+        # the histogram but kept in the per-dish totals.
+        bucket = np.where((hours >= 0) & (hours < HOURS), hours, HOURS)
+        cells  = idx * (HOURS + 1) + bucket
+        size   = len(self.dish_ids) * (HOURS + 1)
+
+        def grid(weights):
+            return np.bincount(cells, weights=weights, minlength=size).reshape(-1, HOURS + 1)
+
+        q_grid = grid(quantities).round().astype(np.int64)
+        n_grid = grid(counts).round().astype(np.int64)
+        s_grid = grid(sales)
+
+        return DayAggregate(
+            self, date,
+            quantities=q_grid[:, :HOURS],
+            counts=n_grid[:, :HOURS],
+            sales=s_grid[:, :HOURS],
+            dish_quantity=q_grid.sum(axis=1),
+            dish_sales=s_grid.sum(axis=1),
+            total_orders=total_orders,
+        )
+
+
+def order_hours(order_times) -> np.ndarray:
+    """Hour of day for each order_time (datetime or ISO string); -1 if unparseable."""
+    try:
+        stamps = np.array(
+            [t.isoformat() if hasattr(t, 'isoformat') else t for t in order_times],
+            dtype='datetime64[h]',
+        )
+        return (stamps.astype(np.int64) % HOURS).astype(np.int64)
+    except (ValueError, TypeError):
+        hours = np.empty(len(order_times), dtype=np.int64)
+        for k, t in enumerate(order_times):
+            try:
+                hours[k] = (t if hasattr(t, 'hour') else datetime.fromisoformat(t)).hour
+            except (ValueError, TypeError):
+                hours[k] = -1
+        return hours
+
+
+def aggregate_orders_reference(date: str, orders: List[Dict], dishes: List[Dict]) -> DailyReport:
+    """Original per-order loop, kept as the reference the vectorized engine is
+    checked against. O(orders x dishes); do not use on hot paths. Orders are
+    priced at their unit_price, or the dish's current price without one."""
+    total_cents = 0
+    dishes_sold = defaultdict(int)
+    ingredients_used = defaultdict(float)
+    # Per-dish hourly distribution: { dish_name: [0]*24 }
+    dish_hours = defaultdict(lambda: [0] * 24)
+
+    for order in orders:
+        dish_id  = order['dish_id']
+        quantity = order['quantity']
+        dish = next((d for d in dishes if d['id'] == dish_id), None)
+        if not dish:
+            continue
+
+        price = order.get('unit_price')
+        total_cents += cents((dish['price'] if price is None else price) * quantity)
+        dishes_sold[dish['name']] += quantity
+
+        for ing_name, ing_qty in dish['ingredients'].items():
+            ingredients_used[ing_name] += ing_qty * quantity
+
+        try:
+            hour = datetime.fromisoformat(order['order_time']).hour
+            dish_hours[dish['name']][hour] += quantity
+        except (ValueError, TypeError):
+            pass
+
+    return DailyReport(
+        date=date,
+        total_sales=round(total_cents / 100, 2),
+        total_orders=len(orders),
+        dishes_sold=dict(dishes_sold),
+        ingredients_used=dict(ingredients_used),
+        peak_hours=dict(dish_hours),
+    )
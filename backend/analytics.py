@@ -1,57 +1,99 @@
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional
 from collections import defaultdict
+import numpy as np
 from models import DailyReport
 from database import Database
+from reconciler import RollupReconciler
+from history import SalesHistory
+from forecast import InventoryForecaster
+from availability import MenuAvailability
+from config import ANALYTICS_CONFIG, HISTORY_CONFIG, FORECAST_CONFIG, AVAILABILITY_CONFIG
+from aggregation import ReportAggregator, aggregate_orders_reference, cents
 
 
 class Analytics:
     def __init__(self, db: Database):
         self.db = db
+        self.reconciler = RollupReconciler(db)
+        self.history = SalesHistory(db, sync_interval=HISTORY_CONFIG['sync_interval'],
+                                    max_periods=HISTORY_CONFIG['max_periods'])
+        self.forecaster = InventoryForecaster(db, **FORECAST_CONFIG)
+        self.availability = MenuAvailability(db, **AVAILABILITY_CONFIG)
 
     def generate_daily_report(self, date: str) -> DailyReport:
-        orders = self.db.get_orders_by_date(date)
-        dishes = self.db.get_dishes()
+        """Build the day's report from the incremental rollups maintained by
+        Database.add_order, reading O(dishes x 24) rows instead of every order."""
+        rollup = self.db.get_rollup(date)
+        dishes = {d['id']: d for d in self.db.get_dishes()}
 
-        print(f"Generating report for {date} ({len(orders)} orders)")
-
-        total_sales = 0.0
-        dishes_sold = defaultdict(int)
-        ingredients_used = defaultdict(float)
+        total_cents  = 0
+        total_orders = 0
+        dishes_sold  = defaultdict(int)
         # Per-dish hourly distribution: { dish_name: [0]*24 }
-        dish_hours = defaultdict(lambda: [0] * 24)
+        dish_hours   = defaultdict(lambda: [0] * 24)
 
-        for order in orders:
-            dish_id  = order['dish_id']
-            quantity = order['quantity']
-            dish = next((d for d in dishes if d['id'] == dish_id), None)
+        for row in rollup['hourly']:
+            total_orders += row['order_count']
+            dish = dishes.get(row['dish_id'])
             if not dish:
                 continue
 
-            total_sales += dish['price'] * quantity
-            dishes_sold[dish['name']] += quantity
-
-            for ing_name, ing_qty in dish['ingredients'].items():
-                ingredients_used[ing_name] += ing_qty * quantity
+            total_cents += cents(row['sales'])
+            dishes_sold[dish['name']] += row['quantity']
+            dish_hours[dish['name']][row['hour']] += row['quantity']
 
-            try:
-                hour = datetime.fromisoformat(order['order_time']).hour
-                dish_hours[dish['name']][hour] += quantity
-            except (ValueError, TypeError):
-                pass
+        print(f"Generating report for {date} ({total_orders} orders)")
 
         report = DailyReport(
             date=date,
-            total_sales=round(total_sales, 2),
-            total_orders=len(orders),
+            total_sales=round(total_cents / 100, 2),
+            total_orders=total_orders,
             dishes_sold=dict(dishes_sold),
-            ingredients_used=dict(ingredients_used),
+            ingredients_used=rollup['ingredients'],
             peak_hours=dict(dish_hours),
         )
 
-        self.db.save_daily_report(report)
+        # Only closed days are stored: their orders can no longer change, so
+        # the saved report is final. The open day is always recomputed.
+        if self._is_closed(date):
+            self.db.save_daily_report(report, final=True)
         return report
 
+    def _aggregator(self) -> ReportAggregator:
+        """The compiled menu's aggregator, reused until the menu changes."""
+        recipes = self.db.get_recipe_index()
+        return recipes.aggregator if recipes else ReportAggregator(self.db.get_dishes())
+
+    def _is_closed(self, date: str) -> bool:
+        """True for days before today (no new orders can land on them)."""
+        try:
+            return datetime.strptime(date, '%Y-%m-%d').date() < datetime.now().date()
+        except (TypeError, ValueError):
+            return False
+
+    def generate_report_from_orders(self, date: str, reference: bool = False) -> DailyReport:
+        """Aggregate a day straight from the orders table without touching the rollups.
+
+        MySQL groups the day's orders by dish and hour, and ReportAggregator
+        combines those O(dishes x 24) rows with the in-memory recipes (see
+        Database.aggregate_day). Sales use each order's stored unit_price, as
+        the rollups do.
+        `reference=True` runs the original per-order loop over every order
+        row instead, for checking the two agree.
+        """
+        if reference:
+            return aggregate_orders_reference(date, self.db.get_orders_by_date(date), self.db.get_dishes())
+
+        aggregate = self.db.aggregate_day(date)
+        if aggregate is None:
+            return self._aggregator().aggregate(date, [], [], []).to_report()
+        return aggregate.to_report()
+
+    def reconcile_report(self, date: str) -> bool:
+        """Queue a background rebuild of the day's rollups from raw orders."""
+        return self.reconciler.schedule(date)
+
     def _report_to_dict(self, report: DailyReport) -> Dict:
         return {
             'date': report.date,
@@ -63,38 +105,145 @@ class Analytics:
         }
 
     def get_or_generate_report(self, date: str) -> Dict:
-        """Always regenerate from live orders so peak_hours is always per-dish dict format.
-        The cached version may be in the old flat-array format, so we skip it."""
+        """Serve the stored report for a closed day; regenerate the open day.
+
+        Stored rows in an older format or saved before the day closed are
+        skipped and regenerated (and then stored as final)."""
+        if self._is_closed(date):
+            stored = self.db.get_daily_report(date, final_only=True)
+            if stored:
+                return stored
         return self._report_to_dict(self.generate_daily_report(date))
 
+    def get_range_report(self, start: str, end: str) -> Dict:
+        """Per-day series and span totals for every day in [start, end].
+
+        Reads the rollups once for the whole span (three grouped queries)
+        instead of generating each day's report separately, so a 365-day range
+        costs about the same round trips as a single day.
+
+        Raises ValueError for bad dates or a span longer than
+        ANALYTICS_CONFIG['max_range_days'].
+        """
+        first = datetime.strptime(start, '%Y-%m-%d').date()
+        last  = datetime.strptime(end, '%Y-%m-%d').date()
+        if last < first:
+            raise ValueError("'end' must not be before 'start'")
+        span = (last - first).days + 1
+        if span > ANALYTICS_CONFIG['max_range_days']:
+            raise ValueError(f"the range spans {span} days; at most "
+                             f"{ANALYTICS_CONFIG['max_range_days']} are allowed")
+
+        days      = [(first + timedelta(days=n)).isoformat() for n in range(span)]
+        day_index = {d: i for i, d in enumerate(days)}
+        rollup    = self.db.get_range_rollup(days[0], days[-1])
+        index     = self._aggregator()
+        names     = index.names
+
+        daily    = rollup['daily']
+        day_idx  = np.array([day_index[r['date']] for r in daily], dtype=np.int64)
+        dish_idx = index.index_of(np.array([r['dish_id'] for r in daily], dtype=np.int64))
+        quantity = np.array([r['quantity'] for r in daily], dtype=np.int64)
+        # Whole cents, as DayAggregate sums them (see aggregation.cents), so
+        # the span total doesn't drift from the sum of its daily reports.
+        sales    = np.round(np.array([r['sales'] for r in daily], dtype=np.float64) * 100)
+        orders   = np.array([r['order_count'] for r in daily], dtype=np.int64)
+        known    = dish_idx >= 0
+
+        n_days, n_dishes = len(days), len(names)
+        day_sales  = np.bincount(day_idx[known], weights=sales[known],
+                                 minlength=n_days).round().astype(np.int64)
+        day_orders = np.bincount(day_idx, weights=orders, minlength=n_days).astype(np.int64)
+        day_dishes = np.bincount(
+            day_idx[known] * n_dishes + dish_idx[known],
+            weights=quantity[known], minlength=n_days * n_dishes,
+        ).reshape(n_days, n_dishes).astype(np.int64)
+
+        hourly    = rollup['hourly']
+        hour_dish = index.index_of(np.array([r['dish_id'] for r in hourly], dtype=np.int64))
+        hour_ok   = hour_dish >= 0
+        dish_hours = np.bincount(
+            hour_dish[hour_ok] * 24 + np.array([r['hour'] for r in hourly], dtype=np.int64)[hour_ok],
+            weights=np.array([r['quantity'] for r in hourly], dtype=np.float64)[hour_ok],
+            minlength=n_dishes * 24,
+        ).reshape(n_dishes, 24).astype(np.int64)
+
+        ingredients_used = defaultdict(float)
+        for row in rollup['ingredients']:
+            ingredients_used[row['ingredient']] += row['quantity_used']
+
+        dish_totals = day_dishes.sum(axis=0)
+        sold        = np.flatnonzero(dish_totals)
+        return {
+            'start': days[0],
+            'end': days[-1],
+            'series': [
+                {
+                    'date': day,
+                    'total_sales': round(int(day_sales[i]) / 100, 2),
+                    'total_orders': int(day_orders[i]),
+                    'dishes_sold': {names[k]: int(day_dishes[i, k]) for k in np.flatnonzero(day_dishes[i])},
+                }
+                for i, day in enumerate(days)
+            ],
+            'totals': {
+                'total_sales': round(int(day_sales.sum()) / 100, 2),
+                'total_orders': int(day_orders.sum()),
+                'dishes_sold': {names[k]: int(dish_totals[k]) for k in sold},
+                'ingredients_used': dict(ingredients_used),
+                'peak_hours': {
+                    names[k]: [int(q) for q in dish_hours[k]]
+                    for k in np.flatnonzero(dish_hours.sum(axis=1))
+                },
+            },
+        }
+
     def _ingredient_pct(self, stock_quantity: float) -> float:
         return round(min((stock_quantity / 100.0) * 100, 100), 1)
 
-    def get_today_analytics(self) -> Dict:
-        today     = datetime.now().date().isoformat()
-        yesterday = (datetime.now().date() - timedelta(days=1)).isoformat()
+    TODAY_FIELDS = ('today', 'yesterday', 'comparison', 'ingredients', 'dishes', 'orders')
 
-        today_report_dict     = self.get_or_generate_report(today)
-        yesterday_report_dict = self.db.get_daily_report(yesterday)
+    def get_today_analytics(self, fields=None, orders_limit: int = 50) -> Dict:
+        """Dashboard summary, limited to the requested `fields` (all of
+        TODAY_FIELDS by default). Sections that weren't asked for are never
+        computed.
 
-        ingredients = self.db.get_ingredients()
-        for ing in ingredients:
-            ing['percentage'] = self._ingredient_pct(ing['stock_quantity'])
-            ing['status']     = 'Low' if ing['percentage'] <= 25 else 'Good'
+        'orders' is the first page of today's orders (see
+        Database.get_orders_page); orders reference dishes by id, and the
+        menu itself is only sent under 'dishes'.
+        """
+        fields = set(fields or self.TODAY_FIELDS)
+        unknown = fields - set(self.TODAY_FIELDS)
+        if unknown:
+            raise ValueError(f"unknown field(s): {', '.join(sorted(unknown))}")
 
-        orders = self.db.get_orders_by_date(today)
+        today     = datetime.now().date().isoformat()
+        yesterday = (datetime.now().date() - timedelta(days=1)).isoformat()
+        result    = {}
 
-        return {
-            'today': today_report_dict,
-            'yesterday': yesterday_report_dict,
-            'comparison': (
+        if fields & {'today', 'comparison'}:
+            today_report_dict = self.get_or_generate_report(today)
+        if fields & {'yesterday', 'comparison'}:
+            yesterday_report_dict = self.get_or_generate_report(yesterday)
+
+        if 'today' in fields:
+            result['today'] = today_report_dict
+        if 'yesterday' in fields:
+            result['yesterday'] = yesterday_report_dict
+        if 'comparison' in fields:
+            result['comparison'] = (
                 self._compare_reports(today_report_dict, yesterday_report_dict)
                 if yesterday_report_dict else None
-            ),
-            'ingredients': ingredients,
-            'dishes': self.db.get_dishes(),
-            'orders': orders,
-        }
+            )
+        if 'ingredients' in fields:
+            result['ingredients'] = self.get_ingredients_status()
+        if 'dishes' in fields:
+            result['dishes'] = self.db.get_dishes()
+        if 'orders' in fields:
+            page = self.db.get_orders_page(today, limit=orders_limit) or {}
+            result['orders'] = page.get('orders', [])
+            result['orders_next_after'] = page.get('next_after')
+        return result
 
     def _compare_reports(self, today: Dict, yesterday: Dict) -> Dict:
         sales_change   = today['total_sales']   - yesterday['total_sales']
@@ -124,6 +273,34 @@ class Analytics:
             ing['status']     = 'Low' if ing['percentage'] <= 25 else 'Good'
         return ingredients
 
+    def get_ingredient_dishes(self, ingredient_id: int) -> Optional[Dict]:
+        """Dishes that use an ingredient, with how many portions its current
+        stock still covers; 'blocked' dishes can't be made even once. None
+        for an unknown ingredient."""
+        recipes = self.db.get_recipe_index()
+        ingredient = next((i for i in self.db.get_ingredients() if i['id'] == ingredient_id), None)
+        if recipes is None or ingredient is None:
+            return None
+
+        stock   = ingredient['stock_quantity']
+        blocked = set(recipes.blocked_by(ingredient_id, stock))
+        dishes  = [
+            {
+                'dish_id': dish_id,
+                'name': recipes.dishes[dish_id]['name'],
+                'amount': amount,
+                'portions_left': int(stock // amount) if amount > 0 else None,
+                'blocked': dish_id in blocked,
+            }
+            for dish_id, amount in recipes.dishes_using(ingredient_id)
+        ]
+        dishes.sort(key=lambda d: (d['portions_left'] is None, d['portions_left'] or 0, d['name']))
+        return {
+            'ingredient': {**ingredient, 'percentage': self._ingredient_pct(stock)},
+            'dishes': dishes,
+            'blocked': len(blocked),
+        }
+
     def download_report(self, date: str) -> Dict:
         report_dict = self.get_or_generate_report(date)
 
@@ -137,4 +314,16 @@ class Analytics:
             'ingredients': ingredients,
             'dishes': self.db.get_dishes(),
             'generated_at': datetime.now().isoformat(),
+        }
+
+    def download_range_report(self, start: str, end: str) -> Dict:
+        range_report = self.get_range_report(start, end)
+
+        return {
+            'report': range_report['totals'],
+            'series': range_report['series'],
+            'start': range_report['start'],
+            'end': range_report['end'],
+            'ingredients': self.get_ingredients_status(),
+            'generated_at': datetime.now().isoformat(),
         }
\ No newline at end of file
@@ -1,28 +1,183 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from database import Database
+from database import Database, OutOfStock
 from analytics import Analytics
-from datetime import datetime
-import io
-import csv
+from reconciler import ReconcilerBusy
+from report_csv import iter_report_csv
+from config import ORDER_CONFIG, WRITE_QUEUE_CONFIG, LIVE_CONFIG, SERVER_CONFIG
+from events import LiveBroadcaster, format_sse
+from metrics import REGISTRY, RequestMetrics
+from write_queue import OrderWriteQueue, QueueFull
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+import hashlib
 import traceback
 
 app = Flask(__name__)
-CORS(app)
-
-db        = Database()
-analytics = Analytics(db)
+# If-None-Match makes dashboard polls preflighted; ETag must be readable by script.js.
+CORS(app, expose_headers=['ETag', 'Last-Modified'], max_age=600)
+
+db          = Database(init_schema=SERVER_CONFIG['init_schema'])
+analytics   = Analytics(db)
+write_queue = OrderWriteQueue(
+    db,
+    mode=WRITE_QUEUE_CONFIG['mode'],
+    flush_interval_ms=WRITE_QUEUE_CONFIG['flush_interval_ms'],
+    max_batch=WRITE_QUEUE_CONFIG['max_batch'],
+    max_depth=WRITE_QUEUE_CONFIG['max_depth'],
+    wal_path=WRITE_QUEUE_CONFIG['wal_path'],
+    wal_fsync=WRITE_QUEUE_CONFIG['wal_fsync'],
+    wal_compact_bytes=WRITE_QUEUE_CONFIG['wal_compact_bytes'],
+    wal_per_process=SERVER_CONFIG['multiprocess'],
+)
+live        = LiveBroadcaster(db.events, analytics, interval=LIVE_CONFIG['broadcast_interval'])
+request_metrics = RequestMetrics()
+
+REGISTRY.callback('db_pool_in_use', 'Pooled connections checked out', lambda: db.pool_stats()['in_use'])
+REGISTRY.callback('db_pool_idle', 'Pooled connections idle', lambda: db.pool_stats()['idle'])
+REGISTRY.callback('db_pool_waits_total', 'Checkouts that had to wait for a connection',
+                  lambda: db.pool_stats()['waits'], kind='counter')
+REGISTRY.callback('db_pool_timeouts_total', 'Checkouts that gave up waiting',
+                  lambda: db.pool_stats()['timeouts'], kind='counter')
+REGISTRY.callback('write_queue_depth', 'Orders waiting in the write queue', write_queue.depth)
+REGISTRY.callback('sse_subscribers', 'Open /api/stream connections', db.events.subscriber_count)
+
+
+def shutdown(timeout: float = 30.0) -> bool:
+    """Drain queued order writes and close the pool. Called once per process
+    on exit (gunicorn's worker_exit hook); True if every queued order landed."""
+    db.events.close()
+    drained = write_queue.close(timeout)
+    if not drained:
+        print(f"Write queue not drained after {timeout:.0f}s; "
+              f"{write_queue.depth()} order(s) left in {write_queue.wal_path or 'memory'}")
+    db.close()
+    return drained
+
+
+@app.before_request
+def _start_request_timer():
+    request_metrics.start()
+
+
+@app.after_request
+def _record_request_metrics(response):
+    if response.mimetype == 'text/event-stream':
+        request_metrics.cancel()  # open for hours; would swamp the histogram
+        return response
+    # Recorded when the body is finished, so streamed CSV exports count in full.
+    method   = request.method
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    response.call_on_close(lambda: request_metrics.finish(method, endpoint, response.status_code))
+    return response
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint for this worker process."""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
+    return jsonify({
+        'status': 'healthy',
+        'timestamp': datetime.now().isoformat(),
+        'db_pool': db.pool_stats(),
+        'cache': db.cache_stats(),
+        'write_queue': write_queue.stats(),
+        'live': db.events.stats(),
+    })
+
+
+@app.route('/api/stream', methods=['GET'])
+def stream():
+    """Server-Sent Events feed for dashboards.
+
+    Sends a 'snapshot' (today's report + inventory) on connect, then
+    'orders', 'report' and 'inventory' (changed rows only) as they happen.
+    A client that falls too far behind is sent a fresh snapshot instead.
+    """
+    sub = db.events.subscribe()
+
+    def events():
+        try:
+            yield 'retry: 3000\n\n'
+            yield format_sse('snapshot', live.snapshot())
+            while not sub.closed:
+                message = sub.get(timeout=LIVE_CONFIG['heartbeat'])
+                if sub.closed:
+                    break
+                if sub.lagged:
+                    sub.lagged = False
+                    sub.drain()
+                    yield format_sse('snapshot', live.snapshot())
+                elif message is None:
+                    yield ': keep-alive\n\n'
+                else:
+                    yield message
+        finally:
+            db.events.unsubscribe(sub)
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+def _conditional_json(version_names, build):
+    """jsonify(build()) tagged with an ETag and Last-Modified derived from the
+    data_versions counters it depends on and the request's path and query
+    string (?fields= or ?limit= change the body, so they change the tag).
+
+    A client whose If-None-Match (or, failing that, If-Modified-Since) is
+    still current gets a bodiless 304 and build() is never called, so an
+    unchanged poll costs one primary-key lookup.
+    """
+    versions = db.get_data_versions(version_names)
+    if versions is None:
+        return jsonify(build())
+
+    etag = hashlib.sha1(
+        repr((request.full_path, sorted(versions.items()))).encode()).hexdigest()[:20]
+    stamps = [stamp for _, stamp in versions.values() if stamp]
+    last_modified = max(stamps).replace(microsecond=0) if stamps else None
+
+    if request.if_none_match:
+        current = request.if_none_match.contains(etag)
+    else:
+        since = request.if_modified_since
+        current = bool(last_modified and since and last_modified <= since)
+
+    response = Response(status=304) if current else jsonify(build())
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 
 @app.route('/api/dishes', methods=['GET'])
 def get_dishes():
     try:
-        return jsonify(db.get_dishes())
+        return _conditional_json(['dishes'], db.get_dishes)
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/dishes/availability', methods=['GET'])
+def get_dishes_availability():
+    """Portions of each dish current stock can still make, and the
+    ingredient that runs out first; repeat ?dish_id= for some dishes only.
+    Served from memory, so it is cheap enough to poll on every POS refresh."""
+    try:
+        result = analytics.availability.availability(
+            dish_ids=request.args.getlist('dish_id', type=int) or None)
+        if result is None:
+            return jsonify({'error': 'Availability unavailable'}), 503
+        return jsonify(result)
     except Exception as e:
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
@@ -31,7 +186,7 @@ def get_dishes():
 @app.route('/api/ingredients', methods=['GET'])
 def get_ingredients():
     try:
-        return jsonify(analytics.get_ingredients_status())
+        return _conditional_json(['ingredients'], analytics.get_ingredients_status)
     except Exception as e:
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
@@ -59,15 +214,172 @@ def add_order():
         if quantity < 1:
             return jsonify({'error': "'quantity' must be at least 1"}), 400
 
-        if db.add_order(dish_id, quantity):
-            return jsonify({'message': 'Order added successfully'}), 201
-        return jsonify({'error': 'Failed to add order'}), 400
+        if write_queue.mode == 'sync':
+            try:
+                if db.add_order(dish_id, quantity):
+                    return jsonify({'message': 'Order added successfully'}), 201
+            except OutOfStock as e:
+                return jsonify({'error': str(e), 'out_of_stock': e.ingredients}), 409
+            return jsonify({'error': 'Failed to add order'}), 400
+
+        key = data.get('idempotency_key')
+        if key is not None and (not isinstance(key, str) or not key
+                                or len(key) > ORDER_CONFIG['idempotency_key_max']):
+            return jsonify({'error': 'invalid idempotency_key'}), 400
+
+        if db.get_dish(dish_id) is None:
+            return jsonify({'error': f"Dish {dish_id} not found"}), 400
+        try:
+            ticket = write_queue.submit(dish_id, quantity, idempotency_key=key)
+        except QueueFull as e:
+            return jsonify({'error': str(e)}), 503
+
+        if write_queue.mode == 'queue':
+            return jsonify({'message': 'Order queued', 'ack_id': ticket.ack_id}), 202
+
+        # 'group': only a commit is an acknowledgement. The order is held in
+        # memory alone, so on timeout it is withdrawn if still queued, or left
+        # to finish if already in flight; either way the client retries with
+        # the same idempotency_key (or polls the ack) rather than trusting a 202.
+        if not ticket.wait(WRITE_QUEUE_CONFIG['group_wait_timeout']):
+            withdrawn = write_queue.withdraw(ticket)
+            return jsonify({
+                'error': 'Order not written in time; retry with the same idempotency_key'
+                         if withdrawn else 'Order still being written; check the ack or retry '
+                                           'with the same idempotency_key',
+                'ack_id': ticket.ack_id,
+            }), 503
+        if ticket.status == 'committed':
+            return jsonify({'message': 'Order added successfully', 'ack_id': ticket.ack_id}), 201
+        if ticket.out_of_stock:
+            return jsonify({'error': ticket.error, 'out_of_stock': ticket.out_of_stock,
+                            'ack_id': ticket.ack_id}), 409
+        return jsonify({'error': ticket.error or 'Failed to add order', 'ack_id': ticket.ack_id}), 400
 
     except Exception as e:
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 
+def _parse_date(value: str) -> Optional[date]:
+    """The calendar date a YYYY-MM-DD string names, or None if it isn't one."""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def _page_limit() -> int:
+    """?limit= for order pages, defaulted and bounded by ORDER_CONFIG."""
+    bound = ORDER_CONFIG['page_max']
+    try:
+        limit = int(request.args.get('limit', ORDER_CONFIG['page_default']))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= bound:
+        raise ValueError(f"'limit' must be an integer between 1 and {bound}")
+    return limit
+
+
+@app.route('/api/orders', methods=['GET'])
+def list_orders():
+    """Page through a day's orders, newest first: ?date=YYYY-MM-DD (default
+    today)&after=<next_after from the previous page>&limit=N.
+
+    Orders carry dish_id only; resolve names and prices from /api/dishes.
+    """
+    date = request.args.get('date') or datetime.now().date().isoformat()
+    if _parse_date(date) is None:
+        return jsonify({'error': "'date' must be YYYY-MM-DD"}), 400
+    after = request.args.get('after')
+    try:
+        after = int(after) if after else None
+    except ValueError:
+        return jsonify({'error': "'after' must be an integer"}), 400
+    try:
+        limit = _page_limit()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        def build():
+            page = db.get_orders_page(date, after=after, limit=limit)
+            if page is None:
+                raise RuntimeError('Failed to read orders')
+            return page
+        return _conditional_json([f"orders:{date}"], build)
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/orders/ack/<ack_id>', methods=['GET'])
+def get_order_ack(ack_id):
+    """Status of an order accepted with 202: queued, committed or rejected."""
+    status = write_queue.status(ack_id)
+    if status is None:
+        return jsonify({'error': 'Unknown or expired ack id'}), 404
+    return jsonify(status)
+
+
+@app.route('/api/orders/bulk', methods=['POST'])
+def add_orders_bulk():
+    """Ingest a batch of orders: {"orders": [{dish_id, quantity, order_time?, idempotency_key?}]}.
+
+    Rows are validated individually; the response lists a status per row
+    ('created', 'duplicate' or 'error'). Retrying with the same
+    idempotency_key values never double-counts an order.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({'error': 'body must be an object: {"orders": [...]}'}), 400
+        orders = data.get('orders')
+        if not isinstance(orders, list) or not orders:
+            return jsonify({'error': "'orders' must be a non-empty list"}), 400
+        if len(orders) > ORDER_CONFIG['bulk_max_rows']:
+            return jsonify({
+                'error': f"at most {ORDER_CONFIG['bulk_max_rows']} orders per request"
+            }), 413
+
+        result = db.add_orders_bulk(orders)
+        if result is None:
+            return jsonify({'error': 'Failed to store orders; the batch can be retried'}), 503
+        return jsonify(result), 201 if result['created'] else 200
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/ingredients/forecast', methods=['GET'])
+def get_ingredients_forecast():
+    """Burn rate, projected stockout and suggested reorder per ingredient,
+    most urgent first. Recomputed at most once a minute."""
+    try:
+        result = analytics.forecaster.forecast()
+        if result is None:
+            return jsonify({'error': 'Forecast unavailable'}), 503
+        return jsonify(result)
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/ingredients/<int:ingredient_id>/dishes', methods=['GET'])
+def get_ingredient_dishes(ingredient_id):
+    """Dishes that use an ingredient and how many portions its stock covers;
+    dishes it no longer covers at all are flagged 'blocked'."""
+    try:
+        result = analytics.get_ingredient_dishes(ingredient_id)
+        if result is None:
+            return jsonify({'error': 'Ingredient not found'}), 404
+        return jsonify(result)
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/ingredients/<int:ingredient_id>/deliver', methods=['POST'])
 def deliver_ingredient(ingredient_id):
     """Set stock to 100 (full delivery)."""
@@ -126,8 +438,24 @@ def delete_ingredient(ingredient_id):
 
 @app.route('/api/analytics/today', methods=['GET'])
 def get_today_analytics():
+    """Dashboard summary; ?fields=today,orders,... selects sections (see
+    Analytics.TODAY_FIELDS), ?limit=N sizes the first 'orders' page."""
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()]
+    unknown = set(fields) - set(analytics.TODAY_FIELDS)
+    if unknown:
+        return jsonify({'error': f"unknown field(s): {', '.join(sorted(unknown))}"}), 400
     try:
-        return jsonify(analytics.get_today_analytics())
+        limit = _page_limit()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        today = datetime.now().date()
+        return _conditional_json(
+            ['dishes', 'ingredients', f"orders:{today.isoformat()}",
+             f"orders:{(today - timedelta(days=1)).isoformat()}"],
+            lambda: analytics.get_today_analytics(fields, orders_limit=limit),
+        )
     except Exception as e:
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
@@ -135,125 +463,151 @@ def get_today_analytics():
 
 @app.route('/api/analytics/date/<date>', methods=['GET'])
 def get_analytics_by_date(date):
+    if _parse_date(date) is None:
+        return jsonify({'error': "'date' must be YYYY-MM-DD"}), 400
+
     try:
         # FIX: use the shared helper instead of duplicating the generate→dict
         # conversion here, which was out of sync with analytics.py.
-        return jsonify(analytics.get_or_generate_report(date))
+        return _conditional_json(
+            ['dishes', f"orders:{date}"],
+            lambda: analytics.get_or_generate_report(date),
+        )
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/analytics/range', methods=['GET'])
+def get_analytics_range():
+    """Per-day series and totals for ?start=YYYY-MM-DD&end=YYYY-MM-DD (inclusive)."""
+    start = request.args.get('start')
+    end   = request.args.get('end') or start
+    if not start:
+        return jsonify({'error': "'start' is required"}), 400
+    try:
+        return jsonify(analytics.get_range_report(start, end))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+def _dish_id_args() -> Optional[List[int]]:
+    """Repeated ?dish_id= values, or None when there are none. Raises
+    ValueError for one that isn't an integer instead of dropping it."""
+    try:
+        return [int(d) for d in request.args.getlist('dish_id')] or None
+    except ValueError:
+        raise ValueError("'dish_id' must be an integer") from None
+
+
+@app.route('/api/analytics/trend', methods=['GET'])
+def get_analytics_trend():
+    """Sales per ?granularity=day|week|month over closed days in
+    ?start=YYYY-MM-DD&end=YYYY-MM-DD, clamped to stored history (the latest
+    HISTORY_CONFIG['max_periods'] periods by default); repeat ?dish_id= to
+    restrict to some dishes."""
+    try:
+        return jsonify(analytics.history.trend(
+            granularity=request.args.get('granularity', 'day'),
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            dish_ids=_dish_id_args(),
+        ))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/reports/<date>/reconcile', methods=['POST'])
+def reconcile_report(date):
+    """Rebuild a day's rollups from raw orders in the background."""
+    day = _parse_date(date)
+    if day is None:
+        return jsonify({'error': "'date' must be YYYY-MM-DD"}), 400
+    if day > datetime.now().date():
+        return jsonify({'error': "'date' must not be in the future"}), 400
+    date = day.isoformat()
+    try:
+        queued = analytics.reconcile_report(date)
+        return jsonify({
+            'message': 'Reconcile queued' if queued else 'Reconcile already pending',
+            'date': date,
+        }), 202
+    except ReconcilerBusy as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
 
+def _csv_response(chunks, filename: str) -> Response:
+    """Stream CSV chunks to the client as they are produced."""
+    return Response(
+        stream_with_context(chunks),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'},
+    )
+
+
+def _wants_details() -> bool:
+    return request.args.get('details', '').lower() in ('1', 'true', 'yes')
+
+
 @app.route('/api/reports/download/<date>', methods=['GET'])
 def download_report(date):
+    """Daily CSV report; ?details=1 appends every order of the day."""
+    day = _parse_date(date)
+    if day is None:
+        return jsonify({'error': "'date' must be YYYY-MM-DD"}), 400
+    date = day.isoformat()
+
+    try:
+        chunks = iter_report_csv(
+            analytics.download_report(date),
+            title='FOOD SALES ANALYTICS — DAILY REPORT',
+            date_label=['Date', date],
+            period=f"{date} 00:00 – 23:59",
+            orders=db.iter_orders(date, date) if _wants_details() else None,
+        )
+        return _csv_response(chunks, f'food_sales_report_{date}.csv')
+
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/reports/download', methods=['GET'])
+def download_range_report():
+    """CSV for every day in ?start=YYYY-MM-DD&end=YYYY-MM-DD (inclusive);
+    ?details=1 appends every order in the range."""
+    start = request.args.get('start')
+    end   = request.args.get('end') or start
+    if not start:
+        return jsonify({'error': "'start' is required"}), 400
+    try:
+        report_data = analytics.download_range_report(start, end)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
     try:
-        report_data = analytics.download_report(date)
-        report      = report_data['report']
-        ingredients = report_data['ingredients']
-        generated   = report_data['generated_at']
-
-        # ── Derived metrics ──────────────────────────────────────────────────
-        total_sales   = report['total_sales']
-        total_orders  = report['total_orders']
-        avg_order_val = round(total_sales / total_orders, 2) if total_orders > 0 else 0.00
-
-        dishes_sold      = report.get('dishes_sold', {})
-        ingredients_used = report.get('ingredients_used', {})
-
-        top_dish     = max(dishes_sold, key=dishes_sold.get) if dishes_sold else 'N/A'
-        top_dish_qty = dishes_sold[top_dish] if dishes_sold else 0
-
-        low_stock = [i for i in ingredients if i.get('status') == 'Low']
-
-        output = io.StringIO()
-        w = csv.writer(output)
-
-        # ── 1. Title block ───────────────────────────────────────────────────
-        w.writerow(['FOOD SALES ANALYTICS — DAILY REPORT'])
-        w.writerow(['Date', date])
-        w.writerow(['Generated At', generated])
-        w.writerow(['Report Period', f"{date} 00:00 – 23:59"])
-        w.writerow([])
-
-        # ── 2. Executive Summary ─────────────────────────────────────────────
-        w.writerow(['EXECUTIVE SUMMARY'])
-        w.writerow(['Metric', 'Value'])
-        w.writerow(['Total Revenue', f"${total_sales:.2f}"])
-        w.writerow(['Total Orders', total_orders])
-        w.writerow(['Average Order Value', f"${avg_order_val:.2f}"])
-        w.writerow(['Best-Selling Dish', f"{top_dish} ({top_dish_qty} sold)"])
-        w.writerow(['Low Stock Alerts', len(low_stock)])
-        w.writerow([])
-
-        # ── 3. Dishes Sold ───────────────────────────────────────────────────
-        w.writerow(['DISHES SOLD'])
-        w.writerow(['Dish Name', 'Qty Sold', 'Share of Orders (%)'])
-
-        total_dishes_qty = sum(dishes_sold.values()) or 1
-        sorted_dishes = sorted(dishes_sold.items(), key=lambda x: x[1], reverse=True)
-        for dish, qty in sorted_dishes:
-            share = round((qty / total_dishes_qty) * 100, 1)
-            w.writerow([dish, qty, f"{share}%"])
-
-        if not sorted_dishes:
-            w.writerow(['No dishes sold on this date', '', ''])
-        w.writerow([])
-
-        # ── 4. Ingredients Used ──────────────────────────────────────────────
-        w.writerow(['INGREDIENTS USED TODAY'])
-        w.writerow(['Ingredient', 'Qty Used', 'Unit'])
-
-        sorted_ings_used = sorted(ingredients_used.items(), key=lambda x: x[1], reverse=True)
-        for ing_name, qty in sorted_ings_used:
-            unit = next((i['unit'] for i in ingredients if i['name'].lower() == ing_name.lower()), 'units')
-            w.writerow([ing_name, f"{qty:.2f}", unit])
-
-        if not sorted_ings_used:
-            w.writerow(['No ingredients used', '', ''])
-        w.writerow([])
-
-        # ── 5. Current Inventory Status ──────────────────────────────────────
-        w.writerow(['CURRENT INVENTORY STATUS'])
-        w.writerow(['Ingredient', 'Current Stock', 'Unit', 'Stock %', 'Status'])
-
-        sorted_inventory = sorted(ingredients, key=lambda x: x.get('percentage', 0))
-        for ing in sorted_inventory:
-            pct    = ing.get('percentage', 0)
-            status = ing.get('status', 'Good')
-            flag   = ' ⚠ REORDER' if status == 'Low' else ''
-            w.writerow([
-                ing['name'],
-                ing['stock_quantity'],
-                ing['unit'],
-                f"{pct:.1f}%",
-                f"{status}{flag}",
-            ])
-        w.writerow([])
-
-        # ── 6. Low Stock Alerts ──────────────────────────────────────────────
-        if low_stock:
-            w.writerow(['LOW STOCK ALERTS — ACTION REQUIRED'])
-            w.writerow(['Ingredient', 'Current Stock', 'Unit', 'Stock %'])
-            for ing in low_stock:
-                w.writerow([
-                    ing['name'],
-                    ing['stock_quantity'],
-                    ing['unit'],
-                    f"{ing.get('percentage', 0):.1f}%",
-                ])
-            w.writerow([])
-
-        # ── 7. Footer ────────────────────────────────────────────────────────
-        w.writerow(['Report generated by Food Sales Analytics Dashboard'])
-        w.writerow(['End of Report'])
-
-        output.seek(0)
-        return send_file(
-            io.BytesIO(output.getvalue().encode('utf-8')),
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=f'food_sales_report_{date}.csv',
+        start, end = report_data['start'], report_data['end']
+        chunks = iter_report_csv(
+            report_data,
+            title='FOOD SALES ANALYTICS — DATE RANGE REPORT',
+            date_label=['Date Range', f"{start} to {end}"],
+            period=f"{start} 00:00 – {end} 23:59",
+            series=report_data['series'],
+            orders=db.iter_orders(start, end) if _wants_details() else None,
         )
+        return _csv_response(chunks, f'food_sales_report_{start}_to_{end}.csv')
 
     except Exception as e:
         traceback.print_exc()
@@ -261,4 +615,5 @@ def download_report(date):
 
 
 if __name__ == '__main__':
+    # Single-process development server. Production: see wsgi.py.
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,139 @@
+"""How many portions of each dish current stock can still make.
+
+A dish's portions are the minimum, over its recipe, of stock / amount per
+portion; a recipe ingredient that isn't stocked at all makes the dish
+unavailable. MenuAvailability keeps a per-process copy of the stock vector
+and computes the whole menu at once against RecipeIndex's dish x ingredient
+matrix.
+
+Orders placed through this process are applied as they commit (the
+'stock_deducted' event): the stock vector is reduced and only the dishes
+using the touched ingredients are recomputed. Deliveries and edits
+('stock_changed'), a new menu or ingredient list, and every `sync_interval`
+seconds (orders taken by other workers) reload stock from the database. An
+order committed while a reload runs can be counted twice until the next
+reload, so figures err on the low side, never the high one.
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from database import Database
+from recipes import RecipeIndex
+
+# Absorbs float error in stock / amount, so 0.9 kg at 0.3 kg a portion is 3.
+_EPSILON = 1e-9
+
+
+class MenuAvailability:
+    def __init__(self, db: Database, sync_interval: float = 30.0):
+        self.db            = db
+        self.sync_interval = sync_interval
+        self._lock     = threading.RLock()
+        self._recipes  = None   # RecipeIndex the arrays below were built for
+        self._stock    = None   # stock per RecipeIndex.ingredient_ids column
+        self._portions = None   # per RecipeIndex.dish_ids row; inf = no stocked ingredients
+        self._limiting = None   # column of the ingredient that runs out first
+        self._unstocked = None  # rows whose recipe names an ingredient not in stock
+        self._dirty     = True
+        self._synced_at = 0.0
+        db.events.add_listener(self._on_event)
+
+    def _on_event(self, event: str, data: Dict):
+        if event == 'stock_deducted':
+            self._deduct(data.get('deductions') or {})
+        elif event == 'stock_changed':
+            self._dirty = True
+
+    # ── COMPUTATION ───────────────────────────────────────────────────────────
+
+    def _compute(self, rows):
+        """(portions, limiting column) for matrix rows `rows`."""
+        matrix = self._recipes.matrix[rows]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(matrix > 0, self._stock / matrix, np.inf)
+        if not ratio.shape[1]:
+            return np.full(len(ratio), np.inf), np.zeros(len(ratio), dtype=np.int64)
+        portions = np.floor(ratio.min(axis=1) + _EPSILON)
+        portions[self._unstocked[rows]] = 0
+        return portions, ratio.argmin(axis=1)
+
+    def _deduct(self, deductions: Dict[int, float]):
+        with self._lock:
+            if self._recipes is None:
+                return
+            columns = self._recipes.column
+            cols = [columns[i] for i in deductions if i in columns]
+            if not cols:
+                return
+            amounts = np.array([deductions[i] for i in deductions if i in columns])
+            self._stock[cols] = np.maximum(self._stock[cols] - amounts, 0.0)
+            rows = np.flatnonzero((self._recipes.matrix[:, cols] > 0).any(axis=1))
+            if len(rows):
+                self._portions[rows], self._limiting[rows] = self._compute(rows)
+
+    def _reload(self, recipes: RecipeIndex) -> bool:
+        ingredients = self.db.get_ingredients()
+        if not ingredients and recipes.ingredient_ids:
+            return False   # database unreachable; keep serving the old figures
+        stock = {i['id']: i['stock_quantity'] for i in ingredients}
+        self._recipes   = recipes
+        self._stock     = np.array([stock.get(i, 0.0) for i in recipes.ingredient_ids])
+        self._unstocked = np.array([any(i is None for _, i, _ in recipes.lines[d])
+                                    for d in recipes.dish_ids], dtype=bool)
+        self._portions, self._limiting = self._compute(slice(None))
+        return True
+
+    def sync(self, force: bool = False) -> bool:
+        """Reload stock if it may have moved in ways not seen as events.
+        False if there is nothing to serve (database unreachable)."""
+        recipes = self.db.get_recipe_index()
+        with self._lock:
+            now = time.monotonic()
+            if recipes is None:
+                return self._recipes is not None
+            if (force or self._dirty or recipes is not self._recipes
+                    or now - self._synced_at >= self.sync_interval):
+                self._dirty = False
+                if self._reload(recipes):
+                    self._synced_at = now
+            return self._recipes is not None
+
+    # ── QUERIES ───────────────────────────────────────────────────────────────
+
+    def availability(self, dish_ids: Optional[List[int]] = None) -> Optional[Dict]:
+        """Portions left per dish (None: needs no stocked ingredient) and the
+        ingredient that limits it, optionally for some dishes only."""
+        if not self.sync():
+            return None
+        with self._lock:
+            recipes, portions, limiting = self._recipes, self._portions.copy(), self._limiting.copy()
+            unstocked = self._unstocked.copy()
+        names = {i: name for name, i in recipes.id_of.items()}
+
+        rows = range(len(recipes.dish_ids)) if dish_ids is None else \
+            [recipes.row[d] for d in dish_ids if d in recipes.row]
+        dishes = []
+        for r in rows:
+            dish_id = recipes.dish_ids[r]
+            if unstocked[r]:
+                limit = next(name for name, i, _ in recipes.lines[dish_id] if i is None)
+            elif np.isinf(portions[r]):
+                limit = None
+            else:
+                limit = names.get(recipes.ingredient_ids[limiting[r]])
+            dishes.append({
+                'dish_id': dish_id,
+                'name': recipes.dishes[dish_id]['name'],
+                'portions': None if np.isinf(portions[r]) else int(portions[r]),
+                'available': bool(portions[r] >= 1),
+                'limiting_ingredient': limit,
+            })
+        return {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'dishes': dishes,
+            'unavailable': sum(1 for d in dishes if not d['available']),
+        }
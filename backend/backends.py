@@ -0,0 +1,512 @@
+"""Storage backends behind Database.
+
+Database is written once against a small DB-API surface: pooled
+connections, %s placeholders, dictionary cursors and MySQL-flavoured SQL
+(ON DUPLICATE KEY UPDATE, GREATEST, HOUR, FOR UPDATE). A backend supplies
+the connections, the schema DDL and whatever translation its engine needs:
+
+  MySQLBackend   - mysql.connector against DB_CONFIG (the default)
+  SQLiteBackend  - a SQLite file or ':memory:' database from the standard
+                   library: no server and no third-party driver. Meant for
+                   tests, CI benchmarks and single-terminal installs.
+"""
+import itertools
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timezone
+from functools import lru_cache
+from typing import List, Optional
+
+from config import DB_CONFIG
+
+try:
+    import mysql.connector
+except ImportError:  # SQLite-only install
+    mysql = None
+
+# Exceptions a backend raises for database errors; catch these, not a driver's own.
+DBError = (sqlite3.Error,) + ((mysql.connector.Error,) if mysql else ())
+
+
+# Sales history fact tables (history.py), plain enough for both engines.
+# Per-dish totals per day, per week (Monday) and per month (the 1st);
+# history_days records the orders:<date> version each day was folded at.
+HISTORY_SCHEMA = [
+    f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            {column} DATE NOT NULL,
+            dish_id INT NOT NULL,
+            quantity BIGINT NOT NULL,
+            order_count BIGINT NOT NULL,
+            sales DECIMAL(16,2) NOT NULL,
+            PRIMARY KEY ({column}, dish_id)
+        )
+    '''
+    for table, column in (('sales_daily', 'date'), ('sales_weekly', 'period'), ('sales_monthly', 'period'))
+] + [
+    '''
+        CREATE TABLE IF NOT EXISTS history_days (
+            date DATE PRIMARY KEY,
+            orders_version BIGINT NOT NULL
+        )
+    ''',
+]
+
+
+class StorageBackend(ABC):
+    """What Database needs from an engine."""
+
+    name = ''                # dialect key for migrations ('mysql', 'sqlite')
+    baseline_version = 0     # migrations already folded into schema()
+
+    @abstractmethod
+    def connect(self):
+        """A new DB-API connection (autocommit off), or None if it can't be opened."""
+
+    @abstractmethod
+    def open_for_init(self):
+        """A connection for creating the schema, creating the database first
+        if the engine needs that."""
+
+    @abstractmethod
+    def schema(self) -> List[str]:
+        """CREATE ... IF NOT EXISTS statements for the baseline schema."""
+
+    def close(self):
+        """Release anything the backend holds beyond pooled connections."""
+
+
+# ── MYSQL ─────────────────────────────────────────────────────────────────────
+
+class MySQLBackend(StorageBackend):
+    name = 'mysql'
+
+    def __init__(self, config: dict = None):
+        if mysql is None:
+            raise RuntimeError("mysql-connector-python is not installed; "
+                               "install it or set DB_CONFIG['backend'] = 'sqlite'")
+        self.config = config or DB_CONFIG
+
+    def _connect(self, **extra):
+        return mysql.connector.connect(
+            host=self.config['host'],
+            user=self.config['user'],
+            password=self.config['password'],
+            port=self.config['port'],
+            connection_timeout=self.config['connection_timeout'],
+            autocommit=False,
+            **extra,
+        )
+
+    def connect(self):
+        max_retries = 3
+        retry_delay = 1
+
+        for attempt in range(max_retries):
+            try:
+                return self._connect(database=self.config['database'])
+            except mysql.connector.Error as e:
+                print(f"Connection attempt {attempt + 1} failed: {e}")
+                if attempt < max_retries - 1:
+                    time.sleep(retry_delay)
+                    retry_delay *= 2
+                else:
+                    print("Could not connect to database.")
+                    return None
+
+    def open_for_init(self):
+        # Connect WITHOUT database so we can CREATE it if missing.
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {self.config['database']}")
+        cursor.execute(f"USE {self.config['database']}")
+        cursor.close()
+        return conn
+
+    def schema(self) -> List[str]:
+        return [
+            '''
+                CREATE TABLE IF NOT EXISTS dishes (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    name VARCHAR(255) NOT NULL,
+                    price DECIMAL(10,2) NOT NULL,
+                    ingredients JSON NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''',
+            '''
+                CREATE TABLE IF NOT EXISTS ingredients (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    name VARCHAR(255) NOT NULL UNIQUE,
+                    stock_quantity DECIMAL(10,2) NOT NULL,
+                    unit VARCHAR(50) NOT NULL,
+                    reorder_level DECIMAL(10,2) NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                        ON UPDATE CURRENT_TIMESTAMP
+                )
+            ''',
+            '''
+                CREATE TABLE IF NOT EXISTS orders (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    dish_id INT NOT NULL,
+                    quantity INT NOT NULL,
+                    order_time DATETIME NOT NULL,
+                    date DATE NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (dish_id) REFERENCES dishes(id) ON DELETE CASCADE,
+                    INDEX idx_date (date),
+                    INDEX idx_order_time (order_time)
+                )
+            ''',
+            '''
+                CREATE TABLE IF NOT EXISTS daily_reports (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    date DATE NOT NULL UNIQUE,
+                    total_sales DECIMAL(10,2) NOT NULL,
+                    total_orders INT NOT NULL,
+                    dishes_sold JSON NOT NULL,
+                    ingredients_used JSON NOT NULL,
+                    peak_hours JSON NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    INDEX idx_report_date (date)
+                )
+            ''',
+            # Rollups maintained by add_order in the same transaction as the
+            # order insert, so reports read O(dishes x 24) rows per day.
+            '''
+                CREATE TABLE IF NOT EXISTS daily_dish_hourly (
+                    date DATE NOT NULL,
+                    dish_id INT NOT NULL,
+                    hour TINYINT NOT NULL,
+                    quantity INT NOT NULL DEFAULT 0,
+                    order_count INT NOT NULL DEFAULT 0,
+                    sales DECIMAL(12,2) NOT NULL DEFAULT 0,
+                    PRIMARY KEY (date, dish_id, hour)
+                )
+            ''',
+            '''
+                CREATE TABLE IF NOT EXISTS daily_ingredient_usage (
+                    date DATE NOT NULL,
+                    ingredient VARCHAR(255) NOT NULL,
+                    quantity_used DECIMAL(14,4) NOT NULL DEFAULT 0,
+                    PRIMARY KEY (date, ingredient)
+                )
+            ''',
+            # Change counters behind the API's ETags ('dishes', 'ingredients',
+            # 'orders:<date>'), advanced in the same transaction as each write.
+            '''
+                CREATE TABLE IF NOT EXISTS data_versions (
+                    name VARCHAR(64) PRIMARY KEY,
+                    version BIGINT NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3)
+                        ON UPDATE CURRENT_TIMESTAMP(3)
+                )
+            ''',
+            # dishes.ingredients normalized by ingredient id (see recipes.py).
+            '''
+                CREATE TABLE IF NOT EXISTS dish_ingredients (
+                    dish_id INT NOT NULL,
+                    ingredient_id INT NOT NULL,
+                    amount DECIMAL(12,4) NOT NULL,
+                    PRIMARY KEY (dish_id, ingredient_id),
+                    INDEX idx_dish_ingredients_ingredient (ingredient_id),
+                    FOREIGN KEY (dish_id) REFERENCES dishes(id) ON DELETE CASCADE,
+                    FOREIGN KEY (ingredient_id) REFERENCES ingredients(id) ON DELETE CASCADE
+                )
+            ''',
+        ] + HISTORY_SCHEMA
+
+
+# ── SQLITE ────────────────────────────────────────────────────────────────────
+
+_SQLITE_NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+@lru_cache(maxsize=512)
+def sqlite_sql(query: str) -> str:
+    """Rewrite the MySQL dialect Database uses into SQLite (3.35+).
+
+    Placeholders become '?', ON DUPLICATE KEY UPDATE becomes an upsert on
+    the violated key with VALUES(col) read from `excluded`, and row-lock
+    clauses are dropped (SQLite locks the whole database on write; a
+    transaction opened by SELECT ... FOR UPDATE takes that lock up front).
+    GREATEST, HOUR and UNIX_TIMESTAMP are registered as functions instead.
+    """
+    query = query.replace('%s', '?')
+    query = re.sub(r'\s+(LOCK IN SHARE MODE|FOR UPDATE)\b', '', query)
+    query = re.sub(r'ON DUPLICATE KEY UPDATE', 'ON CONFLICT DO UPDATE SET', query)
+    query = re.sub(r'\bVALUES\((\w+)\)', r'excluded.\1', query)
+    return query.replace('CURRENT_TIMESTAMP(3)', _SQLITE_NOW)
+
+
+def _parse_datetime(value) -> Optional[datetime]:
+    if value is None:
+        return None
+    text = value.decode() if isinstance(value, bytes) else str(value)
+    head, _, fraction = text.replace('T', ' ').partition('.')
+    parsed = datetime.strptime(head, '%Y-%m-%d %H:%M:%S' if ' ' in head else '%Y-%m-%d')
+    return parsed.replace(microsecond=int((fraction + '000000')[:6])) if fraction else parsed
+
+
+def _unix_timestamp(value) -> Optional[float]:
+    """UNIX_TIMESTAMP() for the UTC stamps SQLite's 'now' produces."""
+    parsed = _parse_datetime(value)
+    return parsed.replace(tzinfo=timezone.utc).timestamp() if parsed else None
+
+
+def _hour(value) -> Optional[int]:
+    parsed = _parse_datetime(value)
+    return parsed.hour if parsed else None
+
+
+def _greatest(*values):
+    return None if any(v is None for v in values) else max(values)
+
+
+# Stored as ISO text; DATE/DATETIME/TIMESTAMP columns come back as objects,
+# as they do from mysql.connector.
+sqlite3.register_adapter(datetime, lambda d: d.isoformat(' '))
+sqlite3.register_adapter(date, lambda d: d.isoformat())
+sqlite3.register_converter('DATE', lambda b: date.fromisoformat(b.decode()))
+sqlite3.register_converter('DATETIME', _parse_datetime)
+sqlite3.register_converter('TIMESTAMP', _parse_datetime)
+
+
+class _SQLiteCursor:
+    """mysql.connector-style cursor over sqlite3: dictionary rows and the
+    MySQL dialect (see sqlite_sql)."""
+
+    def __init__(self, conn, dictionary: bool):
+        self._conn = conn
+        self._raw  = conn._raw.cursor()
+        self._dict = dictionary
+
+    def execute(self, query, params=()):
+        self._conn._begin(immediate='FOR UPDATE' in query)
+        self._raw.execute(sqlite_sql(query), tuple(params or ()))
+
+    def executemany(self, query, seq_params):
+        self._conn._begin()
+        self._raw.executemany(sqlite_sql(query), [tuple(p) for p in seq_params])
+
+    def _row(self, row):
+        if row is None or not self._dict:
+            return row
+        return {col[0]: value for col, value in zip(self._raw.description, row)}
+
+    def fetchone(self):
+        return self._row(self._raw.fetchone())
+
+    def fetchall(self):
+        return [self._row(r) for r in self._raw.fetchall()]
+
+    def fetchmany(self, size: int = 1):
+        return [self._row(r) for r in self._raw.fetchmany(size)]
+
+    @property
+    def lastrowid(self):
+        return self._raw.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._raw.rowcount
+
+    def close(self):
+        self._raw.close()
+
+
+class _SQLiteConnection:
+    """The parts of a mysql.connector connection Database and the pool use.
+
+    Like MySQL with autocommit off, a transaction begins with the first
+    statement and lasts until commit() or rollback().
+    """
+
+    def __init__(self, raw: sqlite3.Connection):
+        self._raw    = raw
+        self._closed = False
+
+    def _begin(self, immediate: bool = False):
+        # IMMEDIATE for a transaction that reads in order to write: a
+        # deferred one would fail with SQLITE_BUSY when it upgrades its lock
+        # under a concurrent writer, instead of waiting for it.
+        if not self._raw.in_transaction:
+            self._raw.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+
+    def cursor(self, dictionary: bool = False, buffered: bool = True):
+        # SQLite reads rows lazily either way, so `buffered` needs no mapping.
+        return _SQLiteCursor(self, dictionary)
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def is_connected(self) -> bool:
+        return not self._closed
+
+    def ping(self, reconnect: bool = False):
+        self._raw.execute('SELECT 1').fetchone()
+
+    def close(self):
+        self._closed = True
+        self._raw.close()
+
+
+class SQLiteBackend(StorageBackend):
+    """SQLite file, or ':memory:' for a private in-process database.
+
+    An in-memory database is shared by this backend's pooled connections
+    (shared cache) and lives until close(). Shared-cache tables lock per
+    table, so it suits tests and single-threaded benchmarks; use a file for
+    anything concurrent, where WAL mode lets readers run alongside a writer.
+    """
+
+    name = 'sqlite'
+    baseline_version = 4   # schema() already includes migrations 1-4
+    _memory_ids = itertools.count(1)
+
+    def __init__(self, path: str = None, busy_timeout: float = 10.0):
+        self.path = path or DB_CONFIG.get('sqlite_path', 'food_analytics.db')
+        self.busy_timeout = busy_timeout
+        self._keeper = None
+        self._lock = threading.Lock()
+        if self.path == ':memory:':
+            self._target = f"file:food_analytics_{next(self._memory_ids)}?mode=memory&cache=shared"
+            self._keeper = self._open()   # the database lives as long as one connection does
+        else:
+            self._target = self.path
+
+    def _open(self) -> sqlite3.Connection:
+        raw = sqlite3.connect(
+            self._target,
+            uri=self._target.startswith('file:'),
+            timeout=self.busy_timeout,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            isolation_level=None,        # transactions are begun by _SQLiteConnection
+            check_same_thread=False,     # pooled: used by one thread at a time
+        )
+        raw.create_function('GREATEST', -1, _greatest, deterministic=True)
+        raw.create_function('HOUR', 1, _hour, deterministic=True)
+        raw.create_function('UNIX_TIMESTAMP', 1, _unix_timestamp, deterministic=True)
+        raw.execute('PRAGMA foreign_keys = ON')
+        if self.path != ':memory:':
+            raw.execute('PRAGMA journal_mode = WAL')
+        return raw
+
+    def connect(self):
+        try:
+            return _SQLiteConnection(self._open())
+        except sqlite3.Error as e:
+            print(f"Could not open SQLite database {self.path}: {e}")
+            return None
+
+    def open_for_init(self):
+        return _SQLiteConnection(self._open())
+
+    def close(self):
+        with self._lock:
+            keeper, self._keeper = self._keeper, None
+        if keeper:
+            keeper.close()
+
+    def schema(self) -> List[str]:
+        return [
+            '''
+                CREATE TABLE IF NOT EXISTS dishes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name VARCHAR(255) NOT NULL,
+                    price DECIMAL(10,2) NOT NULL,
+                    ingredients JSON NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''',
+            '''
+                CREATE TABLE IF NOT EXISTS ingredients (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name VARCHAR(255) NOT NULL UNIQUE,
+                    stock_quantity DECIMAL(10,2) NOT NULL,
+                    unit VARCHAR(50) NOT NULL,
+                    reorder_level DECIMAL(10,2) NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''',
+            '''
+                CREATE TABLE IF NOT EXISTS orders (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    dish_id INT NOT NULL REFERENCES dishes(id) ON DELETE CASCADE,
+                    quantity INT NOT NULL,
+                    order_time DATETIME NOT NULL,
+                    date DATE NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    idempotency_key VARCHAR(64) NULL UNIQUE
+                )
+            ''',
+            'CREATE INDEX IF NOT EXISTS idx_order_time ON orders (order_time)',
+            'CREATE INDEX IF NOT EXISTS idx_orders_report ON orders (date, dish_id, order_time, quantity)',
+            'CREATE INDEX IF NOT EXISTS idx_orders_date_id ON orders (date, id)',
+            '''
+                CREATE TABLE IF NOT EXISTS daily_reports (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    date DATE NOT NULL UNIQUE,
+                    total_sales DECIMAL(10,2) NOT NULL,
+                    total_orders INT NOT NULL,
+                    dishes_sold JSON NOT NULL,
+                    ingredients_used JSON NOT NULL,
+                    peak_hours JSON NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    format_version SMALLINT NOT NULL DEFAULT 1,
+                    is_final TINYINT NOT NULL DEFAULT 0
+                )
+            ''',
+            '''
+                CREATE TABLE IF NOT EXISTS daily_dish_hourly (
+                    date DATE NOT NULL,
+                    dish_id INT NOT NULL,
+                    hour TINYINT NOT NULL,
+                    quantity INT NOT NULL DEFAULT 0,
+                    order_count INT NOT NULL DEFAULT 0,
+                    sales DECIMAL(12,2) NOT NULL DEFAULT 0,
+                    PRIMARY KEY (date, dish_id, hour)
+                )
+            ''',
+            '''
+                CREATE TABLE IF NOT EXISTS daily_ingredient_usage (
+                    date DATE NOT NULL,
+                    ingredient VARCHAR(255) NOT NULL,
+                    quantity_used DECIMAL(14,4) NOT NULL DEFAULT 0,
+                    PRIMARY KEY (date, ingredient)
+                )
+            ''',
+            f'''
+                CREATE TABLE IF NOT EXISTS data_versions (
+                    name VARCHAR(64) PRIMARY KEY,
+                    version BIGINT NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP NOT NULL DEFAULT ({_SQLITE_NOW})
+                )
+            ''',
+            '''
+                CREATE TABLE IF NOT EXISTS dish_ingredients (
+                    dish_id INT NOT NULL REFERENCES dishes(id) ON DELETE CASCADE,
+                    ingredient_id INT NOT NULL REFERENCES ingredients(id) ON DELETE CASCADE,
+                    amount DECIMAL(12,4) NOT NULL,
+                    PRIMARY KEY (dish_id, ingredient_id)
+                )
+            ''',
+            'CREATE INDEX IF NOT EXISTS idx_dish_ingredients_ingredient ON dish_ingredients (ingredient_id)',
+        ] + HISTORY_SCHEMA
+
+
+def backend_from_config(config: dict = None) -> StorageBackend:
+    """The backend DB_CONFIG['backend'] names ('mysql' or 'sqlite')."""
+    config = config or DB_CONFIG
+    kind = config.get('backend', 'mysql')
+    if kind == 'mysql':
+        return MySQLBackend(config)
+    if kind == 'sqlite':
+        return SQLiteBackend(config.get('sqlite_path'))
+    raise ValueError(f"unknown DB_CONFIG['backend'] {kind!r}")
@@ -0,0 +1,163 @@
+"""Precompute stored daily reports for a span of history in parallel.
+
+After a bulk import of historical orders, daily_reports only fills as days
+are requested. backfill_reports() lists the closed days that have orders,
+skips those already holding a final report, and fans the rest out in
+batches of consecutive days over a process pool. Each worker process opens
+its own Database (and so its own connections), aggregates each day straight
+from the orders table with the compiled recipe index, and upserts the
+batch's reports in one transaction.
+
+Finished days are appended to a checkpoint file after every batch, so an
+interrupted run (Ctrl-C, a lost connection) picks up where it stopped when
+rerun with the same arguments; the file is removed once every day is done.
+The checkpoint records the run's start and end, and a run over a different
+range refuses to use it (pass `force` to discard it and start over).
+With `rebuild_rollups` each day's rollups are rebuilt from the orders too,
+for imports that wrote orders without them.
+"""
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from typing import List, Optional
+
+from backends import SQLiteBackend
+from database import Database
+
+# Per worker process, set up by _init_worker.
+_db = None
+_rebuild = False
+
+
+def _init_worker(sqlite_path: Optional[str], rebuild: bool):
+    global _db, _rebuild
+    _db = Database(init_schema=False, backend=SQLiteBackend(sqlite_path) if sqlite_path else None)
+    _rebuild = rebuild
+
+
+def _run_batch(days: List[str]) -> tuple:
+    """Build and store the reports for `days`. Returns (days saved, orders
+    they cover, days that failed)."""
+    reports, failed = [], []
+    for day in days:
+        if _rebuild and not _db.rebuild_rollup(day):
+            failed.append(day)
+            continue
+        aggregate = _db.aggregate_day(day)
+        if aggregate is None:
+            failed.append(day)
+            continue
+        reports.append(aggregate.to_report())
+
+    if not _db.save_daily_reports(reports, final=True):
+        return [], 0, days
+    return [r.date for r in reports], sum(r.total_orders for r in reports), failed
+
+
+class CheckpointMismatch(Exception):
+    """The checkpoint file belongs to a run over a different date range."""
+
+
+def _load_checkpoint(path: str, start: Optional[str], end: Optional[str]) -> set:
+    if not path or not os.path.exists(path):
+        return set()
+    try:
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+        done, span = set(state['done']), (state.get('start'), state.get('end'))
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Ignoring unreadable checkpoint {path}: {e}")
+        return set()
+    if span != (start, end):
+        raise CheckpointMismatch(
+            f"{path} is for {span[0] or 'the beginning'} to {span[1] or 'the end'}, not "
+            f"{start or 'the beginning'} to {end or 'the end'}; rerun with that range "
+            f"to resume it, or with force to discard it")
+    return done
+
+
+def _save_checkpoint(path: str, start: Optional[str], end: Optional[str], done: set):
+    if not path:
+        return
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'start': start, 'end': end, 'done': sorted(done)}, f)
+    os.replace(tmp, path)   # atomic: a crash never leaves a torn checkpoint
+
+
+def backfill_reports(db: Database, sqlite_path: Optional[str] = None,
+                     start: Optional[str] = None, end: Optional[str] = None,
+                     workers: int = None, batch_days: int = 31,
+                     checkpoint: Optional[str] = 'backfill_reports.json',
+                     force: bool = False, rebuild_rollups: bool = False) -> bool:
+    """Store final reports for closed days in [start, end] (all history by
+    default). `force` recomputes days that already have one and discards any
+    checkpoint. True if every day was stored; raises CheckpointMismatch if
+    the checkpoint is for another range."""
+    if sqlite_path == ':memory:':
+        raise ValueError("an in-memory SQLite database can't be shared with worker processes")
+    workers = workers or os.cpu_count() or 1
+
+    days = db.get_order_dates(start, end)
+    final = set() if force else db.get_final_report_dates()
+    if days is None or final is None:
+        print("Database unavailable.")
+        return False
+    if force and checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    done  = _load_checkpoint(checkpoint, start, end)
+    today = date.today().isoformat()
+    todo  = [d for d in days if d < today and d not in final and d not in done]
+    if done:
+        print(f"Resuming from {checkpoint}: {len(done)} day(s) already done.")
+    if not todo:
+        print("No days to backfill.")
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        return True
+
+    batches = [todo[i:i + batch_days] for i in range(0, len(todo), batch_days)]
+    print(f"Backfilling {len(todo)} day(s) in {len(batches)} batch(es) on {workers} worker(s)...")
+
+    failed, saved, orders = [], 0, 0
+    started = time.perf_counter()
+    # spawn, not fork: children must not inherit the parent's pooled connections.
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=_init_worker, initargs=(sqlite_path, rebuild_rollups))
+    try:
+        futures = {pool.submit(_run_batch, b): b for b in batches}
+        for future in as_completed(futures):
+            try:
+                stored, covered, missed = future.result()
+            except Exception as e:
+                print(f"Batch starting {futures[future][0]} failed: {e}")
+                stored, covered, missed = [], 0, futures[future]
+            failed.extend(missed)
+            saved  += len(stored)
+            orders += covered
+            done.update(stored)
+            _save_checkpoint(checkpoint, start, end, done)
+
+            elapsed = time.perf_counter() - started
+            rate = saved / elapsed if elapsed else 0.0
+            left = len(todo) - saved - len(failed)
+            print(f"  {saved + len(failed)}/{len(todo)} days  {rate:.1f} days/s  "
+                  f"{orders / elapsed if elapsed else 0:,.0f} orders/s  "
+                  f"ETA {left / rate if rate else 0:.0f}s")
+    except KeyboardInterrupt:
+        pool.shutdown(wait=False, cancel_futures=True)
+        print(f"Interrupted after {saved} day(s); rerun to resume from {checkpoint}.")
+        return False
+    pool.shutdown()
+
+    elapsed = time.perf_counter() - started
+    print(f"Stored {saved} report(s) covering {orders:,} orders in {elapsed:.1f}s.")
+    if failed:
+        print(f"{len(failed)} day(s) failed (first {min(failed)}); rerun to retry them.")
+        return False
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return True
@@ -0,0 +1,110 @@
+"""Order-ingest throughput under concurrent writers, before and after batching.
+
+Runs W writer threads against a throwaway database (DB_CONFIG['database'] +
+'_bench') for a fixed duration each and reports orders/sec and p50/p99
+latency for:
+
+  * legacy  - SELECT the dish, INSERT, then one UPDATE per ingredient
+  * batched - Database.add_order: cached dish check, INSERT, one CASE UPDATE
+
+Usage (from backend/):
+    python benchmarks/bench_order_throughput.py --writers 1 4 16 --seconds 10
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config import DB_CONFIG  # noqa: E402
+
+DB_CONFIG['database'] = DB_CONFIG['database'] + '_bench'
+DB_CONFIG['pool_size'] = 64
+
+from database import Database  # noqa: E402
+
+
+def legacy_add_order(db: Database, dish_id: int, quantity: int) -> bool:
+    """The pre-batching write path: 2 + N round trips per order (plus the
+    rollup upserts and post-commit version bump both paths share, so the
+    comparison is like for like)."""
+    conn = db._acquire()
+    if conn is None:
+        return False
+    cursor = None
+    try:
+        cursor = conn.cursor(dictionary=True)
+        now = datetime.now()
+        cursor.execute("SELECT price, ingredients FROM dishes WHERE id = %s", (dish_id,))
+        row = cursor.fetchone()
+        cursor.execute(
+            """INSERT INTO orders (dish_id, quantity, order_time, date, unit_price)
+               VALUES (%s, %s, %s, %s, %s)""",
+            (dish_id, quantity, now, now.date().isoformat(), row['price']),
+        )
+        recipe = json.loads(row['ingredients'])
+        for name, amount in recipe.items():
+            cursor.execute(
+                "UPDATE ingredients SET stock_quantity = GREATEST(stock_quantity - %s, 0) WHERE name = %s",
+                (amount * quantity, name),
+            )
+        dish = {'id': dish_id, 'price': float(row['price']), 'ingredients': recipe}
+        hourly, usage, _ = db._order_deltas([(dish, quantity, now)], db.get_recipe_index())
+        db._bump_rollups(cursor, hourly, usage)
+        conn.commit()
+        db._commit_versions(conn, cursor, 'ingredients', f"orders:{now.date().isoformat()}")
+        return True
+    finally:
+        db._release(conn, cursor)
+
+
+def run(label: str, write, dish_ids, writers: int, seconds: float):
+    latencies, failures = [], [0]
+    lock  = threading.Lock()
+    stop  = time.monotonic() + seconds
+
+    def worker():
+        mine, failed = [], 0
+        while time.monotonic() < stop:
+            started = time.perf_counter()
+            ok = write(random.choice(dish_ids), random.randint(1, 3))
+            mine.append(time.perf_counter() - started)
+            failed += not ok
+        with lock:
+            latencies.extend(mine)
+            failures[0] += failed
+
+    threads = [threading.Thread(target=worker) for _ in range(writers)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0
+    print(f"  {label:<8} writers={writers:<3} {len(latencies) / seconds:8.1f} orders/s  "
+          f"p50={statistics.median(latencies) * 1000:6.1f} ms  p99={p99 * 1000:6.1f} ms  "
+          f"failed={failures[0]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    db = Database()
+    dish_ids = [d['id'] for d in db.get_dishes()]
+
+    for writers in args.writers:
+        print(f"\n=== {writers} concurrent writer(s), {args.seconds:.0f}s each ===")
+        run('legacy', lambda d, q: legacy_add_order(db, d, q), dish_ids, writers, args.seconds)
+        run('batched', db.add_order, dish_ids, writers, args.seconds)
+
+
+if __name__ == '__main__':
+    main()
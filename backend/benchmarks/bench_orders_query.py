@@ -0,0 +1,141 @@
+"""Query-plan and timing benchmark for the per-day orders queries.
+
+Seeds a throwaway database (DB_CONFIG['database'] + '_bench') with N orders
+spread over D days, then for each target size prints EXPLAIN output and the
+median latency of:
+
+  * the legacy   WHERE DATE(o.date) = %s       filter (function on the column)
+  * the current  WHERE o.date >= %s AND < %s   range filter
+  * the daily GROUP BY aggregate, with and without idx_orders_report
+
+Usage (from backend/):
+    python benchmarks/bench_orders_query.py --sizes 1000000 10000000 --days 730
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config import DB_CONFIG  # noqa: E402
+
+DB_CONFIG['database'] = DB_CONFIG['database'] + '_bench'
+
+from database import Database, _day_bounds  # noqa: E402
+
+LEGACY_ORDERS_SQL = """
+    SELECT o.id, o.dish_id, o.quantity, o.order_time, o.date,
+           d.name AS dish_name, d.price, d.ingredients
+      FROM orders o
+      JOIN dishes d ON o.dish_id = d.id
+     WHERE DATE(o.date) = %s
+     ORDER BY o.order_time DESC"""
+
+RANGE_ORDERS_SQL = """
+    SELECT o.id, o.dish_id, o.quantity, o.order_time, o.date,
+           d.name AS dish_name, d.price, d.ingredients
+      FROM orders o
+      JOIN dishes d ON o.dish_id = d.id
+     WHERE o.date >= %s AND o.date < %s
+     ORDER BY o.order_time DESC"""
+
+
+def seed(db: Database, target: int, days: int, batch: int = 20000):
+    """Top the orders table up to `target` rows spread evenly over `days` days."""
+    have = db.execute_query("SELECT COUNT(*) AS n FROM orders", fetch_one=True)['n']
+    if have >= target:
+        return
+    dish_ids = [d['id'] for d in db.get_dishes()]
+    first = date.today() - timedelta(days=days - 1)
+    conn = db._new_connection()
+    cursor = conn.cursor()
+    print(f"Seeding {target - have:,} orders ...", flush=True)
+    started = time.perf_counter()
+    remaining = target - have
+    while remaining > 0:
+        rows = []
+        for _ in range(min(batch, remaining)):
+            day = first + timedelta(days=random.randrange(days))
+            when = datetime.combine(day, datetime.min.time()) + timedelta(
+                minutes=random.randrange(10 * 60, 23 * 60))
+            rows.append((random.choice(dish_ids), random.randint(1, 3), when, day))
+        cursor.executemany(
+            "INSERT INTO orders (dish_id, quantity, order_time, date) VALUES (%s, %s, %s, %s)",
+            rows,
+        )
+        conn.commit()
+        remaining -= len(rows)
+    cursor.close()
+    conn.close()
+    print(f"  seeded in {time.perf_counter() - started:.1f}s")
+
+
+def has_index(db: Database, name: str) -> bool:
+    rows = db.execute_query("SHOW INDEX FROM orders WHERE Key_name = %s", (name,), fetch_all=True)
+    return bool(rows)
+
+
+def explain(db: Database, sql: str, params) -> str:
+    rows = db.execute_query("EXPLAIN " + sql, params, fetch_all=True) or []
+    return '\n'.join(
+        f"    {r['table']:<6} type={r['type']:<6} key={r['key']!s:<18} "
+        f"rows={r['rows']!s:<10} extra={r['Extra']}"
+        for r in rows
+    )
+
+
+def timed(db: Database, sql: str, params, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        db.execute_query(sql, params, fetch_all=True)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def run(db: Database, day: str, repeat: int):
+    cases = [
+        ('orders, DATE(o.date) = d', LEGACY_ORDERS_SQL, (day,)),
+        ('orders, range on o.date',  RANGE_ORDERS_SQL, _day_bounds(day)),
+        ('daily GROUP BY aggregate', Database._DAILY_AGGREGATES_SQL, _day_bounds(day)),
+    ]
+    for label, sql, params in cases:
+        print(f"  {label}: median {timed(db, sql, params, repeat):.1f} ms")
+        print(explain(db, sql, params))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    db  = Database()
+    day = (date.today() - timedelta(days=1)).isoformat()
+
+    for size in sorted(args.sizes):
+        seed(db, size, args.days)
+        db.execute_query("ANALYZE TABLE orders", fetch_all=True)
+        print(f"\n=== {size:,} orders, probing {day} ===")
+
+        print("with idx_orders_report:")
+        run(db, day, args.repeat)
+
+        # Invisible indexes need MySQL 8; on MariaDB this step is skipped.
+        hidden = has_index(db, 'idx_orders_report') and db.execute_query(
+            "ALTER TABLE orders ALTER INDEX idx_orders_report INVISIBLE") is not None
+        if hidden:
+            try:
+                print("without idx_orders_report (invisible):")
+                run(db, day, args.repeat)
+            finally:
+                db.execute_query("ALTER TABLE orders ALTER INDEX idx_orders_report VISIBLE")
+
+
+if __name__ == '__main__':
+    main()
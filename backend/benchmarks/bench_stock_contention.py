@@ -0,0 +1,140 @@
+"""Oversell and contention under parallel writers, with and without stock reservation.
+
+N writer threads each place --orders single orders (Database.add_order)
+against a small menu whose stock is set to --stock, so ingredients run out
+mid-run and every writer contends for the same few ingredient rows. Each
+write that fails with a database error (deadlock, lock wait timeout, SQLite
+busy) is retried up to --retries times. Runs once per mode:
+
+  clamp    - ORDER_CONFIG['reserve_stock'] off: stock clamps at 0
+  reserve  - on: rows locked in id order, uncovered orders raise OutOfStock
+
+and reports throughput, p50/p99 latency, committed/rejected orders, retries
+(and how many were deadlocks) and how much stock the committed orders
+oversold: recipe usage beyond the starting stock, which reserve must keep
+at zero.
+
+Uses a SQLite file by default, or a throwaway MySQL database
+(DB_CONFIG['database'] + '_bench') with --mysql; row locks and deadlocks
+only mean something on MySQL.
+
+Usage (from backend/):
+    python benchmarks/bench_stock_contention.py --mysql --writers 4 16 64 --orders 200
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config import DB_CONFIG  # noqa: E402
+
+DB_CONFIG['pool_size'] = 128
+
+from backends import MySQLBackend, SQLiteBackend  # noqa: E402
+from database import Database, OutOfStock  # noqa: E402
+
+
+def open_database(args) -> Database:
+    if args.mysql:
+        config = dict(DB_CONFIG, database=DB_CONFIG['database'] + '_bench')
+        return Database(backend=MySQLBackend(config))
+    return Database(backend=SQLiteBackend(args.sqlite))
+
+
+def reset_stock(db: Database, stock: float):
+    db.execute_query("UPDATE ingredients SET stock_quantity = %s", (stock,), versions=('ingredients',))
+    db.invalidate_cache('ingredients')
+
+
+def run(db: Database, mode: str, writers: int, args) -> dict:
+    reset_stock(db, args.stock)
+    db.reserve_stock = mode == 'reserve'
+    recipes  = db.get_recipe_index()
+    dish_ids = recipes.dish_ids
+    lock     = threading.Lock()
+    totals   = {'committed': 0, 'rejected': 0, 'retries': 0, 'failed': 0}
+    latencies, used = [], {}
+
+    def worker(seed: int):
+        rng = random.Random(seed)
+        mine, counts, usage = [], dict.fromkeys(totals, 0), {}
+        for _ in range(args.orders):
+            dish_id, quantity = rng.choice(dish_ids), rng.randint(1, 3)
+            started = time.perf_counter()
+            for attempt in range(args.retries + 1):
+                try:
+                    ok = db.add_order(dish_id, quantity)
+                except OutOfStock:
+                    counts['rejected'] += 1
+                    break
+                if ok:
+                    counts['committed'] += 1
+                    for name, _, amount in recipes.lines[dish_id]:
+                        usage[name] = usage.get(name, 0.0) + amount * quantity
+                    break
+                if attempt < args.retries:
+                    counts['retries'] += 1
+            else:
+                counts['failed'] += 1
+            mine.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(mine)
+            for key, value in counts.items():
+                totals[key] += value
+            for name, amount in usage.items():
+                used[name] = used.get(name, 0.0) + amount
+
+    log = io.StringIO()
+    threads = [threading.Thread(target=worker, args=(args.seed + n,)) for n in range(writers)]
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(log):   # add_order prints each database error
+        for t in threads: t.start()
+        for t in threads: t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        **totals,
+        'deadlocks': sum('deadlock' in line.lower() for line in log.getvalue().splitlines()),
+        'orders_per_s': len(latencies) / elapsed,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000,
+        'oversold': sum(max(0.0, amount - args.stock) for amount in used.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sqlite', default='bench_contention.db', help="SQLite file (or ':memory:')")
+    parser.add_argument('--mysql', action='store_true', help="use MySQL (DB_CONFIG) instead of SQLite")
+    parser.add_argument('--writers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--orders', type=int, default=200, help='orders placed by each writer')
+    parser.add_argument('--stock', type=float, default=20.0, help='starting stock of every ingredient')
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    db = open_database(args)
+    print(f"\n{'mode':<8} {'writers':>7} {'orders/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'committed':>9} "
+          f"{'rejected':>8} {'retries':>7} {'deadlocks':>9} {'failed':>6} {'oversold':>9}")
+    try:
+        for writers in args.writers:
+            for mode in ('clamp', 'reserve'):
+                r = run(db, mode, writers, args)
+                print(f"{mode:<8} {writers:>7} {r['orders_per_s']:>9.1f} {r['p50_ms']:>8.2f} "
+                      f"{r['p99_ms']:>8.2f} {r['committed']:>9} {r['rejected']:>8} {r['retries']:>7} "
+                      f"{r['deadlocks']:>9} {r['failed']:>6} {r['oversold']:>9.2f}")
+    finally:
+        reset_stock(db, 100.0)
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
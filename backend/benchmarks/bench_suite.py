@@ -0,0 +1,212 @@
+"""Latency and memory benchmarks for ingest, reports, analytics and CSV export.
+
+Generates a synthetic workload (workload.py) into a SQLite file (default) or
+a throwaway MySQL database (DB_CONFIG['database'] + '_bench', --mysql), then
+times each case `--repeat` times after one warm-up call and reports p50, p95,
+p99 and max latency. Each case then runs once more under tracemalloc for its
+peak Python allocation.
+
+--out writes the results as JSON; --baseline compares against an earlier
+--out file and exits non-zero when a case's p50, p95 or peak memory grew by
+more than --threshold (default 25%), so a regression can fail CI.
+
+Usage (from backend/):
+    python benchmarks/bench_suite.py --days 7 --dishes 200 --orders-per-day 100000
+    python benchmarks/bench_suite.py --out base.json
+    python benchmarks/bench_suite.py --baseline base.json --cases report. export.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config import DB_CONFIG  # noqa: E402
+
+from backends import MySQLBackend, SQLiteBackend  # noqa: E402
+from database import Database  # noqa: E402
+from analytics import Analytics  # noqa: E402
+from report_csv import iter_report_csv  # noqa: E402
+import workload  # noqa: E402
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+def open_database(args) -> Database:
+    if args.mysql:
+        config = dict(DB_CONFIG, database=DB_CONFIG['database'] + '_bench')
+        return Database(backend=MySQLBackend(config))
+    return Database(backend=SQLiteBackend(args.sqlite))
+
+
+def ensure_workload(db: Database, args) -> dict:
+    """Generate the workload unless a previous run already did (same --sqlite file)."""
+    end   = date.today()
+    first = end - timedelta(days=args.days - 1)
+    row = db.execute_query(
+        "SELECT COUNT(*) AS n FROM orders WHERE date >= %s", (first.isoformat(),), fetch_one=True)
+    if row and row['n'] >= args.days * args.orders_per_day // 2:
+        dish_ids = [d['id'] for d in db.get_dishes() if d['name'].startswith(workload.DISH_PREFIX)]
+        print(f"Reusing {row['n']:,} existing orders.")
+        return {'start': first.isoformat(), 'end': end.isoformat(), 'dish_ids': dish_ids}
+    print("Generating workload ...")
+    return workload.generate(db, days=args.days, dishes=args.dishes,
+                             orders_per_day=args.orders_per_day, seed=args.seed)
+
+
+def drain(chunks) -> int:
+    return sum(len(c) for c in chunks)
+
+
+def build_cases(db: Database, analytics: Analytics, data: dict, args):
+    """(name, callable, repeat) for every case. Heavy cases run fewer times."""
+    dish_ids  = data['dish_ids']
+    start     = data['start']
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    today     = date.today().isoformat()
+    heavy     = max(3, args.repeat // 5)
+
+    def bulk_batch():
+        now = datetime.now().isoformat()
+        return [{'dish_id': random.choice(dish_ids), 'quantity': 1, 'order_time': now,
+                 'idempotency_key': uuid.uuid4().hex} for _ in range(args.bulk_size)]
+
+    def csv_daily(details: bool):
+        return drain(iter_report_csv(
+            analytics.download_report(yesterday),
+            title='FOOD SALES ANALYTICS — DAILY REPORT',
+            date_label=['Date', yesterday],
+            period=f"{yesterday} 00:00 – 23:59",
+            orders=db.iter_orders(yesterday, yesterday) if details else None,
+        ))
+
+    def csv_range():
+        report_data = analytics.download_range_report(start, today)
+        return drain(iter_report_csv(
+            report_data,
+            title='FOOD SALES ANALYTICS — DATE RANGE REPORT',
+            date_label=['Date Range', f"{start} to {today}"],
+            period=f"{start} 00:00 – {today} 23:59",
+            series=report_data['series'],
+        ))
+
+    return [
+        ('ingest.add_order',          lambda: db.add_order(random.choice(dish_ids), 1), args.repeat),
+        (f'ingest.bulk_{args.bulk_size}', lambda: db.add_orders_bulk(bulk_batch()), args.repeat),
+        ('report.daily_rollup',       lambda: analytics.generate_daily_report(yesterday), args.repeat),
+        ('report.daily_stored',       lambda: analytics.get_or_generate_report(yesterday), args.repeat),
+        ('report.daily_from_orders',  lambda: analytics.generate_report_from_orders(yesterday), heavy),
+        ('report.range',              lambda: analytics.get_range_report(start, today), args.repeat),
+        ('orders.by_date',            lambda: db.get_orders_by_date(yesterday), heavy),
+        ('orders.page',               lambda: db.get_orders_page(today, limit=50), args.repeat),
+        ('analytics.today',           lambda: analytics.get_today_analytics(), args.repeat),
+        ('export.csv_daily',          lambda: csv_daily(False), args.repeat),
+        ('export.csv_daily_details',  lambda: csv_daily(True), heavy),
+        ('export.csv_range',          csv_range, args.repeat),
+    ]
+
+
+def measure(fn, repeat: int) -> dict:
+    fn()  # warm-up: caches, statement preparation
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ms = [s * 1000 for s in samples]
+    return {
+        'runs': repeat,
+        'p50_ms': round(percentile(ms, 50), 3),
+        'p95_ms': round(percentile(ms, 95), 3),
+        'p99_ms': round(percentile(ms, 99), 3),
+        'max_ms': round(max(ms), 3),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Cases whose p50/p95/peak memory regressed past `threshold`."""
+    regressions = []
+    for name, now in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'peak_kib'):
+            # Ignore noise on sub-millisecond / tiny-allocation cases.
+            floor = 1.0 if metric.endswith('_ms') else 64.0
+            if now[metric] > max(before[metric], floor) * (1 + threshold):
+                regressions.append(f"{name} {metric}: {before[metric]} -> {now[metric]}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sqlite', default='bench_suite.db', help="SQLite file (or ':memory:')")
+    parser.add_argument('--mysql', action='store_true', help="use MySQL (DB_CONFIG) instead of SQLite")
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--dishes', type=int, default=200)
+    parser.add_argument('--orders-per-day', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--bulk-size', type=int, default=500)
+    parser.add_argument('--cases', nargs='*', default=[], help='only cases starting with these prefixes')
+    parser.add_argument('--out', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='compare against an earlier --out file')
+    parser.add_argument('--threshold', type=float, default=0.25)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    db = open_database(args)
+    analytics = Analytics(db)
+    data = ensure_workload(db, args)
+
+    results = {}
+    print(f"\n{'case':<28} {'runs':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'max ms':>9} {'peak KiB':>10}")
+    for name, fn, repeat in build_cases(db, analytics, data, args):
+        if args.cases and not name.startswith(tuple(args.cases)):
+            continue
+        with contextlib.redirect_stdout(io.StringIO()):  # silence per-call progress prints
+            r = measure(fn, repeat)
+        results[name] = r
+        print(f"{name:<28} {r['runs']:>5} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+              f"{r['p99_ms']:>9.2f} {r['max_ms']:>9.2f} {r['peak_kib']:>10.1f}")
+    db.close()
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({'backend': 'mysql' if args.mysql else 'sqlite', 'days': args.days,
+                       'dishes': args.dishes, 'orders_per_day': args.orders_per_day,
+                       'results': results}, f, indent=2)
+        print(f"\nResults written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f)['results'], args.threshold)
+        if regressions:
+            print(f"\nRegressions beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""Requests/sec of the production server (gunicorn + wsgi.py) by worker count.
+
+Starts `gunicorn -c gunicorn.conf.py` once per worker count against a
+SQLite file (no MySQL needed) holding the synthetic workload (workload.py,
+as bench_suite.py generates it; reused on later runs), drives it with
+concurrent keep-alive clients for a fixed time and reports throughput and
+latency. The mix is what open dashboards generate plus a trickle of orders:
+
+    GET  /api/analytics/today?fields=today
+    GET  /api/ingredients
+    GET  /api/orders?limit=10
+    POST /api/orders                         (--write-ratio of requests)
+
+Clients send no If-None-Match by default, so every request does the full
+work; --etag makes them revalidate the way script.js does.
+
+Usage (from backend/):
+    python benchmarks/loadtest.py --workers 1 2 4 --clients 32 --seconds 15
+    python benchmarks/loadtest.py --days 28 --orders-per-day 20000
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+READS   = ['/api/analytics/today?fields=today', '/api/ingredients', '/api/orders?limit=10']
+
+
+def sqlite_app():
+    """gunicorn app factory: the app as wsgi.py wires it, over the SQLite
+    file prepare() seeded instead of MySQL."""
+    from config import DB_CONFIG
+
+    DB_CONFIG['backend']     = 'sqlite'
+    DB_CONFIG['sqlite_path'] = os.environ['LOADTEST_SQLITE']
+    from wsgi import app
+    return app
+
+
+def prepare(args) -> list:
+    """Create the schema and workload in args.sqlite unless an earlier run
+    did, and restock it so orders never fail for stock. Returns the menu's
+    dish ids."""
+    from backends import SQLiteBackend
+    from bench_suite import ensure_workload
+    from database import Database
+
+    db = Database(backend=SQLiteBackend(args.sqlite))
+    try:
+        data = ensure_workload(db, args)
+        db.execute_query("UPDATE ingredients SET stock_quantity = %s", (1e9,),
+                         versions=('ingredients',))
+        return data['dish_ids']
+    finally:
+        db.close()
+
+
+def start_server(workers: int, threads: int, port: int, sqlite: str) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+         '--pythonpath', 'benchmarks', '--log-level', 'warning',
+         '-w', str(workers), '--threads', str(threads), '-b', f'127.0.0.1:{port}',
+         'loadtest:sqlite_app()'],
+        cwd=BACKEND,
+        env={**os.environ, 'LOADTEST_SQLITE': sqlite},
+        stdout=subprocess.DEVNULL,   # per-request report logging
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/health')
+            if conn.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f"gunicorn did not come up on port {port}")
+
+
+def stop_server(server: subprocess.Popen):
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(timeout=40)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+def client_process(port: int, threads: int, seconds: float, write_ratio: float, etag: bool,
+                   dish_ids: list):
+    """One load-generating process running `threads` keep-alive clients.
+    Returns (latencies, errors)."""
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop = time.monotonic() + seconds
+
+    def client():
+        conn  = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        tags  = {}
+        mine, failed = [], 0
+        while time.monotonic() < stop:
+            if random.random() < write_ratio:
+                method, path, headers = 'POST', '/api/orders', {'Content-Type': 'application/json'}
+                body = json.dumps({'dish_id': random.choice(dish_ids), 'quantity': random.randint(1, 3)})
+            else:
+                method, path, body = 'GET', random.choice(READS), None
+                headers = {'If-None-Match': tags[path]} if etag and path in tags else {}
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            mine.append(time.perf_counter() - started)
+            if response.status >= 400:
+                failed += 1
+            elif method == 'GET' and response.getheader('ETag'):
+                tags[path] = response.getheader('ETag')
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    pool = [threading.Thread(target=client) for _ in range(threads)]
+    for t in pool: t.start()
+    for t in pool: t.join()
+    return latencies, errors[0]
+
+
+def run(workers: int, args, port: int, dish_ids: list):
+    server = start_server(workers, args.threads, port, args.sqlite)
+    try:
+        per_process = max(1, args.clients // args.client_procs)
+        with multiprocessing.Pool(args.client_procs) as procs:
+            results = procs.starmap(client_process, [
+                (port, per_process, args.seconds, args.write_ratio, args.etag, dish_ids)
+            ] * args.client_procs)
+    finally:
+        stop_server(server)
+
+    latencies = sorted(l for result, _ in results for l in result)
+    errors    = sum(e for _, e in results)
+    if not latencies:
+        print(f"  workers={workers:<3} no successful requests ({errors} errors)")
+        return
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+    print(f"  workers={workers:<3} {len(latencies) / args.seconds:8.1f} req/s  "
+          f"p50={p50 * 1000:6.1f} ms  p99={p99 * 1000:6.1f} ms  errors={errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=16, help='gunicorn threads per worker')
+    parser.add_argument('--clients', type=int, default=32, help='concurrent keep-alive clients')
+    parser.add_argument('--client-procs', type=int, default=4, help='processes generating load')
+    parser.add_argument('--seconds', type=float, default=15)
+    parser.add_argument('--write-ratio', type=float, default=0.05)
+    parser.add_argument('--sqlite', default='loadtest.db', help='SQLite file holding the workload')
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--dishes', type=int, default=40)
+    parser.add_argument('--orders-per-day', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--etag', action='store_true', help='revalidate with If-None-Match')
+    parser.add_argument('--port', type=int, default=5055)
+    args = parser.parse_args()
+    args.sqlite = os.path.abspath(args.sqlite)   # gunicorn runs from backend/
+
+    dish_ids = prepare(args)
+    print(f"{os.cpu_count()} CPU(s); {args.clients} clients, "
+          f"{args.write_ratio:.0%} writes, SQLite {args.sqlite}")
+    for workers in args.workers:
+        run(workers, args, args.port, dish_ids)
+
+
+if __name__ == '__main__':
+    main()
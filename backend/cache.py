@@ -0,0 +1,59 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class TTLCache:
+    """Small thread-safe key/value cache with per-entry expiry and explicit invalidation.
+
+    Loaders run outside the lock. Each key carries a generation number that
+    invalidate() bumps, so a load that started before an invalidation is
+    returned to its caller but never stored over the newer state.
+    """
+
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = float(ttl)
+        self._lock    = threading.Lock()
+        self._entries = {}   # key -> (expires_at, value)
+        self._gen     = {}   # key -> generation
+        self._stats   = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get(self, key: str, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """Return the cached value for `key`, calling `loader` on a miss.
+
+        A loader result of None is treated as a failed load and not cached.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._stats['hits'] += 1
+                return entry[1]
+            self._stats['misses'] += 1
+            gen = self._gen.get(key, 0)
+
+        value = loader()
+        if value is None:
+            return None
+
+        with self._lock:
+            if self._gen.get(key, 0) == gen:
+                self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        return value
+
+    def invalidate(self, *keys: str):
+        """Drop the given keys, or everything when called without arguments."""
+        with self._lock:
+            for key in (keys or set(self._entries) | set(self._gen)):
+                self._entries.pop(key, None)
+                self._gen[key] = self._gen.get(key, 0) + 1
+            self._stats['invalidations'] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'hit_rate': round(self._stats['hits'] / total, 3) if total else 0.0,
+                'entries': len(self._entries),
+            }
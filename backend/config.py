@@ -1,9 +1,97 @@
 # Database configuration for XAMPP MySQL
 DB_CONFIG = {
+    'backend': 'mysql',   # 'mysql', or 'sqlite' for a serverless single-file install
+    'sqlite_path': 'food_analytics.db',  # Used when backend is 'sqlite'
     'host': 'localhost',
     'user': 'root',       # Default XAMPP MySQL username
     'password': '',       # Default XAMPP MySQL password is empty
     'database': 'food_analytics',
     'port': 3306,
     'connection_timeout': 30,
-}
\ No newline at end of file
+    'pool_size': 5,        # Max connections held open per process
+    'pool_timeout': 10,    # Seconds to wait for a free connection
+    'pool_recycle': 1800,  # Close connections older than this (seconds); keep below MySQL wait_timeout
+}
+
+# In-process read cache for menu and stock lookups (seconds). Writes made
+# through Database invalidate immediately; the TTL bounds staleness from
+# changes made elsewhere (other workers, manual SQL).
+CACHE_CONFIG = {
+    'dishes_ttl': 300,
+    'ingredients_ttl': 30,
+    'unknown_dish_reload': 5,  # Min seconds between menu reloads forced by an unknown dish_id
+}
+
+# Order ingestion limits.
+ORDER_CONFIG = {
+    'bulk_max_rows': 5000,     # Max orders accepted by one POST /api/orders/bulk
+    'idempotency_key_max': 64, # Matches orders.idempotency_key VARCHAR(64)
+    'page_default': 50,        # GET /api/orders page size when ?limit= is absent
+    'page_max': 500,           # Largest ?limit= accepted
+    'reserve_stock': False,    # Reject orders stock can't cover (409) instead of clamping stock at 0
+}
+
+# Date-range reports (/api/analytics/range, /api/reports/download).
+ANALYTICS_CONFIG = {
+    'max_range_days': 366,     # Longest ?start..?end span accepted; longer spans get 400
+}
+
+# Order write path. 'sync' commits each order in its own transaction;
+# 'group' batches concurrent orders into one commit and answers once it lands;
+# 'queue' answers 202 as soon as the order is in the local WAL file.
+WRITE_QUEUE_CONFIG = {
+    'mode': 'sync',
+    'flush_interval_ms': 5,    # Max time an order waits for its batch to fill
+    'max_batch': 500,          # Orders per group commit
+    'max_depth': 50000,        # Queue length at which new orders get 503
+    'wal_path': 'order_wal.jsonl',
+    'wal_fsync': True,         # fsync each WAL append ('queue' mode)
+    'wal_compact_bytes': 1 << 20,  # Settled WAL bytes that trigger a compaction under sustained load
+    'group_wait_timeout': 5,   # Seconds a 'group' request waits for its commit before answering 503
+}
+
+# Live dashboard updates over Server-Sent Events (/api/stream).
+LIVE_CONFIG = {
+    'broadcast_interval': 1.0,  # Min seconds between recomputed report/inventory pushes
+    'heartbeat': 15,            # Seconds between keep-alive comments on idle streams
+    'max_queue': 256,           # Buffered messages per client before it is resynced
+}
+
+# Serving. `python app.py` is the single-process debug server and creates the
+# schema on start; production runs `gunicorn -c gunicorn.conf.py wsgi:app`,
+# whose wsgi.py turns init_schema off and multiprocess on.
+SERVER_CONFIG = {
+    'init_schema': True,        # Create/migrate tables when app.py is imported
+    'multiprocess': False,      # Several worker processes share this database
+    'bind': '0.0.0.0:5000',
+    'workers': 4,               # Processes; roughly one per CPU core
+    'threads': 16,              # Threads per worker; each open /api/stream holds one
+    'graceful_timeout': 30,     # Seconds a stopping worker gets to finish in-flight requests
+    'drain_timeout': 10,        # Of those, seconds left for flushing queued order writes
+}
+
+# Sales history behind /api/analytics/trend (history.py).
+HISTORY_CONFIG = {
+    'sync_interval': 60,        # Seconds between checks for newly closed or changed days
+    'max_periods': 1000,        # Most periods one trend query returns; longer spans get 400
+}
+
+# Stock forecasting and reorder suggestions (forecast.py, /api/ingredients/forecast).
+FORECAST_CONFIG = {
+    'lookback_days': 28,        # Closed days of demand behind the hour-of-week profile
+    'horizon_days': 14,         # How far ahead stockouts are projected hour by hour
+    'lead_time_days': 2,        # Supplier delivery time
+    'review_days': 7,           # Days of demand an order should cover beyond the lead time
+    'service_z': 1.65,          # Safety-stock z-score (1.65 ~ 95% no stockout in lead time)
+    'refresh_interval': 60,     # Seconds a computed forecast is served before recomputing
+}
+
+# Portions makeable from current stock (availability.py, /api/dishes/availability).
+AVAILABILITY_CONFIG = {
+    'sync_interval': 30,        # Seconds between stock reloads (catches other workers' orders)
+}
+
+# Request/query metrics served at /api/metrics (Prometheus text format).
+METRICS_CONFIG = {
+    'slow_query_ms': 500,       # Log execute_query calls slower than this; 0 disables
+}
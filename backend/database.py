@@ -1,128 +1,114 @@
-import mysql.connector
-from mysql.connector import Error
 import json
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-from models import Dish, Order, Ingredient, DailyReport
-from config import DB_CONFIG
 import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Iterator, Optional
+from models import Dish, Order, Ingredient, DailyReport, REPORT_FORMAT_VERSION
+from recipes import RecipeIndex, link_recipes, link_ingredient, rename_ingredient
+from aggregation import DayAggregate
+from migrations import apply_migrations
+from config import DB_CONFIG, CACHE_CONFIG, ORDER_CONFIG, LIVE_CONFIG, METRICS_CONFIG
+from cache import TTLCache
+from events import EventBus
+from pool import ConnectionPool, PoolTimeout
+from backends import DBError, StorageBackend, backend_from_config
+from metrics import QueryMetrics
+
+
+def _day_bounds(date: str) -> tuple:
+    """Half-open [date, date + 1 day) bounds for a sargable range predicate.
+
+    Filtering with DATE(col) = %s wraps the column in a function, which stops
+    MySQL from using any index on it; a plain range on the column does not.
+    """
+    start = datetime.strptime(str(date), '%Y-%m-%d').date()
+    try:
+        return start.isoformat(), (start + timedelta(days=1)).isoformat()
+    except OverflowError:
+        raise ValueError(f"date {start.isoformat()} is out of range") from None
+
+
+def _iso(value) -> str:
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+class OutOfStock(Exception):
+    """An order was rejected because stock can't cover it (reserve_stock mode)."""
+
+    def __init__(self, ingredients: List[str]):
+        super().__init__(f"insufficient stock: {', '.join(ingredients)}")
+        self.ingredients = ingredients
 
 
 class Database:
-    def __init__(self):
-        self.init_database()
+    def __init__(self, init_schema: bool = True, backend: StorageBackend = None):
+        """Open a connection pool for this process.
+
+        `backend` defaults to the one DB_CONFIG['backend'] names (MySQL or
+        SQLite; see backends.py). With `init_schema` the database, tables,
+        migrations and sample data are created first and missing rollups
+        backfilled. Production workers pass False and rely on
+        `python manage.py init-db` having run once.
+        """
+        self.backend = backend or backend_from_config()
+        self._cache = TTLCache()
+        self._seen_versions = {}
+        self._menu_rechecked_at = float('-inf')   # last reload forced by an unknown dish id
+        self.events = EventBus(max_queue=LIVE_CONFIG['max_queue'])
+        self.metrics = QueryMetrics(slow_query_ms=METRICS_CONFIG['slow_query_ms'])
+        self.reserve_stock = ORDER_CONFIG['reserve_stock']
+        if init_schema:
+            self.init_database()
+        self._pool = ConnectionPool(
+            self._new_connection,
+            size=DB_CONFIG.get('pool_size', 5),
+            timeout=DB_CONFIG.get('pool_timeout', 10),
+            recycle=DB_CONFIG.get('pool_recycle', 1800),
+        )
+        if init_schema:
+            self.backfill_rollups()
+
+    def close(self):
+        """Close every pooled connection (process shutdown)."""
+        self._pool.close_all()
+        self.backend.close()
 
     # ── CONNECTION ────────────────────────────────────────────────────────────
 
     def _new_connection(self):
-        """Open and return a brand-new connection. Never cached.
-        
-        Reusing a single persistent connection causes 'bytearray index out of
-        range' when MySQL silently drops the connection server-side (wait_timeout)
-        while is_connected() still returns True locally. Opening a fresh
-        connection per call eliminates this entirely.
-        """
-        max_retries = 3
-        retry_delay = 1
+        """Open and return a brand-new connection. Used as the pool's factory.
 
-        for attempt in range(max_retries):
-            try:
-                conn = mysql.connector.connect(
-                    host=DB_CONFIG['host'],
-                    user=DB_CONFIG['user'],
-                    password=DB_CONFIG['password'],
-                    database=DB_CONFIG['database'],
-                    port=DB_CONFIG['port'],
-                    connection_timeout=DB_CONFIG['connection_timeout'],
-                    autocommit=False,
-                )
-                return conn
-            except Error as e:
-                print(f"Connection attempt {attempt + 1} failed: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
-                else:
-                    print("Could not connect to database.")
-                    return None
+        Connections are reused through self._pool, which pings each one on
+        checkout and recycles it after DB_CONFIG['pool_recycle'] seconds, so a
+        socket MySQL dropped server-side (wait_timeout) is replaced instead of
+        failing with 'bytearray index out of range'.
+        """
+        return self.backend.connect()
 
     # ── INIT ──────────────────────────────────────────────────────────────────
 
-    def init_database(self):
-        """Create the database and all tables if they don't exist."""
+    def init_database(self) -> bool:
+        """Create the database and all tables if they don't exist, apply
+        migrations and insert the sample data. Returns False on failure."""
         conn = cursor = None
         try:
-            # Connect WITHOUT database so we can CREATE it if missing.
-            conn = mysql.connector.connect(
-                host=DB_CONFIG['host'],
-                user=DB_CONFIG['user'],
-                password=DB_CONFIG['password'],
-                port=DB_CONFIG['port'],
-                connection_timeout=DB_CONFIG['connection_timeout'],
-                autocommit=False,
-            )
+            conn = self.backend.open_for_init()
             cursor = conn.cursor()
-
-            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_CONFIG['database']}")
-            cursor.execute(f"USE {DB_CONFIG['database']}")
-
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS dishes (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    name VARCHAR(255) NOT NULL,
-                    price DECIMAL(10,2) NOT NULL,
-                    ingredients JSON NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS ingredients (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    name VARCHAR(255) NOT NULL UNIQUE,
-                    stock_quantity DECIMAL(10,2) NOT NULL,
-                    unit VARCHAR(50) NOT NULL,
-                    reorder_level DECIMAL(10,2) NOT NULL,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                        ON UPDATE CURRENT_TIMESTAMP
-                )
-            ''')
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS orders (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    dish_id INT NOT NULL,
-                    quantity INT NOT NULL,
-                    order_time DATETIME NOT NULL,
-                    date DATE NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (dish_id) REFERENCES dishes(id) ON DELETE CASCADE,
-                    INDEX idx_date (date),
-                    INDEX idx_order_time (order_time)
-                )
-            ''')
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS daily_reports (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    date DATE NOT NULL UNIQUE,
-                    total_sales DECIMAL(10,2) NOT NULL,
-                    total_orders INT NOT NULL,
-                    dishes_sold JSON NOT NULL,
-                    ingredients_used JSON NOT NULL,
-                    peak_hours JSON NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    INDEX idx_report_date (date)
-                )
-            ''')
+            for statement in self.backend.schema():
+                cursor.execute(statement)
 
             conn.commit()
-            print("Database tables ready.")
+            version = apply_migrations(conn, self.backend.name, self.backend.baseline_version)
+            print(f"Database tables ready (schema version {version}).")
             self._insert_sample_data(cursor)
             conn.commit()
+            return True
 
-        except Error as e:
+        except DBError as e:
             print(f"Error initialising database: {e}")
             if conn:
                 try: conn.rollback()
                 except: pass
+            return False
         finally:
             if cursor: cursor.close()
             if conn and conn.is_connected(): conn.close()
@@ -168,6 +154,7 @@ class Database:
                 "INSERT INTO ingredients (name, stock_quantity, unit, reorder_level) VALUES (%s, %s, %s, %s)",
                 ingredients,
             )
+            link_recipes(cursor)
 
             today     = datetime.now().date()
             yesterday = today - timedelta(days=1)
@@ -187,59 +174,149 @@ class Database:
                             date,
                             datetime.min.time().replace(hour=hour, minute=minute),
                         )
-                        orders_data.append((dish_id, qty, order_time, date))
+                        orders_data.append((dish_id, qty, order_time, date, dishes[dish_id - 1][1]))
 
             cursor.executemany(
-                "INSERT INTO orders (dish_id, quantity, order_time, date) VALUES (%s, %s, %s, %s)",
+                """INSERT INTO orders (dish_id, quantity, order_time, date, unit_price)
+                   VALUES (%s, %s, %s, %s, %s)""",
                 orders_data,
             )
             print(f"Inserted {len(orders_data)} sample orders.")
 
-        except Error as e:
+        except DBError as e:
             print(f"Error inserting sample data: {e}")
 
     # ── GENERIC QUERY HELPER ─────────────────────────────────────────────────
 
-    def execute_query(self, query, params=None, fetch_one=False, fetch_all=False):
-        """Open a fresh connection, run one query, close the connection.
+    def pool_stats(self) -> Dict:
+        """Connection pool counters: in_use, idle, waits, recycles, stale, ..."""
+        return self._pool.stats()
+
+    def _acquire(self):
+        """Check a connection out of the pool, or return None if none is available."""
+        started = time.perf_counter()
+        try:
+            return self._pool.acquire()
+        except (PoolTimeout, ConnectionError, *DBError) as e:
+            print(f"Connection checkout failed: {e}")
+            return None
+        finally:
+            self.metrics.observe_acquire(time.perf_counter() - started)
+
+    def _release(self, conn, cursor=None):
+        """Close the cursor and hand the connection back to the pool."""
+        if cursor:
+            try: cursor.close()
+            except: pass
+        self._pool.release(conn)
+
+    def execute_query(self, query, params=None, fetch_one=False, fetch_all=False,
+                      versions=()):
+        """Borrow a pooled connection, run one query, return the connection.
+
+        The pool pre-pings connections on checkout, so stale sockets
+        ('bytearray index out of range') are replaced before they are used.
+        For writes, `versions` names data_versions counters to advance in the
+        same transaction.
 
-        A fresh connection per call is the simplest way to avoid stale-socket
-        errors ('bytearray index out of range') with mysql-connector-python.
+        Each call is timed (excluding checkout) into self.metrics with its
+        row count; see metrics.py.
         """
-        conn = self._new_connection()
+        conn = self._acquire()
         if conn is None:
             return None
 
-        cursor = None
+        cursor  = None
+        rows    = 0
+        failed  = False
+        started = time.perf_counter()
         try:
             cursor = conn.cursor(dictionary=True)
             cursor.execute(query, params or ())
 
             if fetch_one:
-                return cursor.fetchone()
+                row = cursor.fetchone()
+                rows = int(row is not None)
+                return row
             if fetch_all:
-                return cursor.fetchall()
+                result = cursor.fetchall()
+                rows = len(result)
+                return result
 
+            last_id = cursor.lastrowid
+            rows = max(cursor.rowcount, 0)
+            if versions:
+                self._bump_versions(cursor, *versions)
             conn.commit()
-            return cursor.lastrowid
+            return last_id
 
-        except Error as e:
+        except DBError as e:
+            failed = True
             print(f"Query error: {e}")
             try: conn.rollback()
             except: pass
             return None
         finally:
-            if cursor:
-                try: cursor.close()
-                except: pass
-            if conn and conn.is_connected():
-                conn.close()
+            self.metrics.observe_query(query, time.perf_counter() - started, rows, params, failed)
+            self._release(conn, cursor)
+
+    def execute_many(self, query, seq_params, versions=()) -> Optional[int]:
+        """Run one write for every parameter tuple in `seq_params` in a single
+        transaction (executemany), advancing `versions` as execute_query does.
+        Returns the number of rows affected, or None if it failed."""
+        seq_params = list(seq_params)
+        if not seq_params:
+            return 0
+        conn = self._acquire()
+        if conn is None:
+            return None
+
+        cursor  = None
+        rows    = 0
+        failed  = False
+        started = time.perf_counter()
+        try:
+            cursor = conn.cursor(dictionary=True)
+            cursor.executemany(query, seq_params)
+            rows = max(cursor.rowcount, 0)
+            if versions:
+                self._bump_versions(cursor, *versions)
+            conn.commit()
+            return rows
+
+        except DBError as e:
+            failed = True
+            print(f"Query error: {e}")
+            try: conn.rollback()
+            except: pass
+            return None
+        finally:
+            self.metrics.observe_query(query, time.perf_counter() - started, rows, seq_params[0], failed)
+            self._release(conn, cursor)
 
     # ── PUBLIC METHODS ────────────────────────────────────────────────────────
 
     def add_order(self, dish_id: int, quantity: int) -> bool:
-        """Insert an order and deduct ingredients from stock in one transaction."""
-        conn = self._new_connection()
+        """Insert an order, deduct ingredients from stock and update the daily
+        rollups in one transaction.
+
+        The dish is validated against the cached menu before anything is
+        written, and all of its ingredients are deducted by one UPDATE, so an
+        order costs a fixed number of round trips whatever its recipe size.
+
+        With `reserve_stock` the ingredient rows are locked and checked first
+        (see _reserve_stock), and an order stock can't cover raises
+        OutOfStock instead of clamping stock at 0.
+        """
+        dish = self.get_dish(dish_id)
+        if dish is None:
+            print(f"Dish {dish_id} not found — order rejected.")
+            return False
+        recipes = self.get_recipe_index()
+        if recipes is None:
+            return False
+
+        conn = self._acquire()
         if conn is None:
             return False
 
@@ -247,56 +324,707 @@ class Database:
         try:
             cursor = conn.cursor(dictionary=True)
             now = datetime.now()
+            hourly, usage, deductions = self._order_deltas([(dish, quantity, now)], recipes)
+            if self.reserve_stock:
+                short = self._reserve_stock(cursor, [(dish, quantity)], recipes)[0]
+                if short:
+                    conn.rollback()
+                    raise OutOfStock(short)
 
             cursor.execute(
-                "INSERT INTO orders (dish_id, quantity, order_time, date) VALUES (%s, %s, %s, %s)",
-                (dish_id, quantity, now, now.date().isoformat()),
+                """INSERT INTO orders (dish_id, quantity, order_time, date, unit_price)
+                   VALUES (%s, %s, %s, %s, %s)""",
+                (dish_id, quantity, now, now.date().isoformat(), dish['price']),
             )
+            order_id = cursor.lastrowid
+            self._deduct_stock(cursor, deductions)
+            self._bump_rollups(cursor, hourly, usage)
 
-            cursor.execute("SELECT ingredients FROM dishes WHERE id = %s", (dish_id,))
-            dish_row = cursor.fetchone()
-            if not dish_row:
-                conn.rollback()
-                print(f"Dish {dish_id} not found — order rolled back.")
-                return False
+            conn.commit()
+            self._commit_versions(conn, cursor, 'ingredients', f"orders:{now.date().isoformat()}")
+            self._cache.invalidate('ingredients')
+            self.events.notify('stock_deducted', {'deductions': deductions})
+            self.events.publish('orders', {'orders': [
+                self._order_event(order_id, dish, quantity, now),
+            ]})
+            return True
+
+        except DBError as e:
+            print(f"Error adding order: {e}")
+            try: conn.rollback()
+            except: pass
+            return False
+        finally:
+            self._release(conn, cursor)
+
+    def add_orders_bulk(self, orders: List[Dict]) -> Optional[Dict]:
+        """Insert a batch of orders in one transaction, e.g. a POS terminal's
+        offline backlog.
+
+        Each item is {dish_id, quantity, order_time?, idempotency_key?};
+        order_time is an ISO timestamp (default now). Dish ids are validated
+        with one query, rows are inserted with executemany, and ingredient
+        deductions and rollup changes are summed across the batch and applied
+        once. Items whose idempotency_key was already stored (or repeats
+        earlier in the batch) are reported as duplicates and not counted again.
+        With `reserve_stock`, items the remaining stock can't cover are
+        reported as errors (with 'out_of_stock' naming the ingredients) and
+        the rest of the batch goes ahead.
+
+        Returns {'created', 'duplicates', 'failed', 'results': [per-item]} or
+        None if the transaction failed as a whole.
+        """
+        now = datetime.now()
+        results = [None] * len(orders)
+        parsed  = []   # (index, dish_id, quantity, order_time, key)
+
+        for i, item in enumerate(orders):
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError('each order must be an object')
+                dish_id  = int(item['dish_id'])
+                quantity = int(item['quantity'])
+                if quantity < 1:
+                    raise ValueError("'quantity' must be at least 1")
+                when = item.get('order_time')
+                when = datetime.fromisoformat(when) if when else now
+                if when.tzinfo is not None or when > now:
+                    raise ValueError("'order_time' must be a local time not in the future")
+                key = item.get('idempotency_key')
+                if key is not None:
+                    key = str(key)
+                    if not key or len(key) > ORDER_CONFIG['idempotency_key_max']:
+                        raise ValueError('invalid idempotency_key')
+                parsed.append((i, dish_id, quantity, when, key))
+            except KeyError as e:
+                results[i] = {'index': i, 'status': 'error', 'error': f"'{e.args[0]}' is required"}
+            except (TypeError, ValueError) as e:
+                results[i] = {'index': i, 'status': 'error', 'error': str(e)}
+
+        recipes = self.get_recipe_index()
+        if recipes is None:
+            return None
+        conn = self._acquire()
+        if conn is None:
+            return None
+
+        cursor = None
+        try:
+            cursor = conn.cursor(dictionary=True)
 
-            dish_ingredients = json.loads(dish_row['ingredients'])
-            for ing_name, amount_per_unit in dish_ingredients.items():
-                total_deduction = amount_per_unit * quantity
+            dish_ids = sorted({p[1] for p in parsed})
+            dishes = {}
+            if dish_ids:
                 cursor.execute(
-                    "UPDATE ingredients SET stock_quantity = GREATEST(stock_quantity - %s, 0) WHERE name = %s",
-                    (total_deduction, ing_name),
+                    f"SELECT id, name, price, ingredients FROM dishes WHERE id IN ({', '.join(['%s'] * len(dish_ids))})",
+                    dish_ids,
                 )
+                dishes = {
+                    row['id']: {
+                        'id': row['id'],
+                        'name': row['name'],
+                        'price': float(row['price']),
+                        'ingredients': json.loads(row['ingredients']),
+                    }
+                    for row in cursor.fetchall()
+                }
+
+            keys = sorted({p[4] for p in parsed if p[4] is not None})
+            seen = set()
+            if keys:
+                # FOR UPDATE also gap-locks absent keys, so a concurrent retry
+                # of the same batch waits here instead of double-inserting.
+                cursor.execute(
+                    f"""SELECT idempotency_key FROM orders
+                         WHERE idempotency_key IN ({', '.join(['%s'] * len(keys))})
+                           FOR UPDATE""",
+                    keys,
+                )
+                seen = {row['idempotency_key'] for row in cursor.fetchall()}
+
+            accepted = []
+            for i, dish_id, quantity, when, key in parsed:
+                if dish_id not in dishes:
+                    results[i] = {'index': i, 'status': 'error', 'error': f"dish {dish_id} not found"}
+                elif key is not None and key in seen:
+                    results[i] = {'index': i, 'status': 'duplicate', 'idempotency_key': key}
+                else:
+                    if key is not None:
+                        seen.add(key)
+                    accepted.append((dishes[dish_id], quantity, when, key, i))
+                    results[i] = {'index': i, 'status': 'created'}
+
+            if accepted and self.reserve_stock:
+                shortages = self._reserve_stock(cursor, [(d, q) for d, q, _, _, _ in accepted], recipes)
+                covered = []
+                for item, short in zip(accepted, shortages):
+                    if short:
+                        i = item[4]
+                        results[i] = {'index': i, 'status': 'error', 'out_of_stock': short,
+                                      'error': str(OutOfStock(short))}
+                    else:
+                        covered.append(item)
+                accepted = covered
+
+            if accepted:
+                cursor.executemany(
+                    """INSERT INTO orders (dish_id, quantity, order_time, date, idempotency_key, unit_price)
+                       VALUES (%s, %s, %s, %s, %s, %s)""",
+                    [(d['id'], q, w, w.date().isoformat(), k, d['price']) for d, q, w, k, _ in accepted],
+                )
+                hourly, usage, deductions = self._order_deltas(
+                    [(d, q, w) for d, q, w, _, _ in accepted], recipes)
+                self._deduct_stock(cursor, deductions)
+                self._bump_rollups(cursor, hourly, usage)
+
+                # Backdated orders change days whose reports may already be final.
+                closed = sorted({w.date().isoformat() for _, _, w, _, _ in accepted} - {now.date().isoformat()})
+                self._invalidate_daily_reports(cursor, closed)
+
+            conn.commit()
+            if accepted:
+                self._commit_versions(conn, cursor, 'ingredients',
+                                      *{f"orders:{w.date().isoformat()}" for _, _, w, _, _ in accepted})
+                self._cache.invalidate('ingredients')
+                self.events.notify('stock_deducted', {'deductions': deductions})
+                # Newest last, capped: a 5000-row backlog upload shouldn't
+                # become a 5000-row message to every dashboard.
+                self.events.publish('orders', {
+                    'count': len(accepted),
+                    'orders': [self._order_event(None, d, q, w) for d, q, w, _, _ in accepted[-50:]],
+                })
+                for date in closed:
+                    self.events.notify('report_changed', {'date': date})
+
+        except DBError as e:
+            print(f"Error adding bulk orders: {e}")
+            try: conn.rollback()
+            except: pass
+            return None
+        finally:
+            self._release(conn, cursor)
+
+        statuses = [r['status'] for r in results]
+        return {
+            'created': statuses.count('created'),
+            'duplicates': statuses.count('duplicate'),
+            'failed': statuses.count('error'),
+            'results': results,
+        }
+
+    @staticmethod
+    def _order_event(order_id, dish: Dict, quantity: int, when: datetime) -> Dict:
+        """Same shape as get_orders_page() rows: the dish is referenced by id."""
+        return {
+            'id': order_id,
+            'dish_id': dish['id'],
+            'quantity': quantity,
+            'order_time': when.isoformat(),
+            'date': when.date().isoformat(),
+            'unit_price': dish['price'],
+        }
+
+    def _reserve_stock(self, cursor, items, recipes: RecipeIndex) -> List[List[str]]:
+        """Lock the stock rows that (dish, quantity) `items` draw on and check
+        them against what earlier items already took. Returns, per item, the
+        ingredients it is short of ([] when covered); a recipe ingredient
+        that isn't stocked at all is always short.
+
+        Rows are locked in id order with one SELECT ... FOR UPDATE, so
+        concurrent reservations queue on the first shared ingredient instead
+        of deadlocking. Runs on the caller's cursor/transaction; the locks
+        are held until it commits the deduction (or rolls back).
+        """
+        lines = [recipes.dish_lines(dish) for dish, _ in items]
+        ids = sorted({i for dish_lines in lines for _, i, _ in dish_lines if i is not None})
+        stock = {}
+        if ids:
+            cursor.execute(
+                f"""SELECT id, stock_quantity FROM ingredients
+                     WHERE id IN ({', '.join(['%s'] * len(ids))})
+                     ORDER BY id FOR UPDATE""",
+                ids,
+            )
+            stock = {row['id']: float(row['stock_quantity']) for row in cursor.fetchall()}
+
+        shortages = []
+        for (_, quantity), dish_lines in zip(items, lines):
+            need  = [(name, i, amount * quantity) for name, i, amount in dish_lines]
+            short = [name for name, i, amount in need
+                     if i not in stock or stock[i] + 1e-9 < amount]
+            if not short:
+                for _, i, amount in need:
+                    stock[i] -= amount
+            shortages.append(short)
+        return shortages
+
+    def _deduct_stock(self, cursor, deductions: Dict[int, float]):
+        """Subtract {ingredient_id: amount} from stock in a single primary-key
+        statement, clamping at 0. Runs on the caller's cursor/transaction."""
+        if not deductions:
+            return
+        ids = sorted(deductions)
+        cases = ' '.join(['WHEN %s THEN %s'] * len(ids))
+        params = [v for ingredient_id in ids for v in (ingredient_id, deductions[ingredient_id])]
+        cursor.execute(
+            f"""UPDATE ingredients
+                   SET stock_quantity = GREATEST(stock_quantity - CASE id {cases} ELSE 0 END, 0)
+                 WHERE id IN ({', '.join(['%s'] * len(ids))})""",
+            (*params, *ids),
+        )
+
+    # ── DAILY ROLLUPS ─────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _order_deltas(orders, recipes: RecipeIndex) -> tuple:
+        """Fold (dish, quantity, order_time) triples into the changes they cause:
+
+        hourly     {(date, dish_id, hour): [quantity, order_count, sales]}
+        usage      {(date, ingredient name): amount}
+        deductions {ingredient_id: amount}   (stock to subtract, all dates;
+                                              unstocked ingredients have none)
+        """
+        hourly, usage, deductions = {}, {}, {}
+        for dish, quantity, when in orders:
+            date = when.date().isoformat()
+            cell = hourly.setdefault((date, dish['id'], when.hour), [0, 0, 0.0])
+            cell[0] += quantity
+            cell[1] += 1
+            cell[2] += dish['price'] * quantity
+            for name, ingredient_id, amount in recipes.dish_lines(dish):
+                usage[(date, name)] = usage.get((date, name), 0.0) + amount * quantity
+                if ingredient_id is not None:
+                    deductions[ingredient_id] = deductions.get(ingredient_id, 0.0) + amount * quantity
+        return hourly, usage, deductions
+
+    def _bump_rollups(self, cursor, hourly: Dict, usage: Dict):
+        """Add _order_deltas() output to the rollups. Runs on the caller's cursor
+        so it commits or rolls back together with the orders it describes."""
+        if hourly:
+            cursor.executemany(
+                """INSERT INTO daily_dish_hourly (date, dish_id, hour, quantity, order_count, sales)
+                   VALUES (%s, %s, %s, %s, %s, %s)
+                   ON DUPLICATE KEY UPDATE
+                       quantity    = quantity    + VALUES(quantity),
+                       order_count = order_count + VALUES(order_count),
+                       sales       = sales       + VALUES(sales)""",
+                [(d, dish, h, q, n, round(sales, 2)) for (d, dish, h), (q, n, sales) in hourly.items()],
+            )
+        if usage:
+            cursor.executemany(
+                """INSERT INTO daily_ingredient_usage (date, ingredient, quantity_used)
+                   VALUES (%s, %s, %s)
+                   ON DUPLICATE KEY UPDATE quantity_used = quantity_used + VALUES(quantity_used)""",
+                [(d, name, amount) for (d, name), amount in usage.items()],
+            )
+
+    def get_rollup(self, date: str) -> Dict:
+        """Return the stored rollup for a day:
+        {'hourly': [{dish_id, hour, quantity, order_count, sales}], 'ingredients': {name: qty}}."""
+        hourly = self.execute_query(
+            """SELECT dish_id, hour, quantity, order_count, sales
+                 FROM daily_dish_hourly WHERE date = %s""",
+            (date,),
+            fetch_all=True,
+        ) or []
+        usage = self.execute_query(
+            "SELECT ingredient, quantity_used FROM daily_ingredient_usage WHERE date = %s",
+            (date,),
+            fetch_all=True,
+        ) or []
+        return {
+            'hourly': [
+                {
+                    'dish_id': row['dish_id'],
+                    'hour': int(row['hour']),
+                    'quantity': int(row['quantity']),
+                    'order_count': int(row['order_count']),
+                    'sales': float(row['sales']),
+                }
+                for row in hourly
+            ],
+            'ingredients': {row['ingredient']: float(row['quantity_used']) for row in usage},
+        }
+
+    def get_range_rollup(self, start: str, end: str) -> Dict:
+        """Rollups for every day in [start, end], grouped in MySQL.
+
+        One pass over the rollup tables regardless of span:
+        {'daily':  [{date, dish_id, quantity, order_count, sales}],
+         'hourly': [{dish_id, hour, quantity}],
+         'ingredients': [{date, ingredient, quantity_used}]}
+        """
+        bounds = (start, _day_bounds(end)[1])
+        daily = self.execute_query(
+            """SELECT date, dish_id, SUM(quantity) AS quantity,
+                      SUM(order_count) AS order_count, SUM(sales) AS sales
+                 FROM daily_dish_hourly
+                WHERE date >= %s AND date < %s
+                GROUP BY date, dish_id""",
+            bounds,
+            fetch_all=True,
+        ) or []
+        hourly = self.execute_query(
+            """SELECT dish_id, hour, SUM(quantity) AS quantity
+                 FROM daily_dish_hourly
+                WHERE date >= %s AND date < %s
+                GROUP BY dish_id, hour""",
+            bounds,
+            fetch_all=True,
+        ) or []
+        usage = self.execute_query(
+            """SELECT date, ingredient, quantity_used
+                 FROM daily_ingredient_usage
+                WHERE date >= %s AND date < %s""",
+            bounds,
+            fetch_all=True,
+        ) or []
+        return {
+            'daily': [
+                {
+                    'date': _iso(row['date']),
+                    'dish_id': row['dish_id'],
+                    'quantity': int(row['quantity']),
+                    'order_count': int(row['order_count']),
+                    'sales': float(row['sales']),
+                }
+                for row in daily
+            ],
+            'hourly': [
+                {'dish_id': row['dish_id'], 'hour': int(row['hour']), 'quantity': int(row['quantity'])}
+                for row in hourly
+            ],
+            'ingredients': [
+                {
+                    'date': _iso(row['date']),
+                    'ingredient': row['ingredient'],
+                    'quantity_used': float(row['quantity_used']),
+                }
+                for row in usage
+            ],
+        }
+
+    def get_dish_demand(self, start: str, end: str) -> Optional[List[Dict]]:
+        """Hourly quantity per dish for every day in [start, end) from the
+        rollups: [{date, dish_id, hour, quantity}]. None on failure."""
+        rows = self.execute_query(
+            """SELECT date, dish_id, hour, quantity
+                 FROM daily_dish_hourly
+                WHERE date >= %s AND date < %s""",
+            (start, end),
+            fetch_all=True,
+        )
+        if rows is None:
+            return None
+        return [
+            {'date': _iso(row['date']), 'dish_id': row['dish_id'],
+             'hour': int(row['hour']), 'quantity': int(row['quantity'])}
+            for row in rows
+        ]
+
+    def rebuild_rollup(self, date: str) -> bool:
+        """Recompute one day's rollups from raw orders, replacing what is stored.
+
+        The day's orders are read with a shared lock so an order committed
+        mid-rebuild can't be lost or counted twice.
+
+        Sales are summed at each order's stored unit_price, the price
+        add_order charged and added to the rollups, so a rebuild after a menu
+        price change reproduces the same sales (see _aggregate_rows).
+        """
+        recipes = self.get_recipe_index()
+        if recipes is None:
+            return False
+        conn = self._acquire()
+        if conn is None:
+            return False
+
+        cursor = None
+        try:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(self._DAILY_AGGREGATES_SQL + " LOCK IN SHARE MODE", _day_bounds(date))
+            aggregate = self._aggregate_rows(date, cursor.fetchall(), recipes)
+            hourly = aggregate.hourly_rows()
+            usage  = aggregate.ingredient_usage()
+
+            cursor.execute("DELETE FROM daily_dish_hourly WHERE date = %s", (date,))
+            cursor.execute("DELETE FROM daily_ingredient_usage WHERE date = %s", (date,))
+            # Any stored report was built from the rollups being replaced.
+            self._invalidate_daily_reports(cursor, [date])
+            if hourly:
+                cursor.executemany(
+                    """INSERT INTO daily_dish_hourly (date, dish_id, hour, quantity, order_count, sales)
+                       VALUES (%s, %s, %s, %s, %s, %s)""",
+                    [(date, *row) for row in hourly],
+                )
+            if usage:
+                cursor.executemany(
+                    "INSERT INTO daily_ingredient_usage (date, ingredient, quantity_used) VALUES (%s, %s, %s)",
+                    [(date, name, amount) for name, amount in usage.items()],
+                )
+            self._bump_versions(cursor, f"orders:{date}")
 
             conn.commit()
+            self.events.notify('report_changed', {'date': date})
             return True
 
-        except Error as e:
-            print(f"Error adding order: {e}")
+        except DBError as e:
+            print(f"Error rebuilding rollup for {date}: {e}")
             try: conn.rollback()
             except: pass
             return False
         finally:
-            if cursor:
-                try: cursor.close()
-                except: pass
-            if conn and conn.is_connected():
-                conn.close()
+            self._release(conn, cursor)
+
+    def backfill_rollups(self):
+        """Build rollups for any day that has orders but no rollup rows yet
+        (sample data and installs that predate the rollup tables)."""
+        rows = self.execute_query(
+            """SELECT DISTINCT o.date
+                 FROM orders o
+                 LEFT JOIN (SELECT DISTINCT date FROM daily_dish_hourly) r ON r.date = o.date
+                WHERE r.date IS NULL""",
+            fetch_all=True,
+        ) or []
+        for row in rows:
+            date = row['date'].isoformat() if hasattr(row['date'], 'isoformat') else str(row['date'])
+            print(f"Backfilling rollup for {date}")
+            self.rebuild_rollup(date)
+
+    # ── SALES HISTORY ─────────────────────────────────────────────────────────
+
+    # Granularity -> (fact table, period column). See history.py.
+    HISTORY_TABLES = {
+        'day':   ('sales_daily', 'date'),
+        'week':  ('sales_weekly', 'period'),
+        'month': ('sales_monthly', 'period'),
+    }
+
+    def fold_history_day(self, date: str) -> Optional[int]:
+        """Materialize one day's rollup into sales_daily and re-sum the week
+        (Monday start) and month it belongs to. Safe to repeat.
+
+        Returns the orders:<date> version the fold reflects, also recorded in
+        history_days, or None on failure.
+        """
+        day   = datetime.strptime(date, '%Y-%m-%d').date()
+        week  = day - timedelta(days=day.weekday())
+        month = day.replace(day=1)
+        periods = [
+            ('sales_weekly', week, week + timedelta(days=7)),
+            ('sales_monthly', month, (month + timedelta(days=32)).replace(day=1)),
+        ]
+        conn = self._acquire()
+        if conn is None:
+            return None
+
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT version FROM data_versions WHERE name = %s", (f"orders:{date}",))
+            row = cursor.fetchone()
+            version = int(row[0]) if row else 0
+
+            cursor.execute("DELETE FROM sales_daily WHERE date = %s", (date,))
+            cursor.execute(
+                """INSERT INTO sales_daily (date, dish_id, quantity, order_count, sales)
+                   SELECT date, dish_id, SUM(quantity), SUM(order_count), SUM(sales)
+                     FROM daily_dish_hourly WHERE date = %s
+                    GROUP BY date, dish_id""",
+                (date,),
+            )
+            for table, start, end in periods:
+                cursor.execute(f"DELETE FROM {table} WHERE period = %s", (start.isoformat(),))
+                cursor.execute(
+                    f"""INSERT INTO {table} (period, dish_id, quantity, order_count, sales)
+                        SELECT %s, dish_id, SUM(quantity), SUM(order_count), SUM(sales)
+                          FROM sales_daily WHERE date >= %s AND date < %s
+                         GROUP BY dish_id""",
+                    (start.isoformat(), start.isoformat(), end.isoformat()),
+                )
+            cursor.execute(
+                """INSERT INTO history_days (date, orders_version) VALUES (%s, %s)
+                   ON DUPLICATE KEY UPDATE orders_version = VALUES(orders_version)""",
+                (date, version),
+            )
+            self._bump_versions(cursor, 'history')
+            conn.commit()
+            return version
+
+        except DBError as e:
+            print(f"Error folding sales history for {date}: {e}")
+            try: conn.rollback()
+            except: pass
+            return None
+        finally:
+            self._release(conn, cursor)
+
+    def get_history_state(self, scan: bool = False) -> Optional[tuple]:
+        """({date: orders version}, {date: version folded into history}).
+
+        With `scan`, days that have rollups but were never folded (and have
+        no version counter, e.g. data older than data_versions) are included
+        in the first map with version 0. None if the database is unreachable.
+        """
+        versions = self.execute_query(
+            "SELECT name, version FROM data_versions WHERE name LIKE %s", ('orders:%',), fetch_all=True)
+        folded = self.execute_query("SELECT date, orders_version FROM history_days", fetch_all=True)
+        if versions is None or folded is None:
+            return None
+        current = {row['name'][len('orders:'):]: int(row['version']) for row in versions}
+        if scan:
+            rows = self.execute_query(
+                """SELECT DISTINCT r.date
+                     FROM daily_dish_hourly r
+                     LEFT JOIN history_days h ON h.date = r.date
+                    WHERE h.date IS NULL""",
+                fetch_all=True,
+            ) or []
+            for row in rows:
+                current.setdefault(_iso(row['date']), 0)
+        return current, {_iso(row['date']): int(row['orders_version']) for row in folded}
+
+    def get_history_rows(self, level: str, periods: Optional[List[str]] = None) -> Optional[List[Dict]]:
+        """{period, dish_id, quantity, order_count, sales} rows of one fact
+        table, for the given period starts or all of them, oldest first."""
+        table, column = self.HISTORY_TABLES[level]
+        where, params = '', ()
+        if periods:
+            where  = f"WHERE {column} IN ({', '.join(['%s'] * len(periods))})"
+            params = tuple(periods)
+        rows = self.execute_query(
+            f"""SELECT {column} AS period, dish_id, quantity, order_count, sales
+                  FROM {table} {where} ORDER BY {column}""",
+            params, fetch_all=True,
+        )
+        if rows is None:
+            return None
+        return [
+            {
+                'period': _iso(row['period']),
+                'dish_id': row['dish_id'],
+                'quantity': int(row['quantity']),
+                'order_count': int(row['order_count']),
+                'sales': float(row['sales']),
+            }
+            for row in rows
+        ]
+
+    # ── DATA VERSIONS ─────────────────────────────────────────────────────────
+
+    def _bump_versions(self, cursor, *names: str):
+        """Advance data_versions counters on the caller's cursor, so a reader
+        never sees new data under an old version. Sorted, so concurrent
+        writers lock the counter rows in the same order."""
+        cursor.executemany(
+            """INSERT INTO data_versions (name, version) VALUES (%s, 1)
+               ON DUPLICATE KEY UPDATE version = version + 1, updated_at = CURRENT_TIMESTAMP(3)""",
+            [(name,) for name in sorted(set(names))],
+        )
+
+    def _commit_versions(self, conn, cursor, *names: str) -> bool:
+        """Advance data_versions counters in a second short transaction on a
+        connection whose data the caller has just committed.
+
+        The order paths use this instead of bumping inside their own
+        transaction: the 'ingredients' and 'orders:<date>' rows are shared by
+        every writer, and locking them for the whole order transaction
+        serializes order ingest. Staying on the caller's connection means the
+        bump never waits for a second pool checkout. The counter moves a
+        moment after the data, so a reader in between can tag new data with
+        the old version; its next poll sees the new version and refetches, so
+        nothing stale sticks. A reader never sees a new version over old data.
+        """
+        try:
+            self._bump_versions(cursor, *names)
+            conn.commit()
+            return True
+        except DBError as e:
+            print(f"Error advancing data versions {', '.join(names)}: {e}")
+            try: conn.rollback()
+            except: pass
+            return False
+
+    def get_data_versions(self, names: List[str]) -> Optional[Dict]:
+        """{name: (version, updated_at)} for the given counters, one primary-key
+        lookup. updated_at is a UTC datetime; counters never advanced read as
+        (0, None). None if the database is unreachable.
+
+        A 'dishes' or 'ingredients' counter that moved since this process last
+        looked means another worker changed it, so the matching cache entry is
+        dropped before the caller reads through it (and the recipe index with
+        a changed menu).
+        """
+        rows = self.execute_query(
+            f"""SELECT name, version, UNIX_TIMESTAMP(updated_at) AS updated_ts
+                  FROM data_versions WHERE name IN ({', '.join(['%s'] * len(names))})""",
+            tuple(names), fetch_all=True,
+        )
+        if rows is None:
+            return None
+        found = {
+            row['name']: (int(row['version']),
+                          datetime.fromtimestamp(float(row['updated_ts']), timezone.utc))
+            for row in rows
+        }
+        versions = {name: found.get(name, (0, None)) for name in names}
+
+        stale = [name for name in ('dishes', 'ingredients')
+                 if name in versions and self._seen_versions.get(name) != versions[name]]
+        if stale:
+            self._cache.invalidate(*stale, *(['recipes'] if 'dishes' in stale else []))
+            self._seen_versions.update((name, versions[name]) for name in stale)
+        return versions
+
+    # ── INVENTORY ─────────────────────────────────────────────────────────────
+
+    def relink_recipes(self, ingredient_id: Optional[int] = None):
+        """Link recipes to one newly stocked ingredient, or rebuild every
+        link when no id is given (after raw inserts, e.g. workload.py), and
+        drop the compiled index everywhere: the 'dishes' counter moves, so
+        other workers drop theirs too."""
+        conn = self._acquire()
+        if conn is None:
+            return
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            if ingredient_id is None:
+                link_recipes(cursor)
+            else:
+                link_ingredient(cursor, ingredient_id)
+            self._bump_versions(cursor, 'dishes')
+            conn.commit()
+        except DBError as e:
+            print(f"Error linking recipes: {e}")
+            try: conn.rollback()
+            except: pass
+        finally:
+            self._release(conn, cursor)
+            self._cache.invalidate('recipes')
 
     def deliver_ingredient(self, ingredient_id: int) -> bool:
         """Set stock_quantity to 100 (full delivery)."""
         result = self.execute_query(
             "UPDATE ingredients SET stock_quantity = 100 WHERE id = %s",
             (ingredient_id,),
+            versions=('ingredients',),
         )
+        self._cache.invalidate('ingredients')
+        self.events.notify('stock_changed')
         return result is not None
 
     def update_ingredient(self, ingredient_id: int, data: dict) -> bool:
-        """Update name, unit, and/or stock_quantity of an ingredient."""
+        """Update name, unit, and/or stock_quantity of an ingredient.
+
+        A rename keeps the ingredient's recipe links (they are by id) and
+        renames it in the recipes that use it, in the same transaction.
+        """
         fields, params = [], []
-        if 'name' in data and data['name'].strip():
+        name = data['name'].strip() if 'name' in data and data['name'].strip() else None
+        if name:
             fields.append("name = %s")
-            params.append(data['name'].strip())
+            params.append(name)
         if 'unit' in data and data['unit'].strip():
             fields.append("unit = %s")
             params.append(data['unit'].strip())
@@ -306,53 +1034,156 @@ class Database:
             params.append(qty)
         if not fields:
             return False
-        params.append(ingredient_id)
-        result = self.execute_query(
-            f"UPDATE ingredients SET {', '.join(fields)} WHERE id = %s",
-            tuple(params),
-        )
-        return result is not None
+        if not name:
+            result = self.execute_query(
+                f"UPDATE ingredients SET {', '.join(fields)} WHERE id = %s",
+                (*params, ingredient_id),
+                versions=('ingredients',),
+            )
+            self._cache.invalidate('ingredients')
+            self.events.notify('stock_changed')
+            return result is not None
+
+        conn = self._acquire()
+        if conn is None:
+            return False
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT name FROM ingredients WHERE id = %s FOR UPDATE", (ingredient_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return False
+            cursor.execute(
+                f"UPDATE ingredients SET {', '.join(fields)} WHERE id = %s",
+                (*params, ingredient_id),
+            )
+            versions = ['ingredients']
+            if row[0] != name:
+                rename_ingredient(cursor, ingredient_id, row[0], name)
+                versions.append('dishes')
+            self._bump_versions(cursor, *versions)
+            conn.commit()
+            return True
+        except DBError as e:
+            print(f"Error updating ingredient {ingredient_id}: {e}")
+            try: conn.rollback()
+            except: pass
+            return False
+        finally:
+            self._release(conn, cursor)
+            self._cache.invalidate('dishes', 'ingredients', 'recipes')
+            self.events.notify('stock_changed')
 
     def add_ingredient(self, name: str, unit: str, stock: float = 100.0) -> Optional[int]:
-        """Insert a new ingredient. Returns the new id or None."""
-        return self.execute_query(
+        """Insert a new ingredient and link it to the recipes that name it.
+        Returns the new id or None."""
+        new_id = self.execute_query(
             "INSERT INTO ingredients (name, stock_quantity, unit, reorder_level) VALUES (%s, %s, %s, 25)",
             (name, min(100.0, max(0.0, stock)), unit),
+            versions=('ingredients',),
         )
+        self._cache.invalidate('ingredients')
+        if new_id is not None:
+            self.relink_recipes(new_id)
+        self.events.notify('stock_changed')
+        return new_id
 
     def delete_ingredient(self, ingredient_id: int) -> bool:
-        """Delete an ingredient by id."""
+        """Delete an ingredient by id. Its recipe links go with it (ON DELETE
+        CASCADE); recipes still name it, now as an unstocked ingredient."""
         result = self.execute_query(
             "DELETE FROM ingredients WHERE id = %s",
             (ingredient_id,),
+            versions=('ingredients', 'dishes'),
         )
+        self._cache.invalidate('ingredients', 'recipes')
+        self.events.notify('stock_changed')
         return result is not None
 
     def get_dishes(self) -> List[Dict]:
+        """Menu with recipes already parsed from JSON, served from the cache.
+
+        Returns fresh dict copies so callers can annotate them freely; the
+        recipe dicts themselves are shared and must be treated as read-only.
+        """
+        return [dict(d) for d in self._dish_map().values()]
+
+    def get_dish(self, dish_id: int) -> Optional[Dict]:
+        """One dish from the cached menu. An unknown id reloads the menu in
+        case the dish was added since it was cached, at most once every
+        CACHE_CONFIG['unknown_dish_reload'] seconds, so a client sending bad
+        ids can't keep the cache cold. The recipe index is kept: it compiles
+        a dish newer than itself on the spot (RecipeIndex.dish_lines)."""
+        dish = self._dish_map().get(dish_id)
+        if dish is None:
+            now = time.monotonic()
+            if now - self._menu_rechecked_at >= CACHE_CONFIG['unknown_dish_reload']:
+                self._menu_rechecked_at = now
+                self._cache.invalidate('dishes')
+                dish = self._dish_map().get(dish_id)
+        return dict(dish) if dish else None
+
+    def _dish_map(self) -> Dict[int, Dict]:
+        """{dish_id: dish} in menu (name) order."""
+        return self._cache.get('dishes', self._load_dishes, ttl=CACHE_CONFIG['dishes_ttl']) or {}
+
+    def _load_dishes(self) -> Optional[Dict[int, Dict]]:
         try:
             results = self.execute_query(
                 "SELECT id, name, price, ingredients FROM dishes ORDER BY name",
                 fetch_all=True,
             )
-            return [
-                {
+            if results is None:
+                return None
+            return {
+                row['id']: {
                     'id': row['id'],
                     'name': row['name'],
                     'price': float(row['price']),
                     'ingredients': json.loads(row['ingredients']),
                 }
-                for row in (results or [])
-            ]
+                for row in results
+            }
         except Exception as e:
             print(f"Error getting dishes: {e}")
-            return []
+            return None
+
+    def get_recipe_index(self) -> Optional[RecipeIndex]:
+        """The menu's recipes compiled against ingredient ids, cached like the
+        menu and rebuilt when dishes or ingredient names change. Stock levels
+        are not part of it, so orders don't invalidate it. None if the
+        database is unreachable."""
+        return self._cache.get('recipes', self._load_recipe_index, ttl=CACHE_CONFIG['dishes_ttl'])
+
+    def _load_recipe_index(self) -> Optional[RecipeIndex]:
+        dishes = self._cache.get('dishes', self._load_dishes, ttl=CACHE_CONFIG['dishes_ttl'])
+        ingredients = self._cache.get('ingredients', self._load_ingredients,
+                                      ttl=CACHE_CONFIG['ingredients_ttl'])
+        links = self.execute_query(
+            """SELECT di.dish_id, di.ingredient_id, i.name, di.amount
+                 FROM dish_ingredients di
+                 JOIN ingredients i ON i.id = di.ingredient_id""",
+            fetch_all=True,
+        )
+        if dishes is None or ingredients is None or links is None:
+            return None
+        return RecipeIndex(list(dishes.values()), ingredients, links)
 
     def get_ingredients(self) -> List[Dict]:
+        """Ingredient stock levels, served from the cache until a write invalidates it."""
+        ingredients = self._cache.get('ingredients', self._load_ingredients,
+                                      ttl=CACHE_CONFIG['ingredients_ttl'])
+        return [dict(i) for i in (ingredients or [])]
+
+    def _load_ingredients(self) -> Optional[List[Dict]]:
         try:
             results = self.execute_query(
                 "SELECT id, name, stock_quantity, unit, reorder_level FROM ingredients ORDER BY name",
                 fetch_all=True,
             )
+            if results is None:
+                return None
             return [
                 {
                     'id': row['id'],
@@ -361,57 +1192,203 @@ class Database:
                     'unit': row['unit'],
                     'reorder_level': float(row['reorder_level']),
                 }
-                for row in (results or [])
+                for row in results
             ]
         except Exception as e:
             print(f"Error getting ingredients: {e}")
-            return []
+            return None
+
+    def invalidate_cache(self, *keys: str):
+        """Drop cached menu/ingredient reads ('dishes', 'ingredients', 'recipes';
+        all if none given)."""
+        self._cache.invalidate(*keys)
+
+    def cache_stats(self) -> Dict:
+        return self._cache.stats()
 
     def get_orders_by_date(self, date: str) -> List[Dict]:
+        """Every order of a day, newest first. Dishes are referenced by
+        dish_id; look names, prices and recipes up in get_dishes()."""
         try:
             results = self.execute_query(
-                """SELECT o.id, o.dish_id, o.quantity, o.order_time, o.date,
-                          d.name AS dish_name, d.price, d.ingredients
+                """SELECT id, dish_id, quantity, order_time, date, unit_price
+                     FROM orders
+                    WHERE date >= %s AND date < %s
+                    ORDER BY order_time DESC""",
+                _day_bounds(date),
+                fetch_all=True,
+            )
+            return [self._order_row(row) for row in (results or [])]
+        except Exception as e:
+            print(f"Error getting orders by date: {e}")
+            return []
+
+    def get_orders_page(self, date: str, after: Optional[int] = None,
+                        limit: int = 50) -> Optional[Dict]:
+        """One page of a day's orders, newest first, keyed on id.
+
+        `after` is the `next_after` cursor of the previous page. Unlike
+        OFFSET, each page is a single index seek on (date, id) however deep
+        the client pages, and orders arriving meanwhile don't shift the pages.
+        Returns {'date', 'orders', 'next_after'} (next_after is None on the
+        last page), or None if the query failed.
+        """
+        params = list(_day_bounds(date))
+        where  = "date >= %s AND date < %s"
+        if after is not None:
+            where += " AND id < %s"
+            params.append(after)
+        rows = self.execute_query(
+            f"""SELECT id, dish_id, quantity, order_time, date, unit_price
+                  FROM orders WHERE {where}
+                 ORDER BY id DESC LIMIT %s""",
+            (*params, limit + 1),
+            fetch_all=True,
+        )
+        if rows is None:
+            return None
+        orders = [self._order_row(row) for row in rows[:limit]]
+        return {
+            'date': date,
+            'orders': orders,
+            'next_after': orders[-1]['id'] if len(rows) > limit else None,
+        }
+
+    @staticmethod
+    def _order_row(row: Dict) -> Dict:
+        return {
+            'id': row['id'],
+            'dish_id': row['dish_id'],
+            'quantity': row['quantity'],
+            'order_time': _iso(row['order_time']),
+            'date': _iso(row['date']),
+            'unit_price': None if row['unit_price'] is None else float(row['unit_price']),
+        }
+
+    def iter_orders(self, start: str, end: str, batch_size: int = 1000) -> Iterator[Dict]:
+        """Yield every order in [start, end] oldest first, streamed from the server.
+
+        Uses an unbuffered (server-side) cursor read in batches of
+        `batch_size`, so memory stays flat however many orders the span holds.
+        The pooled connection is held until the iterator is exhausted or closed.
+        Orders are priced at their stored unit_price, as the report totals are.
+        Raises ConnectionError if no connection is available, rather than
+        yielding nothing as if the span had no orders.
+        """
+        conn = self._acquire()
+        if conn is None:
+            raise ConnectionError(f"No database connection to read orders {start} to {end}")
+
+        cursor   = None
+        finished = False
+        try:
+            cursor = conn.cursor(dictionary=True, buffered=False)
+            cursor.execute(
+                """SELECT o.id, o.order_time, o.quantity, d.name AS dish_name,
+                          COALESCE(o.unit_price, d.price) AS price
                      FROM orders o
                      JOIN dishes d ON o.dish_id = d.id
-                    WHERE DATE(o.date) = %s
-                    ORDER BY o.order_time DESC""",
-                (date,),
-                fetch_all=True,
+                    WHERE o.date >= %s AND o.date < %s
+                    ORDER BY o.order_time, o.id""",
+                (start, _day_bounds(end)[1]),
             )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    finished = True
+                    break
+                for row in rows:
+                    yield {
+                        'id': row['id'],
+                        'order_time': _iso(row['order_time']),
+                        'quantity': row['quantity'],
+                        'dish_name': row['dish_name'],
+                        'price': float(row['price']),
+                    }
+        finally:
+            if finished:
+                self._release(conn, cursor)
+            else:
+                # An abandoned unbuffered result would have to be read off the
+                # wire before the connection is reusable; dropping it is cheaper.
+                self._pool.release(conn, discard=True)
+
+    _DAILY_AGGREGATES_SQL = """
+        SELECT dish_id, HOUR(order_time) AS hour,
+               SUM(quantity) AS quantity, COUNT(*) AS order_count,
+               SUM(quantity * unit_price) AS sales,
+               SUM(CASE WHEN unit_price IS NULL THEN quantity ELSE 0 END) AS unpriced
+          FROM orders
+         WHERE date >= %s AND date < %s
+         GROUP BY dish_id, HOUR(order_time)"""
+
+    @staticmethod
+    def _aggregate_rows(date: str, rows: List[Dict], recipes: RecipeIndex) -> DayAggregate:
+        """Aggregate _DAILY_AGGREGATES_SQL rows with the compiled menu.
+
+        Sales come from the orders' stored unit_price. Orders without one
+        (written around add_order, e.g. by a raw import) are priced at the
+        current menu price, as there is no price history to look them up in.
+        """
+        prices = {dish_id: dish['price'] for dish_id, dish in recipes.dishes.items()}
+        return recipes.aggregator.aggregate(
+            date,
+            [r['dish_id'] for r in rows],
+            [int(r['hour']) for r in rows],
+            [int(r['quantity']) for r in rows],
+            order_counts=[int(r['order_count']) for r in rows],
+            sales=[float(r['sales'] or 0) + int(r['unpriced']) * prices.get(r['dish_id'], 0.0)
+                   for r in rows],
+        )
+
+    def aggregate_day(self, date: str) -> Optional[DayAggregate]:
+        """One day's per-dish, per-hour totals, sales and ingredient usage,
+        grouped in the database from the orders table (not the rollups).
+        None if the database is unreachable."""
+        recipes = self.get_recipe_index()
+        if recipes is None:
+            return None
+        rows = self.execute_query(self._DAILY_AGGREGATES_SQL, _day_bounds(date), fetch_all=True)
+        if rows is None:
+            return None
+        return self._aggregate_rows(date, rows, recipes)
+
+    def get_daily_aggregates(self, date: str) -> List[Dict]:
+        """Per-dish, per-hour order totals for one day, grouped in MySQL.
+
+        Returns O(dishes x 24) rows of {dish_id, hour, quantity, order_count}
+        instead of every order joined with its dish's recipe JSON.
+        """
+        try:
+            results = self.execute_query(self._DAILY_AGGREGATES_SQL, _day_bounds(date), fetch_all=True)
             return [
                 {
-                    'id': row['id'],
                     'dish_id': row['dish_id'],
-                    'quantity': row['quantity'],
-                    'order_time': (
-                        row['order_time'].isoformat()
-                        if hasattr(row['order_time'], 'isoformat')
-                        else str(row['order_time'])
-                    ),
-                    'date': (
-                        row['date'].isoformat()
-                        if hasattr(row['date'], 'isoformat')
-                        else str(row['date'])
-                    ),
-                    'dish_name': row['dish_name'],
-                    'price': float(row['price']),
-                    'ingredients': json.loads(row['ingredients']),
+                    'hour': int(row['hour']),
+                    'quantity': int(row['quantity']),
+                    'order_count': int(row['order_count']),
                 }
                 for row in (results or [])
             ]
         except Exception as e:
-            print(f"Error getting orders by date: {e}")
+            print(f"Error getting daily aggregates for {date}: {e}")
             return []
 
-    def get_daily_report(self, date: str) -> Optional[Dict]:
+    def get_daily_report(self, date: str, final_only: bool = False) -> Optional[Dict]:
+        """Stored report for a day in the current format, or None.
+
+        Rows written in an older format (format_version != REPORT_FORMAT_VERSION)
+        are ignored. With `final_only`, rows saved while the day was still
+        open are ignored too.
+        """
         try:
             row = self.execute_query(
-                "SELECT * FROM daily_reports WHERE date = %s",
-                (date,),
+                """SELECT * FROM daily_reports
+                    WHERE date = %s AND format_version = %s""",
+                (date, REPORT_FORMAT_VERSION),
                 fetch_one=True,
             )
-            if not row:
+            if not row or (final_only and not row['is_final']):
                 return None
             return {
                 'date': (
@@ -429,27 +1406,89 @@ class Database:
             print(f"Error getting daily report for {date}: {e}")
             return None
 
-    def save_daily_report(self, report: DailyReport):
+    _SAVE_REPORT_SQL = """
+        INSERT INTO daily_reports
+            (date, total_sales, total_orders, dishes_sold, ingredients_used, peak_hours,
+             format_version, is_final)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            total_sales      = VALUES(total_sales),
+            total_orders     = VALUES(total_orders),
+            dishes_sold      = VALUES(dishes_sold),
+            ingredients_used = VALUES(ingredients_used),
+            peak_hours       = VALUES(peak_hours),
+            format_version   = VALUES(format_version),
+            is_final         = VALUES(is_final)"""
+
+    @staticmethod
+    def _report_params(report: DailyReport, final: bool) -> tuple:
+        return (
+            report.date,
+            report.total_sales,
+            report.total_orders,
+            json.dumps(report.dishes_sold),
+            json.dumps(report.ingredients_used),
+            json.dumps(report.peak_hours),
+            REPORT_FORMAT_VERSION,
+            int(final),
+        )
+
+    def save_daily_report(self, report: DailyReport, final: bool = False):
+        """Upsert a report. `final` marks a closed day whose report can be served as-is."""
         try:
-            self.execute_query(
-                """INSERT INTO daily_reports
-                       (date, total_sales, total_orders, dishes_sold, ingredients_used, peak_hours)
-                   VALUES (%s, %s, %s, %s, %s, %s)
-                   ON DUPLICATE KEY UPDATE
-                       total_sales      = VALUES(total_sales),
-                       total_orders     = VALUES(total_orders),
-                       dishes_sold      = VALUES(dishes_sold),
-                       ingredients_used = VALUES(ingredients_used),
-                       peak_hours       = VALUES(peak_hours)""",
-                (
-                    report.date,
-                    report.total_sales,
-                    report.total_orders,
-                    json.dumps(report.dishes_sold),
-                    json.dumps(report.ingredients_used),
-                    json.dumps(report.peak_hours),
-                ),
-            )
+            self.execute_query(self._SAVE_REPORT_SQL, self._report_params(report, final))
             print(f"Daily report saved for {report.date}.")
         except Exception as e:
-            print(f"Error saving daily report: {e}")
\ No newline at end of file
+            print(f"Error saving daily report: {e}")
+
+    def save_daily_reports(self, reports: List[DailyReport], final: bool = True) -> bool:
+        """Upsert many reports with one executemany in one transaction (backfills)."""
+        if not reports:
+            return True
+        conn = self._acquire()
+        if conn is None:
+            return False
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            cursor.executemany(self._SAVE_REPORT_SQL, [self._report_params(r, final) for r in reports])
+            conn.commit()
+            return True
+        except DBError as e:
+            print(f"Error saving {len(reports)} daily reports: {e}")
+            try: conn.rollback()
+            except: pass
+            return False
+        finally:
+            self._release(conn, cursor)
+
+    def get_order_dates(self, start: Optional[str] = None, end: Optional[str] = None) -> Optional[List[str]]:
+        """Days in [start, end] that have orders, oldest first. None on failure."""
+        clauses, params = [], []
+        if start:
+            clauses.append("date >= %s")
+            params.append(start)
+        if end:
+            clauses.append("date <= %s")
+            params.append(end)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self.execute_query(
+            f"SELECT DISTINCT date FROM orders {where} ORDER BY date", tuple(params), fetch_all=True)
+        return None if rows is None else [_iso(row['date']) for row in rows]
+
+    def get_final_report_dates(self) -> Optional[set]:
+        """Days whose stored report is final and in the current format."""
+        rows = self.execute_query(
+            "SELECT date FROM daily_reports WHERE is_final = 1 AND format_version = %s",
+            (REPORT_FORMAT_VERSION,), fetch_all=True,
+        )
+        return None if rows is None else {_iso(row['date']) for row in rows}
+
+    def _invalidate_daily_reports(self, cursor, dates: List[str]):
+        """Forget the stored reports of some days, on the caller's cursor and
+        in its transaction, so the next read regenerates them."""
+        if dates:
+            cursor.execute(
+                f"DELETE FROM daily_reports WHERE date IN ({', '.join(['%s'] * len(dates))})",
+                tuple(dates),
+            )
\ No newline at end of file
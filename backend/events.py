@@ -0,0 +1,246 @@
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+
+def format_sse(event: str, data) -> str:
+    """Serialize one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class Subscription:
+    """One SSE client's outbox. Messages are pre-formatted SSE strings."""
+
+    def __init__(self, max_queue: int):
+        self.queue  = queue.Queue(maxsize=max_queue)
+        self.lagged = False   # set when messages were dropped; client needs a snapshot
+        self.closed = False   # set on shutdown; the stream should end
+
+    def drain(self):
+        """Discard queued messages (superseded by a snapshot)."""
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def get(self, timeout: float) -> Optional[str]:
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBus:
+    """In-process fan-out of change events.
+
+    publish() reaches in-process listeners and every SSE subscriber;
+    notify() reaches listeners only, for internal signals clients don't need.
+    A slow subscriber never blocks publishers: when its outbox is full the
+    message is dropped and the subscriber is flagged to resync from a snapshot.
+    Events are per process, so each worker serves its own subscribers.
+    """
+
+    def __init__(self, max_queue: int = 256):
+        self.max_queue   = max_queue
+        self._lock       = threading.Lock()
+        self._subs       = set()
+        self._listeners  = []
+        self._closed     = False
+        self._stats      = {'published': 0, 'dropped': 0}
+
+    def subscribe(self) -> Subscription:
+        sub = Subscription(self.max_queue)
+        with self._lock:
+            sub.closed = self._closed
+            self._subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            self._subs.discard(sub)
+
+    def add_listener(self, fn: Callable[[str, Dict], None]):
+        with self._lock:
+            self._listeners.append(fn)
+
+    def notify(self, event: str, data: Dict = None):
+        with self._lock:
+            listeners = list(self._listeners)
+        for fn in listeners:
+            try:
+                fn(event, data or {})
+            except Exception as e:
+                print(f"Event listener error on {event}: {e}")
+
+    def publish(self, event: str, data: Dict):
+        self.notify(event, data)
+        message = format_sse(event, data)
+        with self._lock:
+            subs = list(self._subs)
+            self._stats['published'] += 1
+        for sub in subs:
+            try:
+                sub.queue.put_nowait(message)
+            except queue.Full:
+                sub.lagged = True
+                with self._lock:
+                    self._stats['dropped'] += 1
+
+    def close(self):
+        """End every open stream (worker shutdown) so the process can exit;
+        clients reconnect to another worker after the SSE retry delay."""
+        with self._lock:
+            self._closed = True
+            subs = list(self._subs)
+        for sub in subs:
+            sub.closed = True
+            try:
+                sub.queue.put_nowait(': closing\n\n')  # wake the waiting stream
+            except queue.Full:
+                pass
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subs)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'subscribers': len(self._subs), **self._stats}
+
+
+class LiveBroadcaster:
+    """Turns raw change events into dashboard updates pushed over SSE.
+
+    Order events only mark the report and inventory dirty; a single thread
+    recomputes them at most once per `interval` seconds and publishes
+    'report' (today's report) and 'inventory' (only the ingredients whose
+    stock or status changed). DB work therefore scales with the update
+    interval, not with the number of open dashboards or the order rate.
+
+    Under several worker processes each has its own bus, so the broadcaster
+    also polls the data_versions counters (one primary-key lookup per
+    interval, only while clients are connected) to notice writes made by
+    other workers. Orders committed elsewhere aren't in this bus's 'orders'
+    events; clients get 'orders_changed' and re-fetch the order list.
+    """
+
+    def __init__(self, bus: EventBus, analytics, interval: float = 1.0):
+        self.bus       = bus
+        self.analytics = analytics
+        self.interval  = interval
+        self._lock     = threading.Lock()
+        self._wake     = threading.Event()
+        self._dirty    = {'report': True, 'inventory': True}
+        self._report   = None
+        self._stock    = {}     # ingredient id -> last published row
+        self._day      = datetime.now().date()
+        self._versions = None   # data_versions seen at the last poll
+        self._local_orders = 0  # 'orders' events published here since then
+
+        bus.add_listener(self._on_event)
+        self._thread = threading.Thread(target=self._run, name='live-broadcaster', daemon=True)
+        self._thread.start()
+
+    def _on_event(self, event: str, data: Dict):
+        if event == 'orders':
+            with self._lock:
+                self._local_orders += 1
+        kinds = {
+            'orders': ('report', 'inventory'),
+            'stock_changed': ('inventory',),
+            'report_changed': ('report',),
+        }.get(event, ())
+        if kinds:
+            with self._lock:
+                for kind in kinds:
+                    self._dirty[kind] = True
+            self._wake.set()
+
+    def snapshot(self) -> Dict:
+        """Full state for a newly connected (or lagging) client."""
+        with self._lock:
+            fresh = self._report is not None and not any(self._dirty.values())
+        if not fresh:
+            # Publish too: the dirty flags are consumed here, so the clients
+            # already connected must get this refresh as well.
+            self._refresh(publish=True)
+        with self._lock:
+            return {'report': self._report, 'inventory': list(self._stock.values())}
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            today = datetime.now().date()
+            if today != self._day:
+                self._day = today
+                with self._lock:
+                    self._dirty['report'] = True
+            if self.bus.subscriber_count():
+                try:
+                    self._poll_versions(today)
+                    self._refresh(publish=True)
+                except Exception as e:
+                    print(f"Live update error: {e}")
+            # Coalesce bursts: at most one refresh per interval.
+            time.sleep(self.interval)
+
+    def _poll_versions(self, today):
+        """Mark sections dirty when another process changed their data."""
+        orders_key = f"orders:{today.isoformat()}"
+        versions = self.analytics.db.get_data_versions(['ingredients', orders_key])
+        if versions is None:
+            return
+        with self._lock:
+            previous, self._versions = self._versions, versions
+            local, self._local_orders = self._local_orders, 0
+        if previous is None:
+            return
+
+        if versions['ingredients'] != previous['ingredients']:
+            with self._lock:
+                self._dirty['inventory'] = True
+        seen = previous.get(orders_key, (0, None))[0]
+        if versions[orders_key][0] != seen:
+            with self._lock:
+                self._dirty['report'] = True
+                self._dirty['inventory'] = True
+            # Each local commit advanced the counter once and was published
+            # on this bus; anything beyond that came from another worker.
+            if versions[orders_key][0] - seen > local:
+                self.bus.publish('orders_changed', {'date': today.isoformat()})
+
+    def _refresh(self, publish: bool):
+        """Recompute and publish the dirty sections. A section that fails
+        (e.g. the database is briefly unreachable) stays dirty, so the next
+        pass retries it instead of waiting for an unrelated change."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {'report': False, 'inventory': False}
+
+        try:
+            if dirty['report']:
+                report = self.analytics.get_or_generate_report(datetime.now().date().isoformat())
+                with self._lock:
+                    self._report = report
+                dirty['report'] = False
+                if publish:
+                    self.bus.publish('report', report)
+
+            if dirty['inventory']:
+                rows = {ing['id']: ing for ing in self.analytics.get_ingredients_status()}
+                with self._lock:
+                    changed = [row for i, row in rows.items() if self._stock.get(i) != row]
+                    removed = [i for i in self._stock if i not in rows]
+                    self._stock = rows
+                dirty['inventory'] = False
+                if publish and (changed or removed):
+                    self.bus.publish('inventory', {'changed': changed, 'removed': removed})
+        finally:
+            with self._lock:
+                for kind, pending in dirty.items():
+                    if pending:
+                        self._dirty[kind] = True
@@ -0,0 +1,194 @@
+"""Ingredient depletion forecasts and reorder suggestions.
+
+Demand is learnt from the rollups of the last `lookback_days` closed days as
+an hour-of-week profile per dish (Monday lunch is not Saturday dinner).
+Multiplying that profile by the current recipe matrix gives every
+ingredient's expected burn for each coming hour; cumulative burn against
+current stock gives the time to stockout, and the same projection over the
+supplier lead time drives the reorder point.
+
+The profile is rebuilt once per day (it only covers closed days); the
+forecast itself is recomputed at most once per `refresh_interval` from the
+cached profile, current recipes and current stock, so a per-minute refresh
+never re-reads order history. Everything is vectorized across ingredients.
+"""
+import math
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+
+import numpy as np
+
+from cache import TTLCache
+from database import Database
+
+HOURS_PER_WEEK = 7 * 24
+
+
+class InventoryForecaster:
+    def __init__(self, db: Database, lookback_days: int = 28, horizon_days: int = 14,
+                 lead_time_days: float = 2, review_days: float = 7, service_z: float = 1.65,
+                 refresh_interval: float = 60):
+        if lookback_days < 1:
+            raise ValueError("lookback_days must be at least 1: demand is learnt from closed days")
+        self.db             = db
+        self.lookback_days  = lookback_days
+        self.horizon_hours  = int(horizon_days * 24)
+        self.lead_time_days = lead_time_days
+        self.review_days    = review_days
+        self.service_z      = service_z
+        self.refresh_interval = refresh_interval
+        self._cache   = TTLCache()
+        self._profile = None   # (date it was built on, profile)
+        self._lock    = threading.Lock()
+
+    # ── DEMAND PROFILE (per day) ─────────────────────────────────────────────
+
+    def _demand_profile(self, today: date) -> Optional[Dict]:
+        """Per-dish demand over the lookback window, cached until tomorrow:
+        'hourly' (168 x dishes) mean quantity per hour of week, 'daily'
+        (observed days x dishes) totals, and the dish id of each column."""
+        with self._lock:
+            if self._profile and self._profile[0] == today:
+                return self._profile[1]
+
+        start = today - timedelta(days=self.lookback_days)
+        rows  = self.db.get_dish_demand(start.isoformat(), today.isoformat())
+        if rows is None:
+            return None
+
+        dish_ids = sorted({row['dish_id'] for row in rows})
+        column   = {dish_id: i for i, dish_id in enumerate(dish_ids)}
+        days     = np.zeros((self.lookback_days, 24, len(dish_ids)))
+        if rows:
+            offsets = np.array([(date.fromisoformat(r['date']) - start).days for r in rows])
+            np.add.at(days,
+                      (offsets, np.array([r['hour'] for r in rows]),
+                       np.array([column[r['dish_id']] for r in rows])),
+                      np.array([r['quantity'] for r in rows], dtype=float))
+            # A young install has fewer days than the window: average over
+            # the days since its first order, not over empty ones.
+            days = days[offsets.min():]
+            start = start + timedelta(days=int(offsets.min()))
+
+        weekdays = np.array([(start + timedelta(days=n)).weekday() for n in range(len(days))])
+        overall  = days.mean(axis=0) if len(days) else np.zeros((24, len(dish_ids)))
+        hourly   = np.empty((HOURS_PER_WEEK, len(dish_ids)))
+        for weekday in range(7):
+            seen = days[weekdays == weekday]
+            # Weekdays not yet observed fall back to the all-days average.
+            hourly[weekday * 24:(weekday + 1) * 24] = seen.mean(axis=0) if len(seen) else overall
+
+        profile = {'dish_ids': dish_ids, 'hourly': hourly, 'daily': days.sum(axis=1)}
+        with self._lock:
+            self._profile = (today, profile)
+        return profile
+
+    # ── FORECAST (per refresh interval) ──────────────────────────────────────
+
+    def forecast(self) -> Optional[Dict]:
+        """Per-ingredient burn rate, time to stockout and reorder suggestion,
+        most urgent first. Served from cache for `refresh_interval` seconds."""
+        return self._cache.get('forecast', self._compute, ttl=self.refresh_interval)
+
+    def _compute(self) -> Optional[Dict]:
+        now     = datetime.now()
+        profile = self._demand_profile(now.date())
+        ingredients = self.db.get_ingredients()
+        dishes      = self.db.get_dishes()
+        if profile is None or not ingredients:
+            return None
+
+        # Recipe matrix (ingredients x profiled dishes) from current recipes,
+        # so a recipe change shows up on the next refresh.
+        row_of  = {ing['name']: i for i, ing in enumerate(ingredients)}
+        recipes = {dish['id']: dish['ingredients'] for dish in dishes}
+        recipe  = np.zeros((len(ingredients), len(profile['dish_ids'])))
+        for col, dish_id in enumerate(profile['dish_ids']):
+            for name, amount in recipes.get(dish_id, {}).items():
+                if name in row_of:
+                    recipe[row_of[name], col] += float(amount)
+
+        stock   = np.array([ing['stock_quantity'] for ing in ingredients])
+        burn    = profile['hourly'] @ recipe.T            # (168, ingredients)
+        daily   = profile['daily'] @ recipe.T             # (observed days, ingredients)
+        mean_daily = daily.mean(axis=0) if len(daily) else np.zeros(len(ingredients))
+        std_daily  = daily.std(axis=0, ddof=1) if len(daily) > 1 else np.zeros(len(ingredients))
+
+        # Hour-by-hour projection from now; only the rest of the current hour counts.
+        start_hour = now.weekday() * 24 + now.hour
+        remaining  = 1 - (now.minute * 60 + now.second) / 3600.0
+        hours      = (start_hour + np.arange(self.horizon_hours)) % HOURS_PER_WEEK
+        durations  = np.ones(self.horizon_hours)
+        durations[0] = remaining
+        projected  = burn[hours] * durations[:, None]
+        cumulative = np.cumsum(projected, axis=0)
+        elapsed    = np.concatenate([[0.0], np.cumsum(durations)])   # hours before step k
+
+        # First hour in which cumulative burn covers the stock, interpolated within it.
+        reached = cumulative >= stock
+        hit     = reached.any(axis=0) & (stock > 0)
+        step    = reached.argmax(axis=0)
+        cols    = np.arange(len(ingredients))
+        before  = np.where(step > 0, cumulative[np.maximum(step - 1, 0), cols], 0.0)
+        within  = projected[step, cols]
+        fraction = np.divide(stock - before, within, out=np.zeros_like(stock), where=within > 0)
+        to_stockout = np.where(hit, elapsed[step] + fraction * durations[step], np.nan)
+        # Beyond the horizon, extrapolate at the average rate; no demand means never.
+        rate = mean_daily / 24.0
+        beyond = ~hit & (stock > 0) & (rate > 0)
+        to_stockout[beyond] = stock[beyond] / rate[beyond]
+        to_stockout[stock <= 0] = 0.0
+
+        def demand_within(days: float) -> np.ndarray:
+            n = int(min(self.horizon_hours, round(days * 24)))
+            covered = cumulative[n - 1] if n > 0 else np.zeros(len(ingredients))
+            # Past the horizon, top up with the average daily rate.
+            return covered + max(0.0, days * 24 - n) * rate
+
+        safety     = self.service_z * std_daily * math.sqrt(self.lead_time_days)
+        lead       = demand_within(self.lead_time_days)
+        reorder_pt = np.maximum([ing['reorder_level'] for ing in ingredients], lead + safety)
+        order_up   = demand_within(self.lead_time_days + self.review_days) + safety
+        needs      = stock <= reorder_pt
+        suggested  = np.where(needs, np.maximum(order_up - stock, 0.0), 0.0)
+        next_day   = demand_within(1)
+
+        rows = []
+        for i, ing in enumerate(ingredients):
+            hours_left = None if np.isnan(to_stockout[i]) else float(to_stockout[i])
+            if stock[i] <= 0:
+                status = 'Out'
+            elif hours_left is not None and hours_left <= self.lead_time_days * 24:
+                status = 'Critical'   # runs out before a delivery ordered now arrives
+            elif needs[i]:
+                status = 'Reorder'
+            else:
+                status = 'OK'
+            amount = float(suggested[i])
+            rows.append({
+                'id': ing['id'],
+                'name': ing['name'],
+                'unit': ing['unit'],
+                'stock_quantity': ing['stock_quantity'],
+                'reorder_level': ing['reorder_level'],
+                'burn_rate_per_day': round(float(mean_daily[i]), 3),
+                'projected_next_24h': round(float(next_day[i]), 3),
+                'hours_to_stockout': None if hours_left is None else round(hours_left, 1),
+                'stockout_at': None if hours_left is None
+                               else (now + timedelta(hours=hours_left)).isoformat(timespec='minutes'),
+                'reorder_point': round(float(reorder_pt[i]), 3),
+                'suggested_order': math.ceil(amount) if ing['unit'] == 'pieces' else round(amount, 2),
+                'status': status,
+            })
+        rows.sort(key=lambda r: (r['hours_to_stockout'] is None, r['hours_to_stockout'] or 0))
+
+        return {
+            'generated_at': now.isoformat(timespec='seconds'),
+            'observed_days': len(profile['daily']),
+            'lookback_days': self.lookback_days,
+            'horizon_days': self.horizon_hours / 24,
+            'lead_time_days': self.lead_time_days,
+            'review_days': self.review_days,
+            'ingredients': rows,
+        }
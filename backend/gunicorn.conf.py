@@ -0,0 +1,38 @@
+"""gunicorn settings for wsgi:app, taken from config.SERVER_CONFIG.
+Command-line flags (-w, -b, --threads, ...) override them."""
+import signal
+from config import SERVER_CONFIG
+
+bind             = SERVER_CONFIG['bind']
+workers          = SERVER_CONFIG['workers']
+worker_class     = 'gthread'
+threads          = SERVER_CONFIG['threads']
+graceful_timeout = SERVER_CONFIG['graceful_timeout']
+keepalive        = 5
+
+# The app opens connections and starts threads at import, which must happen
+# in each worker, not once in the master before fork.
+preload_app = False
+
+
+def post_worker_init(worker):
+    """End open SSE streams as soon as the worker is asked to stop, so
+    dashboards don't hold a graceful shutdown open until graceful_timeout.
+    Clients reconnect to another worker after the stream's retry delay."""
+    from wsgi import db
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def on_term(signum, frame):
+        db.events.close()
+        if callable(previous):
+            previous(signum, frame)
+
+    signal.signal(signal.SIGTERM, on_term)
+
+
+def worker_exit(server, worker):
+    """Runs in the worker once it has stopped serving: flush queued order
+    writes and close the pool. In 'queue' mode anything left over stays in
+    the worker's WAL and is adopted by the next worker to start."""
+    from wsgi import shutdown
+    shutdown(timeout=SERVER_CONFIG['drain_timeout'])
@@ -0,0 +1,276 @@
+"""Sales history for trend queries over any span.
+
+As days close they are folded (Database.fold_history_day) into narrow fact
+tables: sales_daily, sales_weekly and sales_monthly hold per-dish quantity,
+order count and revenue per period, while the hourly grain stays in
+daily_dish_hourly. SalesHistory mirrors the three tables as dense NumPy
+matrices (periods x dishes), so a week-over-week, month or year-to-date
+trend over years of data is an array slice and a sum.
+
+A closed day is (re)folded whenever its orders:<date> data version differs
+from the one recorded when it was last folded: the first time it closes, and
+again after backdated orders or a rollup rebuild change it. Other worker
+processes see the folded versions move and patch just the affected periods.
+"""
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from database import Database
+
+LEVELS = ('day', 'week', 'month')
+
+
+def period_index(level: str, d: date) -> int:
+    """Consecutive integer for the period containing `d` (weeks start Monday)."""
+    if level == 'day':
+        return d.toordinal()
+    if level == 'week':
+        return (d.toordinal() - 1) // 7   # ordinal 1 (0001-01-01) is a Monday
+    return d.year * 12 + d.month - 1
+
+
+def period_start(level: str, index: int) -> date:
+    if level == 'day':
+        return date.fromordinal(index)
+    if level == 'week':
+        return date.fromordinal(index * 7 + 1)
+    return date(index // 12, index % 12 + 1, 1)
+
+
+class _Level:
+    """Dense per-period, per-dish matrices for one granularity. Row 0 is
+    period index `first`; columns follow SalesHistory's dish order."""
+
+    def __init__(self):
+        self.first    = None
+        self.quantity = np.zeros((0, 0), dtype=np.int64)
+        self.orders   = np.zeros((0, 0), dtype=np.int64)
+        self.sales    = np.zeros((0, 0), dtype=np.float64)
+
+    def _grow(self, lo: int, hi: int, columns: int):
+        """Make room for period indexes [lo, hi] and `columns` dishes."""
+        if self.first is None:
+            self.first = lo
+        rows = self.quantity.shape[0]
+        before = max(0, self.first - lo)
+        after  = max(0, hi - (self.first + rows - 1))
+        extra  = max(0, columns - self.quantity.shape[1])
+        if before or after or extra:
+            pad = ((before, after), (0, extra))
+            self.quantity = np.pad(self.quantity, pad)
+            self.orders   = np.pad(self.orders, pad)
+            self.sales    = np.pad(self.sales, pad)
+            self.first   -= before
+
+    def replace(self, periods: Dict[int, List], columns: int):
+        """Overwrite whole periods: {period index: [(column, qty, orders, sales)]}."""
+        if not periods:
+            return
+        self._grow(min(periods), max(periods), columns)
+        for index, values in periods.items():
+            row = index - self.first
+            self.quantity[row] = 0
+            self.orders[row]   = 0
+            self.sales[row]    = 0.0
+            if values:
+                cols, qty, orders, sales = zip(*values)
+                cols = list(cols)
+                self.quantity[row, cols] = qty
+                self.orders[row, cols]   = orders
+                self.sales[row, cols]    = sales
+
+
+class SalesHistory:
+    """Per-process NumPy mirror of the sales history fact tables.
+
+    sync() folds closed days whose orders changed and patches the arrays.
+    It runs at most every `sync_interval` seconds (trend() calls it), or on
+    the next call after a local rollup rebuild or backdated upload.
+    """
+
+    def __init__(self, db: Database, sync_interval: float = 60.0, patch_limit: int = 62,
+                 max_periods: int = 1000):
+        self.db            = db
+        self.sync_interval = sync_interval
+        self.max_periods   = max_periods
+        self.patch_limit   = patch_limit     # changed days beyond which arrays are reloaded
+        self._lock    = threading.RLock()
+        self._levels  = {level: _Level() for level in LEVELS}
+        self._columns = {}      # dish_id -> matrix column
+        self._folded  = {}      # date -> orders version reflected in the arrays
+        self._scanned = False   # unfolded legacy days looked for yet
+        self._dirty   = True
+        self._synced_at = 0.0
+        db.events.add_listener(self._on_event)
+
+    def _on_event(self, event: str, data: Dict):
+        if event == 'report_changed':   # rollup rebuilt or backdated orders landed
+            self._dirty = True
+
+    # ── SYNC ──────────────────────────────────────────────────────────────────
+
+    def sync(self, force: bool = False) -> bool:
+        """Bring the fact tables and arrays up to date. False if the database
+        was unreachable (the arrays keep serving what they have)."""
+        with self._lock:
+            now = time.monotonic()
+            if not (force or self._dirty or now - self._synced_at >= self.sync_interval):
+                return True
+            state = self.db.get_history_state(scan=not self._scanned)
+            if state is None:
+                return False
+            self._dirty, self._synced_at, self._scanned = False, now, True
+            current, folded = state
+
+            today = date.today().isoformat()
+            stale = sorted(d for d, v in current.items() if d < today and folded.get(d) != v)
+            if stale:
+                print(f"Folding {len(stale)} day(s) into sales history")
+            for day in stale:
+                version = self.db.fold_history_day(day)
+                if version is not None:
+                    folded[day] = version
+
+            changed = [d for d, v in folded.items() if self._folded.get(d) != v]
+            if not changed:
+                return True
+            if not self._folded or len(changed) > self.patch_limit:
+                loaded = self._load()
+            else:
+                loaded = self._patch(changed)
+            if loaded:
+                self._folded = folded
+            return loaded
+
+    def _column(self, dish_id: int) -> int:
+        return self._columns.setdefault(dish_id, len(self._columns))
+
+    def _apply(self, level: str, rows: List[Dict], periods: Dict[int, List]):
+        indexes = {}   # period string -> index; rows arrive grouped by period
+        for row in rows:
+            index = indexes.get(row['period'])
+            if index is None:
+                index = indexes[row['period']] = period_index(
+                    level, datetime.strptime(row['period'], '%Y-%m-%d').date())
+            periods.setdefault(index, []).append(
+                (self._column(row['dish_id']), row['quantity'], row['order_count'], row['sales']))
+        self._levels[level].replace(periods, len(self._columns))
+
+    def _load(self) -> bool:
+        for level in LEVELS:
+            rows = self.db.get_history_rows(level)
+            if rows is None:
+                return False
+            self._levels[level] = _Level()
+            self._apply(level, rows, {})
+        return True
+
+    def _patch(self, days: List[str]) -> bool:
+        parsed = [datetime.strptime(d, '%Y-%m-%d').date() for d in days]
+        for level in LEVELS:
+            indexes = {period_index(level, d) for d in parsed}
+            starts  = sorted(period_start(level, i).isoformat() for i in indexes)
+            rows = self.db.get_history_rows(level, starts)
+            if rows is None:
+                return False
+            # Periods with no rows left (all orders removed) are zeroed too.
+            self._apply(level, rows, {i: [] for i in indexes})
+        return True
+
+    # ── QUERIES ───────────────────────────────────────────────────────────────
+
+    def trend(self, granularity: str = 'day', start: Optional[str] = None,
+              end: Optional[str] = None, dish_ids: Optional[List[int]] = None) -> Dict:
+        """Totals per period over closed days in [start, end], optionally for
+        some dishes only, plus span totals and per-dish totals.
+
+        `start` is clamped to the oldest history and `end` to yesterday; by
+        default the span is the latest `max_periods` periods up to yesterday.
+        Periods are labelled by their first day; partial first/last weeks and
+        months cover the whole period. Raises ValueError for a span longer
+        than `max_periods` or one with no closed day (`start` today or later).
+        """
+        if granularity not in LEVELS:
+            raise ValueError(f"granularity must be one of {', '.join(LEVELS)}")
+        end_d   = datetime.strptime(end, '%Y-%m-%d').date() if end else None
+        start_d = datetime.strptime(start, '%Y-%m-%d').date() if start else None
+        self.sync()
+
+        with self._lock:
+            level = self._levels[granularity]
+            last  = date.today() - timedelta(days=1)
+            if start_d and end_d and end_d < start_d:
+                raise ValueError("'end' must not be before 'start'")
+            if start_d and start_d > last:
+                raise ValueError(f"'start' must be before today: trends cover closed days, "
+                                 f"the latest is {last.isoformat()}")
+            end_d = min(end_d, last) if end_d else last
+            hi = period_index(granularity, end_d)
+            lo = period_index(granularity, start_d) if start_d else hi - self.max_periods + 1
+            # Nothing is stored before level.first; a span wholly before it
+            # is its last (empty) period.
+            lo = hi if level.first is None else min(max(lo, level.first), hi)
+            length = hi - lo + 1
+            if length > self.max_periods:
+                raise ValueError(f"the span covers {length} {granularity}s; at most "
+                                 f"{self.max_periods} are allowed, narrow it or use a "
+                                 f"coarser granularity")
+            start_d = max(start_d, period_start(granularity, lo)) if start_d else period_start(granularity, lo)
+            columns = self._columns
+            if level.first is not None:
+                level._grow(level.first, level.first, len(columns))
+            if dish_ids is None:
+                cols, ids = slice(None), list(columns)   # dict order == column order
+            else:
+                ids  = [d for d in dish_ids if d in columns]
+                cols = [columns[d] for d in ids]
+
+            quantity = np.zeros(length, dtype=np.int64)
+            orders   = np.zeros(length, dtype=np.int64)
+            sales    = np.zeros(length, dtype=np.float64)
+            by_dish  = np.zeros((3, len(ids)), dtype=np.float64)
+            if level.first is not None and ids:
+                a = max(lo, level.first)
+                b = min(hi, level.first + level.quantity.shape[0] - 1)
+                if a <= b:
+                    rows = slice(a - level.first, b - level.first + 1)
+                    out  = slice(a - lo, b - lo + 1)
+                    q = level.quantity[rows][:, cols]
+                    o = level.orders[rows][:, cols]
+                    s = level.sales[rows][:, cols]
+                    quantity[out], orders[out], sales[out] = q.sum(axis=1), o.sum(axis=1), s.sum(axis=1)
+                    by_dish = np.vstack([q.sum(axis=0), o.sum(axis=0), s.sum(axis=0)])
+
+        series = [
+            {
+                'period': period_start(granularity, lo + i).isoformat(),
+                'quantity': int(quantity[i]),
+                'orders': int(orders[i]),
+                'sales': round(float(sales[i]), 2),
+            }
+            for i in range(length)
+        ]
+        dishes = sorted(
+            (
+                {'dish_id': dish_id, 'quantity': int(by_dish[0][i]),
+                 'orders': int(by_dish[1][i]), 'sales': round(float(by_dish[2][i]), 2)}
+                for i, dish_id in enumerate(ids) if by_dish[0][i]
+            ),
+            key=lambda d: d['sales'], reverse=True,
+        )
+        return {
+            'granularity': granularity,
+            'start': start_d.isoformat(),
+            'end': end_d.isoformat(),
+            'series': series,
+            'totals': {
+                'quantity': int(quantity.sum()),
+                'orders': int(orders.sum()),
+                'sales': round(float(sales.sum()), 2),
+            },
+            'dishes': dishes,
+        }
@@ -0,0 +1,114 @@
+"""Operational commands.
+
+Usage (from backend/):
+    python manage.py init-db    create the database and tables, apply
+                                migrations, insert sample data and backfill
+                                rollups and sales history; run once per
+                                deploy, before workers
+    python manage.py generate-data --days 30 --dishes 200 --orders-per-day 100000
+                                add a synthetic menu and order history for
+                                benchmarks (see workload.py)
+    python manage.py backfill-reports --start 2022-01-01 --workers 8
+                                store final daily reports for imported
+                                history in parallel; rerun to resume (see
+                                backfill.py)
+
+All take --sqlite PATH to work on a SQLite file instead of DB_CONFIG.
+"""
+import argparse
+import sys
+
+from backends import SQLiteBackend
+from database import Database
+from history import SalesHistory
+
+
+def _open(args) -> Database:
+    return Database(init_schema=False,
+                    backend=SQLiteBackend(args.sqlite) if args.sqlite else None)
+
+
+def init_db(args) -> int:
+    db = _open(args)
+    try:
+        if not db.init_database():
+            return 1
+        db.backfill_rollups()
+        SalesHistory(db).sync(force=True)
+    finally:
+        db.close()
+    print("Database ready.")
+    return 0
+
+
+def generate_data(args) -> int:
+    import workload  # NumPy-heavy; only needed here
+
+    db = _open(args)
+    try:
+        if not db.init_database():
+            return 1
+        workload.generate(db, days=args.days, dishes=args.dishes,
+                          orders_per_day=args.orders_per_day,
+                          ingredients=args.ingredients, seed=args.seed)
+        SalesHistory(db).sync(force=True)
+    finally:
+        db.close()
+    return 0
+
+
+def backfill(args) -> int:
+    from backfill import CheckpointMismatch, backfill_reports
+
+    db = _open(args)
+    try:
+        ok = backfill_reports(db, sqlite_path=args.sqlite, start=args.start, end=args.end,
+                              workers=args.workers, batch_days=args.batch_days,
+                              checkpoint=args.checkpoint, force=args.force,
+                              rebuild_rollups=args.rebuild_rollups)
+        if ok and args.rebuild_rollups:
+            SalesHistory(db).sync(force=True)
+    except CheckpointMismatch as e:
+        print(f"Refusing to resume: {e}")
+        return 1
+    finally:
+        db.close()
+    return 0 if ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Food analytics management commands')
+    commands = parser.add_subparsers(dest='command', required=True)
+    init = commands.add_parser('init-db', help='create/migrate the schema and backfill rollups')
+    init.set_defaults(func=init_db)
+
+    gen = commands.add_parser('generate-data', help='add a synthetic menu and order history')
+    gen.add_argument('--days', type=int, default=30)
+    gen.add_argument('--dishes', type=int, default=200)
+    gen.add_argument('--ingredients', type=int, default=80)
+    gen.add_argument('--orders-per-day', type=int, default=100_000)
+    gen.add_argument('--seed', type=int, default=0)
+    gen.set_defaults(func=generate_data)
+
+    fill = commands.add_parser('backfill-reports', help='precompute daily reports for past days in parallel')
+    fill.add_argument('--start', help='first day (YYYY-MM-DD; default: oldest order)')
+    fill.add_argument('--end', help='last day (default: yesterday)')
+    fill.add_argument('--workers', type=int, help='worker processes (default: CPU count)')
+    fill.add_argument('--batch-days', type=int, default=31, help='days per batch and per commit')
+    fill.add_argument('--checkpoint', default='backfill_reports.json',
+                      help="progress file used to resume ('' to disable)")
+    fill.add_argument('--force', action='store_true',
+                      help='recompute days that already have a final report and discard the checkpoint')
+    fill.add_argument('--rebuild-rollups', action='store_true',
+                      help="rebuild each day's rollups from orders first (imports without rollups)")
+    fill.set_defaults(func=backfill)
+
+    for command in (init, gen, fill):
+        command.add_argument('--sqlite', metavar='PATH',
+                             help="use this SQLite file (or ':memory:') instead of DB_CONFIG")
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+"""Request and query metrics, served at /api/metrics in Prometheus text format.
+
+RequestMetrics times every HTTP request per endpoint; QueryMetrics (owned by
+Database) times connection checkouts and each execute_query call, and logs
+slow queries. Query time spent while a request is being served is also
+charged to that request's endpoint, so `http_request_db_seconds` shows which
+endpoint is loading the database.
+
+Metrics are per process. Under several gunicorn workers each scrape is
+answered by one worker; scrape the workers individually (or accept the
+sampling) rather than expecting one merged view.
+"""
+import bisect
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Sequence, Tuple
+
+# Seconds. Covers sub-millisecond primary-key lookups up to slow exports.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(names: Sequence[str], values: Tuple, extra: str = '') -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+_LE_INF = 'le="+Inf"'
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name    = name
+        self.help    = help
+        self.labels  = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock   = threading.Lock()
+        self._series = {}   # label values -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, *label_values):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        for values, series in sorted(items):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labels, values, le)} {cumulative}"
+            cumulative += series[len(self.buckets)]
+            yield f"{self.name}_bucket{_labels(self.labels, values, _LE_INF)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, values)} {_number(series[-1])}"
+            yield f"{self.name}_count{_labels(self.labels, values)} {cumulative}"
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name    = name
+        self.help    = help
+        self.labels  = tuple(labels)
+        self._lock   = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount: float = 1, *label_values):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, total in items:
+            yield f"{self.name}{_labels(self.labels, values)} {_number(total)}"
+
+
+class Callback:
+    """A gauge or counter read from `fn` at scrape time (pool stats, queue depth)."""
+
+    def __init__(self, name: str, help: str, fn: Callable[[], float], kind: str = 'gauge'):
+        self.name = name
+        self.help = help
+        self.fn   = fn
+        self.kind = kind
+
+    def samples(self):
+        try:
+            value = self.fn()
+        except Exception as e:
+            print(f"Metric {self.name} unavailable: {e}")
+            return
+        yield f"{self.name} {_number(value)}"
+
+
+class Registry:
+    """Named metrics of one process. Asking for an existing name returns the
+    registered metric, so several Database instances share their series."""
+
+    def __init__(self):
+        self._lock    = threading.Lock()
+        self._metrics = {}
+
+    def _get(self, name: str, make: Callable):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = make()
+            return metric
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._get(name, lambda: Histogram(name, help, labels, buckets))
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._get(name, lambda: Counter(name, help, labels))
+
+    def callback(self, name: str, help: str, fn: Callable[[], float], kind: str = 'gauge'):
+        """Register (or replace) a metric read from `fn` at scrape time."""
+        with self._lock:
+            self._metrics[name] = Callback(name, help, fn, kind)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# DB time and query count of the request being served on this thread.
+_current = threading.local()
+
+
+@lru_cache(maxsize=1024)
+def query_name(sql: str) -> str:
+    """Low-cardinality label for a statement: its verb and first table,
+    e.g. 'select orders' or 'insert daily_dish_hourly'."""
+    verb = sql.split(None, 1)[0].lower() if sql.strip() else 'unknown'
+    match = re.search(r'\b(?:FROM|INTO|UPDATE|TABLE)\s+`?(\w+)', sql, re.IGNORECASE)
+    return f"{verb} {match.group(1)}" if match else verb
+
+
+class QueryMetrics:
+    """Connection-checkout and query timings for one Database."""
+
+    def __init__(self, registry: Registry = REGISTRY, slow_query_ms: float = 0):
+        self.slow_query_s = slow_query_ms / 1000.0
+        self._acquire = registry.histogram(
+            'db_pool_acquire_seconds', 'Time to check a connection out of the pool')
+        self._duration = registry.histogram(
+            'db_query_duration_seconds', 'execute_query time, excluding connection checkout',
+            ['query'])
+        self._rows = registry.histogram(
+            'db_query_rows', 'Rows returned (reads) or affected (writes) by execute_query',
+            ['query'], buckets=ROW_BUCKETS)
+        self._errors = registry.counter(
+            'db_query_errors_total', 'execute_query calls that raised a database error', ['query'])
+
+    def observe_acquire(self, seconds: float):
+        self._acquire.observe(seconds)
+        self._charge(seconds, queries=0)
+
+    def observe_query(self, sql: str, seconds: float, rows: int, params=None, failed: bool = False):
+        name = query_name(sql)
+        self._duration.observe(seconds, name)
+        if failed:
+            self._errors.inc(1, name)
+        else:
+            self._rows.observe(rows, name)
+        self._charge(seconds, queries=1)
+        if self.slow_query_s and seconds >= self.slow_query_s:
+            text = ' '.join(sql.split())
+            print(f"Slow query ({seconds * 1000:.1f} ms, {rows} rows): {text[:500]} "
+                  f"params={repr(params)[:200]}")
+
+    @staticmethod
+    def _charge(seconds: float, queries: int):
+        if getattr(_current, 'active', False):
+            _current.db_seconds += seconds
+            _current.queries += queries
+
+
+class RequestMetrics:
+    """Per-endpoint request latency, plus the DB time each request spent."""
+
+    def __init__(self, registry: Registry = REGISTRY):
+        self._duration = registry.histogram(
+            'http_request_duration_seconds', 'Time to serve a request, including a streamed body',
+            ['method', 'endpoint', 'status'])
+        self._db = registry.histogram(
+            'http_request_db_seconds', 'Database time (checkout + queries) spent per request',
+            ['endpoint'])
+        self._queries = registry.counter(
+            'http_request_db_queries_total', 'execute_query calls made while serving requests',
+            ['endpoint'])
+
+    def start(self):
+        _current.active     = True
+        _current.started    = time.perf_counter()
+        _current.db_seconds = 0.0
+        _current.queries    = 0
+
+    def cancel(self):
+        """Stop attributing this thread's work (long-lived streams)."""
+        _current.active = False
+
+    def finish(self, method: str, endpoint: str, status: int):
+        if not getattr(_current, 'active', False):
+            return
+        _current.active = False
+        self._duration.observe(time.perf_counter() - _current.started, method, endpoint, str(status))
+        self._db.observe(_current.db_seconds, endpoint)
+        if _current.queries:
+            self._queries.inc(_current.queries, endpoint)
@@ -0,0 +1,124 @@
+"""Versioned schema changes for existing installs.
+
+init_database creates the baseline tables with CREATE TABLE IF NOT EXISTS;
+anything that changes a table after that goes here as a new, numbered entry.
+Applied versions are recorded in schema_migrations so each runs exactly once.
+Never edit or reorder an entry that has shipped - append a new one instead.
+
+A backend whose baseline schema already includes the first N migrations
+(see StorageBackend.baseline_version) records them as applied on a fresh
+database instead of running them.
+"""
+from typing import Callable, Dict, List, Tuple, Union
+
+from recipes import link_recipes
+
+# (version, description, steps). A step is a SQL string, a callable that
+# receives the cursor (for changes that need to look at data first), or a
+# {dialect: step} dict where the backends need different SQL.
+Step = Union[str, Callable, Dict[str, Union[str, Callable]]]
+
+MIGRATIONS: List[Tuple[int, str, List[Step]]] = [
+    (1, 'covering index for per-day order scans', [
+        # (date, dish_id, order_time, quantity) answers the daily GROUP BY and
+        # range scans from the index alone; idx_date is a prefix of it.
+        '''ALTER TABLE orders
+               ADD INDEX idx_orders_report (date, dish_id, order_time, quantity),
+               DROP INDEX idx_date''',
+    ]),
+    (2, 'versioned daily_reports with a final flag', [
+        '''ALTER TABLE daily_reports
+               ADD COLUMN format_version SMALLINT NOT NULL DEFAULT 1,
+               ADD COLUMN is_final TINYINT(1) NOT NULL DEFAULT 0''',
+        # Rows already holding per-dish peak_hours are format 2. Legacy
+        # flat-array rows can't be converted (no per-dish split), so they are
+        # dropped and regenerated from the rollups on first read. Nothing is
+        # marked final: each closed day is regenerated once, then served.
+        "UPDATE daily_reports SET format_version = 2 WHERE JSON_TYPE(peak_hours) = 'OBJECT'",
+        "DELETE FROM daily_reports WHERE format_version = 1",
+    ]),
+    (3, 'idempotency keys for retried order uploads', [
+        # NULL for ordinary orders; UNIQUE ignores NULLs.
+        '''ALTER TABLE orders
+               ADD COLUMN idempotency_key VARCHAR(64) NULL,
+               ADD UNIQUE INDEX uq_orders_idempotency (idempotency_key)''',
+    ]),
+    (4, 'index for paging a day\'s orders by id', [
+        # Keyset pages (WHERE date = d AND id < cursor ORDER BY id DESC) seek
+        # straight to the cursor instead of sorting the whole day.
+        'ALTER TABLE orders ADD INDEX idx_orders_date_id (date, id)',
+    ]),
+    (5, 'link existing recipes into dish_ingredients', [
+        # The table itself is in the baseline schema; fill it from the JSON
+        # recipes already stored.
+        link_recipes,
+    ]),
+    (6, 'order-time unit prices', [
+        # Sales rebuilt from orders used the current menu price, while the
+        # rollups add_order keeps used the price at order time. Existing
+        # orders can only be given today's price; new ones record their own.
+        'ALTER TABLE orders ADD COLUMN unit_price DECIMAL(10,2) NULL',
+        '''UPDATE orders
+              SET unit_price = (SELECT price FROM dishes WHERE dishes.id = orders.dish_id)
+            WHERE unit_price IS NULL''',
+        # Keep the daily GROUP BY answered from the index alone.
+        {
+            'mysql': '''ALTER TABLE orders
+                            DROP INDEX idx_orders_report,
+                            ADD INDEX idx_orders_report (date, dish_id, order_time, quantity, unit_price)''',
+            'sqlite': lambda cursor: (
+                cursor.execute('DROP INDEX IF EXISTS idx_orders_report'),
+                cursor.execute('''CREATE INDEX idx_orders_report
+                                      ON orders (date, dish_id, order_time, quantity, unit_price)'''),
+            ),
+        },
+    ]),
+]
+
+
+def current_version(cursor) -> int:
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+    return int(cursor.fetchone()[0])
+
+
+def apply_migrations(conn, dialect: str = 'mysql', baseline: int = 0) -> int:
+    """Apply every pending migration in order. Returns the resulting version.
+
+    MySQL commits DDL implicitly, so each migration is recorded as soon as its
+    steps succeed; a failure stops the run and is retried on next start-up.
+    """
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    version = current_version(cursor)
+    fresh = version == 0
+
+    for number, description, steps in MIGRATIONS:
+        if number <= version:
+            continue
+        if fresh and number <= baseline:
+            # Fresh database: the baseline schema already has this change.
+            steps = []
+        else:
+            print(f"Applying migration {number}: {description}")
+        for step in steps:
+            if isinstance(step, dict):
+                step = step[dialect]
+            if callable(step):
+                step(cursor)
+            else:
+                cursor.execute(step)
+        cursor.execute(
+            "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+            (number, description),
+        )
+        conn.commit()
+        version = number
+
+    cursor.close()
+    return version
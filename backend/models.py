@@ -25,6 +25,10 @@ class Ingredient:
     unit: str
     reorder_level: float
 
+# Layout of reports stored in daily_reports. 1 = legacy flat-array peak_hours,
+# 2 = peak_hours as {dish_name: [24 hourly quantities]}.
+REPORT_FORMAT_VERSION = 2
+
 @dataclass
 class DailyReport:
     date: str
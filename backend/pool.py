@@ -0,0 +1,171 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out within the wait timeout."""
+
+
+class ConnectionPool:
+    """Bounded pool of DB connections with pre-ping and max-lifetime recycling.
+
+    A pooled socket can be dropped server-side (MySQL wait_timeout) while
+    is_connected() still returns True locally, which surfaces later as
+    'bytearray index out of range'. Every checkout therefore pings the
+    connection first and transparently replaces it when the ping fails, and
+    connections older than `recycle` seconds are closed instead of reused.
+    """
+
+    def __init__(self, connect: Callable, size: int = 5, timeout: float = 10.0,
+                 recycle: float = 1800.0, ping: bool = True):
+        self._connect = connect
+        self.size     = max(1, int(size))
+        self.timeout  = float(timeout)
+        self.recycle  = float(recycle)
+        self.ping     = ping
+
+        self._lock      = threading.Condition()
+        self._idle      = deque()   # (conn, created_at)
+        self._born      = {}        # id(conn) -> created_at for checked-out conns
+        self._in_use    = 0
+        self._closed    = False
+        self._stats     = {'created': 0, 'waits': 0, 'timeouts': 0,
+                           'recycles': 0, 'stale': 0, 'checkouts': 0}
+
+    # ── CHECKOUT / RETURN ─────────────────────────────────────────────────────
+
+    def acquire(self):
+        """Return a live connection, waiting up to `timeout` seconds for one.
+        Raises ConnectionError once the pool has been closed."""
+        deadline = time.monotonic() + self.timeout
+        with self._lock:
+            while not self._closed and not self._idle and self._in_use >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(
+                        f"No connection available within {self.timeout:.1f}s "
+                        f"(pool size {self.size})"
+                    )
+                self._stats['waits'] += 1
+                self._lock.wait(remaining)
+            if self._closed:
+                raise ConnectionError("Connection pool is closed")
+
+            item = self._idle.pop() if self._idle else None
+            self._in_use += 1
+            self._stats['checkouts'] += 1
+
+        # Validation and connecting happen outside the lock so a slow server
+        # doesn't block other threads from returning connections.
+        try:
+            conn = self._checkout(item)
+        except BaseException:
+            with self._lock:
+                self._in_use -= 1
+                self._lock.notify()
+            raise
+        return conn
+
+    def _checkout(self, item):
+        if item is not None:
+            conn, created_at = item
+            if time.monotonic() - created_at > self.recycle:
+                self._count('recycles')
+                self._close(conn)
+            elif self._alive(conn):
+                self._born[id(conn)] = created_at
+                return conn
+            else:
+                self._count('stale')
+                self._close(conn)
+
+        conn = self._connect()
+        if conn is None:
+            raise ConnectionError("Could not open a database connection")
+        self._count('created')
+        self._born[id(conn)] = time.monotonic()
+        return conn
+
+    def release(self, conn, discard: bool = False):
+        """Return a connection to the pool, or close it when `discard` is set
+        or the pool has been closed.
+
+        Any open transaction is rolled back so the next borrower starts from a
+        clean snapshot instead of one left behind by a read-only query.
+        """
+        created_at = self._born.pop(id(conn), time.monotonic())
+        discard = discard or self._closed
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+        if discard:
+            self._close(conn)
+
+        with self._lock:
+            self._in_use -= 1
+            # Re-checked under the lock: close_all may have run since.
+            keep = not discard and not self._closed
+            if keep:
+                self._idle.append((conn, created_at))
+            self._lock.notify()
+        if not keep and not discard:
+            self._close(conn)
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and always returns it."""
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except Exception:
+            broken = not self._alive(conn, ping=False)
+            raise
+        finally:
+            self.release(conn, discard=broken)
+
+    # ── HELPERS ───────────────────────────────────────────────────────────────
+
+    def _alive(self, conn, ping: bool = None) -> bool:
+        try:
+            if not conn.is_connected():
+                return False
+            if self.ping if ping is None else ping:
+                conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _close(self, conn):
+        try: conn.close()
+        except Exception: pass
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def close_all(self):
+        """Close the pool: every idle connection now, checked-out ones as they
+        are released. Later acquire() calls, and threads waiting in one,
+        raise ConnectionError."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._lock.notify_all()
+        for conn, _ in idle:
+            self._close(conn)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'size': self.size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                **self._stats,
+            }
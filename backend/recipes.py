@@ -0,0 +1,177 @@
+"""Compiled recipes: which ingredients each dish uses, and the reverse.
+
+`dishes.ingredients` (JSON, keyed by ingredient name) stays the recipe
+as entered; dish_ingredients is its normalized form keyed by ingredient id.
+Links are added for one ingredient at a time as it is stocked
+(link_ingredient), carried over a rename, which also renames the key in
+the linked recipes (rename_ingredient), and removed with the ingredient by
+ON DELETE CASCADE. link_recipes() rebuilds the whole table and is only
+used to fill it the first time.
+
+RecipeIndex compiles the menu and its links once into per-dish ingredient
+vectors, a dish x ingredient matrix and the reverse ingredient -> dishes
+map, so order deductions, usage totals and "what does this ingredient
+block" are lookups rather than JSON walks and name scans.
+"""
+import json
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from aggregation import ReportAggregator
+
+
+def _values(row) -> tuple:
+    return tuple(row.values()) if isinstance(row, dict) else tuple(row)
+
+
+def link_recipes(cursor) -> int:
+    """Rebuild dish_ingredients from the dishes' JSON recipes on the caller's
+    cursor (and transaction). Recipe names without a stocked ingredient have
+    no id and are left out. Returns the number of links written."""
+    cursor.execute("SELECT id, name FROM ingredients")
+    ids = {name: ingredient_id for ingredient_id, name in map(_values, cursor.fetchall())}
+    cursor.execute("SELECT id, ingredients FROM dishes")
+    links = [
+        (dish_id, ids[name], amount)
+        for dish_id, recipe in map(_values, cursor.fetchall())
+        for name, amount in json.loads(recipe).items()
+        if name in ids
+    ]
+    cursor.execute("DELETE FROM dish_ingredients")
+    if links:
+        cursor.executemany(
+            "INSERT INTO dish_ingredients (dish_id, ingredient_id, amount) VALUES (%s, %s, %s)",
+            links,
+        )
+    return len(links)
+
+
+def link_ingredient(cursor, ingredient_id: int) -> int:
+    """Link one ingredient to every recipe that names it, on the caller's
+    cursor (and transaction); other links are left alone. Returns the
+    number of links written, 0 for an unknown ingredient."""
+    cursor.execute("SELECT name FROM ingredients WHERE id = %s", (ingredient_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return 0
+    name = _values(row)[0]
+    cursor.execute("SELECT id, ingredients FROM dishes")
+    links = [
+        (dish_id, ingredient_id, recipe[name])
+        for dish_id, recipe in ((d, json.loads(r)) for d, r in map(_values, cursor.fetchall()))
+        if name in recipe
+    ]
+    if links:
+        cursor.executemany(
+            """INSERT INTO dish_ingredients (dish_id, ingredient_id, amount) VALUES (%s, %s, %s)
+               ON DUPLICATE KEY UPDATE amount = VALUES(amount)""",
+            links,
+        )
+    return len(links)
+
+
+def rename_ingredient(cursor, ingredient_id: int, old: str, new: str) -> int:
+    """Follow an ingredient rename in the recipes linked to it: their JSON
+    key `old` becomes `new` (amounts are summed if a recipe already lists
+    `new`), then recipes that listed `new` unstocked are linked too. Runs on
+    the caller's cursor after the ingredients row was updated. Returns the
+    number of recipes rewritten."""
+    cursor.execute(
+        """SELECT d.id, d.ingredients
+             FROM dishes d
+             JOIN dish_ingredients di ON di.dish_id = d.id
+            WHERE di.ingredient_id = %s""",
+        (ingredient_id,),
+    )
+    rewritten = []
+    for dish_id, recipe in map(_values, cursor.fetchall()):
+        recipe = json.loads(recipe)
+        if old not in recipe:
+            continue
+        renamed = {}
+        for name, amount in recipe.items():
+            key = new if name == old else name
+            renamed[key] = renamed.get(key, 0) + amount
+        rewritten.append((json.dumps(renamed), dish_id))
+    if rewritten:
+        cursor.executemany("UPDATE dishes SET ingredients = %s WHERE id = %s", rewritten)
+    link_ingredient(cursor, ingredient_id)
+    return len(rewritten)
+
+
+class RecipeIndex:
+    """The menu's recipes compiled for lookups.
+
+    lines[dish_id]  [(ingredient name, ingredient id or None, amount)]
+    users[ingredient_id]  [(dish_id, amount)], the reverse map
+    matrix  (dishes x ingredients) amounts, rows in `dish_ids` order and
+            columns in `ingredient_ids` order (stocked ingredients only)
+
+    `links` are dish_ingredients rows joined with the ingredient's current
+    name ({dish_id, ingredient_id, name, amount}); recipe entries without a
+    link are matched to a stocked ingredient by name, or have no id.
+    """
+
+    def __init__(self, dishes: List[Dict], ingredients: List[Dict], links: List[Dict] = ()):
+        self.dishes = {d['id']: d for d in dishes}
+        self.ingredient_ids = [i['id'] for i in ingredients]
+        self.id_of  = {i['name']: i['id'] for i in ingredients}
+        self.column = {ingredient_id: j for j, ingredient_id in enumerate(self.ingredient_ids)}
+
+        linked: Dict[int, Dict[str, Tuple[int, float]]] = {}
+        for link in links:
+            linked.setdefault(link['dish_id'], {})[link['name']] = (link['ingredient_id'], float(link['amount']))
+        self.lines = {d['id']: self.compile(d['ingredients'], linked.get(d['id'], {})) for d in dishes}
+        self.users: Dict[int, List[Tuple[int, float]]] = {i: [] for i in self.ingredient_ids}
+        self.dish_ids = sorted(self.lines)
+        self.row      = {dish_id: r for r, dish_id in enumerate(self.dish_ids)}
+        self.matrix   = np.zeros((len(self.dish_ids), len(self.ingredient_ids)))
+        for dish_id in self.dish_ids:
+            for _, ingredient_id, amount in self.lines[dish_id]:
+                if ingredient_id in self.column:
+                    self.users[ingredient_id].append((dish_id, amount))
+                    self.matrix[self.row[dish_id], self.column[ingredient_id]] += amount
+        self._aggregator = None
+
+    def compile(self, recipe: Dict[str, float],
+                linked: Dict[str, Tuple[int, float]] = None) -> List[Tuple[str, Optional[int], float]]:
+        """Recipe lines in recipe order, taking ids and amounts from the
+        dish's `linked` {ingredient name: (id, amount)} where there is one.
+        Links no recipe name matches (a rename made behind the app's back)
+        come last."""
+        linked = dict(linked or {})
+        lines = [
+            (name, *linked.pop(name)) if name in linked else (name, self.id_of.get(name), float(amount))
+            for name, amount in recipe.items()
+        ]
+        return lines + [(name, ingredient_id, amount) for name, (ingredient_id, amount) in linked.items()]
+
+    def dish_lines(self, dish: Dict) -> List[Tuple[str, Optional[int], float]]:
+        """Compiled recipe of `dish`, compiling on the spot for a dish newer
+        than the index."""
+        lines = self.lines.get(dish['id'])
+        return lines if lines is not None else self.compile(dish['ingredients'])
+
+    @property
+    def aggregator(self) -> ReportAggregator:
+        """ReportAggregator for this menu, built on first use and reused."""
+        if self._aggregator is None:
+            self._aggregator = ReportAggregator(list(self.dishes.values()))
+        return self._aggregator
+
+    def usage(self, dish_quantities: Dict[int, float]) -> np.ndarray:
+        """Ingredient amounts (in `ingredient_ids` order) used by {dish_id: quantity}."""
+        q = np.zeros(len(self.dish_ids))
+        for dish_id, quantity in dish_quantities.items():
+            if dish_id in self.row:
+                q[self.row[dish_id]] += quantity
+        return q @ self.matrix
+
+    def dishes_using(self, ingredient_id: int) -> List[Tuple[int, float]]:
+        """[(dish_id, amount per portion)] of every dish that needs the ingredient."""
+        return self.users.get(ingredient_id, [])
+
+    def blocked_by(self, ingredient_id: int, stock: float) -> List[int]:
+        """Dishes that can't be made even once from `stock` of the ingredient."""
+        return [dish_id for dish_id, amount in self.dishes_using(ingredient_id) if amount > stock]
@@ -0,0 +1,53 @@
+import queue
+import threading
+from database import Database
+
+
+class ReconcilerBusy(Exception):
+    """Raised when max_pending days are already waiting to be rebuilt."""
+
+
+class RollupReconciler:
+    """Background worker that rebuilds daily rollups from raw orders.
+
+    Rollups are updated incrementally by add_order; this repairs a day when
+    they have drifted (manual SQL edits, imports, a failed deploy) without
+    blocking the request that asked for it.
+    """
+
+    def __init__(self, db: Database, max_pending: int = 366):
+        self.db       = db
+        self.max_pending = max_pending
+        self._queue   = queue.Queue()
+        self._pending = set()
+        self._lock    = threading.Lock()
+        self._thread  = threading.Thread(target=self._run, name='rollup-reconciler', daemon=True)
+        self._thread.start()
+
+    def schedule(self, date: str) -> bool:
+        """Queue a day for rebuilding. Returns False if it is already queued;
+        raises ReconcilerBusy when max_pending days already are."""
+        with self._lock:
+            if date in self._pending:
+                return False
+            if len(self._pending) >= self.max_pending:
+                raise ReconcilerBusy(f"{self.max_pending} days are already queued for reconciling")
+            self._pending.add(date)
+        self._queue.put(date)
+        return True
+
+    def pending(self) -> list:
+        with self._lock:
+            return sorted(self._pending)
+
+    def _run(self):
+        while True:
+            date = self._queue.get()
+            try:
+                if self.db.rebuild_rollup(date):
+                    print(f"Rollup reconciled for {date}.")
+            except Exception as e:
+                print(f"Error reconciling rollup for {date}: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(date)
@@ -0,0 +1,174 @@
+import csv
+from typing import Dict, Iterable, Iterator, List, Optional
+
+CHUNK_SIZE = 16 * 1024  # bytes buffered before a chunk is handed to the server
+
+
+class _LineBuffer:
+    """File-like sink for csv.writer that collects rows until they are drained."""
+
+    def __init__(self):
+        self._parts = []
+        self.size   = 0
+
+    def write(self, text: str):
+        self._parts.append(text)
+        self.size += len(text)
+
+    def drain(self) -> bytes:
+        data = ''.join(self._parts).encode('utf-8')
+        self._parts, self.size = [], 0
+        return data
+
+
+def iter_report_csv(report_data: Dict, title: str, date_label: List, period: str,
+                    series: Optional[List[Dict]] = None,
+                    orders: Optional[Iterable[Dict]] = None) -> Iterator[bytes]:
+    """Yield the report CSV as UTF-8 chunks of roughly CHUNK_SIZE bytes.
+
+    Only the current chunk is held in memory. `orders`, when given, is an
+    iterator of order rows (e.g. Database.iter_orders) written as a trailing
+    per-order detail section, so its size doesn't affect memory either.
+    The response is already under way when `orders` is read, so if it
+    raises the section ends with an error row and the footer is left off.
+    """
+    buf = _LineBuffer()
+    w   = csv.writer(buf)
+
+    report      = report_data['report']
+    ingredients = report_data['ingredients']
+    generated   = report_data['generated_at']
+    units       = {i['name'].lower(): i['unit'] for i in ingredients}
+
+    # ── Derived metrics ──────────────────────────────────────────────────────
+    total_sales   = report['total_sales']
+    total_orders  = report['total_orders']
+    avg_order_val = round(total_sales / total_orders, 2) if total_orders > 0 else 0.00
+
+    dishes_sold      = report.get('dishes_sold', {})
+    ingredients_used = report.get('ingredients_used', {})
+
+    top_dish     = max(dishes_sold, key=dishes_sold.get) if dishes_sold else 'N/A'
+    top_dish_qty = dishes_sold[top_dish] if dishes_sold else 0
+
+    low_stock = [i for i in ingredients if i.get('status') == 'Low']
+
+    # ── 1. Title block ───────────────────────────────────────────────────────
+    w.writerow([title])
+    w.writerow(date_label)
+    w.writerow(['Generated At', generated])
+    w.writerow(['Report Period', period])
+    w.writerow([])
+
+    # ── 2. Executive Summary ─────────────────────────────────────────────────
+    w.writerow(['EXECUTIVE SUMMARY'])
+    w.writerow(['Metric', 'Value'])
+    w.writerow(['Total Revenue', f"${total_sales:.2f}"])
+    w.writerow(['Total Orders', total_orders])
+    w.writerow(['Average Order Value', f"${avg_order_val:.2f}"])
+    w.writerow(['Best-Selling Dish', f"{top_dish} ({top_dish_qty} sold)"])
+    w.writerow(['Low Stock Alerts', len(low_stock)])
+    w.writerow([])
+
+    # ── 2b. Daily Breakdown (range reports only) ─────────────────────────────
+    if series is not None:
+        w.writerow(['DAILY BREAKDOWN'])
+        w.writerow(['Date', 'Orders', 'Revenue', 'Best-Selling Dish'])
+        for day in series:
+            sold = day['dishes_sold']
+            best = max(sold, key=sold.get) if sold else '-'
+            w.writerow([day['date'], day['total_orders'], f"${day['total_sales']:.2f}", best])
+            if buf.size >= CHUNK_SIZE:
+                yield buf.drain()
+        w.writerow([])
+
+    # ── 3. Dishes Sold ───────────────────────────────────────────────────────
+    w.writerow(['DISHES SOLD'])
+    w.writerow(['Dish Name', 'Qty Sold', 'Share of Orders (%)'])
+
+    total_dishes_qty = sum(dishes_sold.values()) or 1
+    sorted_dishes = sorted(dishes_sold.items(), key=lambda x: x[1], reverse=True)
+    for dish, qty in sorted_dishes:
+        share = round((qty / total_dishes_qty) * 100, 1)
+        w.writerow([dish, qty, f"{share}%"])
+
+    if not sorted_dishes:
+        w.writerow(['No dishes sold on this date' if series is None else 'No dishes sold in this period', '', ''])
+    w.writerow([])
+
+    # ── 4. Ingredients Used ──────────────────────────────────────────────────
+    w.writerow(['INGREDIENTS USED TODAY' if series is None else 'INGREDIENTS USED'])
+    w.writerow(['Ingredient', 'Qty Used', 'Unit'])
+
+    sorted_ings_used = sorted(ingredients_used.items(), key=lambda x: x[1], reverse=True)
+    for ing_name, qty in sorted_ings_used:
+        w.writerow([ing_name, f"{qty:.2f}", units.get(ing_name.lower(), 'units')])
+
+    if not sorted_ings_used:
+        w.writerow(['No ingredients used', '', ''])
+    w.writerow([])
+
+    # ── 5. Current Inventory Status ──────────────────────────────────────────
+    w.writerow(['CURRENT INVENTORY STATUS'])
+    w.writerow(['Ingredient', 'Current Stock', 'Unit', 'Stock %', 'Status'])
+
+    sorted_inventory = sorted(ingredients, key=lambda x: x.get('percentage', 0))
+    for ing in sorted_inventory:
+        pct    = ing.get('percentage', 0)
+        status = ing.get('status', 'Good')
+        flag   = ' ⚠ REORDER' if status == 'Low' else ''
+        w.writerow([
+            ing['name'],
+            ing['stock_quantity'],
+            ing['unit'],
+            f"{pct:.1f}%",
+            f"{status}{flag}",
+        ])
+    w.writerow([])
+
+    # ── 6. Low Stock Alerts ──────────────────────────────────────────────────
+    if low_stock:
+        w.writerow(['LOW STOCK ALERTS — ACTION REQUIRED'])
+        w.writerow(['Ingredient', 'Current Stock', 'Unit', 'Stock %'])
+        for ing in low_stock:
+            w.writerow([
+                ing['name'],
+                ing['stock_quantity'],
+                ing['unit'],
+                f"{ing.get('percentage', 0):.1f}%",
+            ])
+        w.writerow([])
+
+    yield buf.drain()
+
+    # ── 7. Order Detail (optional) ───────────────────────────────────────────
+    if orders is not None:
+        w.writerow(['ORDER DETAIL'])
+        w.writerow(['Order ID', 'Order Time', 'Dish', 'Qty', 'Unit Price', 'Line Total'])
+        try:
+            for order in orders:
+                w.writerow([
+                    order['id'],
+                    order['order_time'],
+                    order['dish_name'],
+                    order['quantity'],
+                    f"${order['price']:.2f}",
+                    f"${order['price'] * order['quantity']:.2f}",
+                ])
+                if buf.size >= CHUNK_SIZE:
+                    yield buf.drain()
+        except Exception as e:
+            w.writerow(['ERROR', f"Order detail incomplete: {e}"])
+            yield buf.drain()
+            return
+        finally:
+            # Release the order cursor's connection promptly if the client
+            # disconnects mid-download.
+            if hasattr(orders, 'close'):
+                orders.close()
+        w.writerow([])
+
+    # ── 8. Footer ────────────────────────────────────────────────────────────
+    w.writerow(['Report generated by Food Sales Analytics Dashboard'])
+    w.writerow(['End of Report'])
+    yield buf.drain()
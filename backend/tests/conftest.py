@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+# Backend modules import each other as top-level modules (run from backend/).
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    """A Database on a fresh SQLite file holding the sample menu and orders."""
+    from backends import SQLiteBackend
+    from database import Database
+
+    db = Database(backend=SQLiteBackend(str(tmp_path / 'food_analytics.db')))
+    yield db
+    db.close()
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """app.py imported against a SQLite file instead of MySQL (once per run:
+    the module builds its Database, queue and broadcaster on import)."""
+    from config import DB_CONFIG
+
+    DB_CONFIG['backend'] = 'sqlite'
+    DB_CONFIG['sqlite_path'] = str(tmp_path_factory.mktemp('app') / 'food_analytics.db')
+    import app
+    yield app
+    app.shutdown(timeout=5)
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
@@ -0,0 +1,78 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from aggregation import ReportAggregator, aggregate_orders_reference, order_hours
+
+DISHES = [
+    {'id': 1, 'name': 'Pad Thai', 'price': 12.99,
+     'ingredients': {'noodles': 0.2, 'shrimp': 0.15, 'peanuts': 0.03}},
+    {'id': 2, 'name': 'Green Curry', 'price': 13.45,
+     'ingredients': {'chicken': 0.25, 'coconut milk': 0.2, 'rice': 0.3}},
+    {'id': 3, 'name': 'Som Tam', 'price': 8.1,
+     'ingredients': {'papaya': 0.3, 'peanuts': 0.02}},
+    {'id': 4, 'name': 'Mango Sticky Rice', 'price': 6.35,
+     'ingredients': {'mango': 0.25, 'rice': 0.15, 'coconut milk': 0.05}},
+]
+
+
+def generate_orders(seed: int, count: int) -> list:
+    """A day of orders, including ones for a dish no longer on the menu and
+    ones with an unparseable order_time."""
+    rng = random.Random(seed)
+    day = datetime(2024, 3, 14)
+    orders = []
+    for _ in range(count):
+        when = day + timedelta(seconds=rng.randrange(86400))
+        orders.append({
+            'dish_id': rng.choice([1, 2, 3, 4, 4, 99]),
+            'quantity': rng.randint(1, 6),
+            'order_time': rng.choice([when.isoformat()] * 20 + ['garbled']),
+        })
+    return orders
+
+
+def assert_reports_match(actual, expected):
+    assert actual.date == expected.date
+    assert actual.total_orders == expected.total_orders
+    assert actual.total_sales == expected.total_sales
+    assert actual.dishes_sold == expected.dishes_sold
+    assert actual.peak_hours == expected.peak_hours
+    assert actual.ingredients_used.keys() == expected.ingredients_used.keys()
+    for name, amount in expected.ingredients_used.items():
+        assert actual.ingredients_used[name] == pytest.approx(amount)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_vectorized_matches_reference_per_order(seed):
+    orders = generate_orders(seed, 2000)
+    expected = aggregate_orders_reference('2024-03-14', orders, DISHES)
+    actual = ReportAggregator(DISHES).aggregate(
+        '2024-03-14',
+        [o['dish_id'] for o in orders],
+        order_hours([o['order_time'] for o in orders]),
+        [o['quantity'] for o in orders],
+    ).to_report()
+    assert_reports_match(actual, expected)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_vectorized_matches_reference_grouped(seed):
+    """The shape get_daily_aggregates returns: one row per dish and hour."""
+    orders = [o for o in generate_orders(seed, 2000) if o['order_time'] != 'garbled']
+    groups = {}
+    for o in orders:
+        key = (o['dish_id'], datetime.fromisoformat(o['order_time']).hour)
+        quantity, count = groups.get(key, (0, 0))
+        groups[key] = (quantity + o['quantity'], count + 1)
+
+    expected = aggregate_orders_reference('2024-03-14', orders, DISHES)
+    actual = ReportAggregator(DISHES).aggregate(
+        '2024-03-14',
+        [dish_id for dish_id, _ in groups],
+        [hour for _, hour in groups],
+        [quantity for quantity, _ in groups.values()],
+        order_counts=[count for _, count in groups.values()],
+    ).to_report()
+    assert_reports_match(actual, expected)
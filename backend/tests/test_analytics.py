@@ -0,0 +1,27 @@
+import pytest
+
+from analytics import Analytics
+
+
+def test_range_report_rejects_spans_over_the_limit(sqlite_db):
+    analytics = Analytics(sqlite_db)
+    with pytest.raises(ValueError, match='at most 366'):
+        analytics.get_range_report('0001-01-01', '9999-12-31')
+    with pytest.raises(ValueError):
+        analytics.get_range_report('9999-12-31', '9999-12-31')
+    assert len(analytics.get_range_report('2024-01-01', '2024-12-31')['series']) == 366
+
+
+def test_range_totals_are_summed_in_cents(sqlite_db, monkeypatch):
+    days = [f'2024-01-{d:02d}' for d in range(1, 32)]
+    # Sub-cent rollup noise (REAL columns): each row rounds to its own cents,
+    # as DayAggregate rounds it, before anything is added up.
+    rows = [{'date': day, 'dish_id': 1, 'quantity': 1, 'order_count': 1, 'sales': sales}
+            for day in days for sales in (1.005, 0.1, 0.2)]
+    monkeypatch.setattr(sqlite_db, 'get_range_rollup', lambda start, end: {
+        'daily': rows, 'hourly': [], 'ingredients': []})
+
+    report = Analytics(sqlite_db).get_range_report(days[0], days[-1])
+
+    assert [d['total_sales'] for d in report['series']] == [1.3] * 31
+    assert report['totals']['total_sales'] == 40.3
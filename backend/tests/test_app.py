@@ -0,0 +1,30 @@
+from datetime import date, timedelta
+
+
+def test_reconcile_rejects_bad_and_future_dates(client):
+    assert client.post('/api/reports/bogus/reconcile').status_code == 400
+    tomorrow = (date.today() + timedelta(days=1)).isoformat()
+    assert client.post(f'/api/reports/{tomorrow}/reconcile').status_code == 400
+
+    response = client.post('/api/reports/2024-1-5/reconcile')
+    assert response.status_code == 202
+    assert response.get_json()['date'] == '2024-01-05'
+
+
+def test_report_download_rejects_bad_dates(client):
+    assert client.get('/api/reports/download/bogus?details=1').status_code == 400
+    assert client.get('/api/reports/download/2024-13-01?details=1').status_code == 400
+
+
+def test_report_download_flags_unreadable_order_detail(client, app_module, monkeypatch):
+    today = date.today().isoformat()
+    body = client.get(f'/api/reports/download/{today}?details=1').get_data(as_text=True)
+    assert 'ORDER DETAIL' in body and 'End of Report' in body
+
+    monkeypatch.setattr(app_module.db, '_acquire', lambda: None)
+    monkeypatch.setattr(app_module.analytics, 'download_report', lambda d: {
+        'report': {'total_sales': 0.0, 'total_orders': 0}, 'ingredients': [],
+        'generated_at': today})
+    body = client.get(f'/api/reports/download/{today}?details=1').get_data(as_text=True)
+    assert 'Order detail incomplete' in body
+    assert 'End of Report' not in body
@@ -0,0 +1,49 @@
+from datetime import date, datetime, timedelta
+
+from config import ORDER_CONFIG
+from models import DailyReport
+
+
+def order_count(db):
+    return db.execute_query("SELECT COUNT(*) AS n FROM orders", fetch_one=True)['n']
+
+
+def test_idempotency_keys_dedupe_within_and_across_batches(sqlite_db):
+    db = sqlite_db
+    before = order_count(db)
+
+    first = db.add_orders_bulk([
+        {'dish_id': 1, 'quantity': 1, 'idempotency_key': 'pos-1-0001'},
+        {'dish_id': 2, 'quantity': 1, 'idempotency_key': 'pos-1-0001'},
+        {'dish_id': 3, 'quantity': 2, 'idempotency_key': 'pos-1-0002'},
+    ])
+    assert [r['status'] for r in first['results']] == ['created', 'duplicate', 'created']
+
+    retry = db.add_orders_bulk([
+        {'dish_id': 1, 'quantity': 1, 'idempotency_key': 'pos-1-0001'},
+        {'dish_id': 3, 'quantity': 2, 'idempotency_key': 'pos-1-0002'},
+        {'dish_id': 5, 'quantity': 1, 'idempotency_key': 'pos-1-0003'},
+    ])
+    assert [r['status'] for r in retry['results']] == ['duplicate', 'duplicate', 'created']
+    assert order_count(db) == before + 3
+
+
+def test_backdated_orders_clear_the_days_final_report(sqlite_db):
+    db = sqlite_db
+    day = date.today() - timedelta(days=3)
+    db.save_daily_report(DailyReport(day.isoformat(), 0.0, 0, {}, {}, {}), final=True)
+    assert db.get_daily_report(day.isoformat(), final_only=True) is not None
+
+    noon = datetime.combine(day, datetime.min.time()).replace(hour=12)
+    result = db.add_orders_bulk([{'dish_id': 1, 'quantity': 2, 'order_time': noon.isoformat()}])
+
+    assert result['created'] == 1
+    assert db.get_daily_report(day.isoformat()) is None
+
+
+def test_bulk_endpoint_rejects_oversized_and_malformed_bodies(client, monkeypatch):
+    monkeypatch.setitem(ORDER_CONFIG, 'bulk_max_rows', 3)
+    orders = [{'dish_id': 1, 'quantity': 1}] * 4
+    assert client.post('/api/orders/bulk', json={'orders': orders}).status_code == 413
+    assert client.post('/api/orders/bulk', json=orders).status_code == 400
+    assert client.post('/api/orders/bulk', json={'orders': orders[:3]}).status_code == 201
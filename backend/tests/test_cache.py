@@ -0,0 +1,12 @@
+def test_unknown_dish_ids_reload_the_menu_at_most_once_per_interval(sqlite_db):
+    db = sqlite_db
+    db.get_dishes()
+    db.get_recipe_index()
+    loads = db.cache_stats()['misses']
+
+    for _ in range(20):
+        assert db.get_dish(12345) is None
+        assert not db.add_order(12345, 1)
+
+    assert db.cache_stats()['misses'] - loads == 1   # one menu reload, no index rebuild
+    assert db.get_dish(1)['name'] == 'Margherita Pizza'
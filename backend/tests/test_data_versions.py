@@ -0,0 +1,35 @@
+import threading
+from datetime import datetime
+
+from backends import SQLiteBackend
+from config import DB_CONFIG
+from database import Database
+
+
+def test_each_committed_order_advances_its_counters_once(tmp_path, monkeypatch):
+    # Fewer connections than writers: the counter bump must not need a
+    # second checkout while the order's connection is still held.
+    monkeypatch.setitem(DB_CONFIG, 'pool_size', 2)
+    monkeypatch.setitem(DB_CONFIG, 'pool_timeout', 2)
+    db = Database(backend=SQLiteBackend(str(tmp_path / 'food_analytics.db')))
+    try:
+        today = f"orders:{datetime.now().date().isoformat()}"
+        before = db.get_data_versions(['ingredients', today])
+        committed = []
+
+        def writer():
+            committed.extend(db.add_order(1, 1) for _ in range(5))
+
+        threads = [threading.Thread(target=writer) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        after = db.get_data_versions(['ingredients', today])
+        assert db.pool_stats()['timeouts'] == 0
+        assert committed.count(True) == 40
+        for name in ('ingredients', today):
+            assert after[name][0] - before[name][0] == committed.count(True)
+    finally:
+        db.close()
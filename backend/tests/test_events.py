@@ -0,0 +1,32 @@
+import pytest
+
+from events import EventBus, LiveBroadcaster
+
+
+class FlakyAnalytics:
+    """Today's report fails once (a DB blip), then succeeds."""
+
+    def __init__(self):
+        self.failures = 1
+
+    def get_or_generate_report(self, date):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('database unavailable')
+        return {'date': date, 'total_orders': 3}
+
+    def get_ingredients_status(self):
+        return [{'id': 1, 'name': 'flour', 'stock_quantity': 80.0}]
+
+
+def test_a_failed_refresh_keeps_its_sections_dirty():
+    live = LiveBroadcaster(EventBus(), FlakyAnalytics(), interval=60)
+
+    with pytest.raises(ConnectionError):
+        live.snapshot()
+    assert live._dirty == {'report': True, 'inventory': True}
+
+    snapshot = live.snapshot()
+    assert snapshot['report']['total_orders'] == 3
+    assert snapshot['inventory'][0]['name'] == 'flour'
+    assert live._dirty == {'report': False, 'inventory': False}
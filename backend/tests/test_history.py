@@ -0,0 +1,42 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from history import SalesHistory
+
+
+def test_trend_is_clamped_to_stored_history(sqlite_db):
+    history = SalesHistory(sqlite_db)
+    yesterday = date.today() - timedelta(days=1)
+
+    trend = history.trend('day', start='0001-01-01', end='9999-12-31')
+
+    assert trend['start'] == trend['end'] == yesterday.isoformat()
+    assert len(trend['series']) == 1 and trend['totals']['orders'] > 0
+
+
+def test_trend_caps_the_number_of_periods(sqlite_db):
+    ten_days_ago = datetime.combine(date.today() - timedelta(days=10), datetime.min.time())
+    result = sqlite_db.add_orders_bulk([
+        {'dish_id': 1, 'quantity': 1, 'order_time': ten_days_ago.replace(hour=12).isoformat()},
+    ])
+    assert result['created'] == 1
+    history = SalesHistory(sqlite_db, max_periods=5)
+
+    with pytest.raises(ValueError, match='at most 5'):
+        history.trend('day', start=ten_days_ago.date().isoformat())
+    assert len(history.trend('day')['series']) == 5
+    assert len(history.trend('week', start=ten_days_ago.date().isoformat())['series']) <= 3
+
+
+def test_trend_needs_a_closed_day(sqlite_db):
+    history = SalesHistory(sqlite_db)
+    today = date.today()
+
+    with pytest.raises(ValueError, match="'start' must be before today"):
+        history.trend('day', start=today.isoformat())
+    with pytest.raises(ValueError, match="'start' must be before today"):
+        history.trend('week', start=(today + timedelta(days=3)).isoformat(),
+                      end=(today + timedelta(days=9)).isoformat())
+    with pytest.raises(ValueError, match="'end' must not be before 'start'"):
+        history.trend('day', start='2024-02-01', end='2024-01-01')
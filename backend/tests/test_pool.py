@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+from pool import ConnectionPool
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def is_connected(self):
+        return not self.closed
+
+    def ping(self, reconnect=False):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def test_close_all_closes_checked_out_connections_on_release():
+    pool = ConnectionPool(FakeConnection, size=2)
+    idle, busy = pool.acquire(), pool.acquire()
+    pool.release(idle)
+
+    pool.close_all()
+    assert idle.closed and not busy.closed
+
+    pool.release(busy)
+    assert busy.closed
+    assert pool.stats()['idle'] == 0 and pool.stats()['in_use'] == 0
+
+
+def test_closed_pool_refuses_checkouts_and_wakes_waiters():
+    pool = ConnectionPool(FakeConnection, size=1, timeout=10)
+    held = pool.acquire()
+    errors = []
+
+    def wait_for_one():
+        try:
+            pool.acquire()
+        except ConnectionError as e:
+            errors.append(e)
+
+    waiter = threading.Thread(target=wait_for_one)
+    waiter.start()
+    pool.close_all()
+    waiter.join(2)
+    assert not waiter.is_alive() and len(errors) == 1
+
+    pool.release(held)
+    with pytest.raises(ConnectionError):
+        pool.acquire()
@@ -0,0 +1,41 @@
+import pytest
+
+
+def stock(db, name):
+    return next(i['stock_quantity'] for i in db.get_ingredients() if i['name'] == name)
+
+
+def ingredient_id(db, name):
+    return next(i['id'] for i in db.get_ingredients() if i['name'] == name)
+
+
+def link_count(db):
+    return db.execute_query("SELECT COUNT(*) AS n FROM dish_ingredients", fetch_one=True)['n']
+
+
+def test_rename_keeps_the_ingredient_in_its_recipes(sqlite_db):
+    db = sqlite_db
+    cheese = ingredient_id(db, 'cheese')
+    links = link_count(db)
+
+    assert db.update_ingredient(cheese, {'name': 'mozzarella'})
+
+    assert link_count(db) == links
+    assert db.get_dish(1)['ingredients'] == {'flour': 0.3, 'mozzarella': 0.2, 'tomato_sauce': 0.15}
+    assert ('mozzarella', cheese, pytest.approx(0.2)) in db.get_recipe_index().lines[1]
+    before = stock(db, 'mozzarella')
+    assert db.add_order(1, 2)
+    assert stock(db, 'mozzarella') == pytest.approx(before - 0.4)
+
+
+def test_delete_and_add_relink_only_that_ingredient(sqlite_db):
+    db = sqlite_db
+    links = link_count(db)
+
+    assert db.delete_ingredient(ingredient_id(db, 'croutons'))
+    assert link_count(db) == links - 1
+    assert ('croutons', None, pytest.approx(0.05)) in db.get_recipe_index().lines[3]
+
+    croutons = db.add_ingredient('croutons', 'kg')
+    assert link_count(db) == links
+    assert ('croutons', croutons, pytest.approx(0.05)) in db.get_recipe_index().lines[3]
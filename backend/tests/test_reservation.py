@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+from database import OutOfStock
+
+CARBONARA = 4   # sample dish using 2 eggs a portion
+
+
+def set_stock(db, name, quantity):
+    ingredient = next(i for i in db.get_ingredients() if i['name'] == name)
+    assert db.update_ingredient(ingredient['id'], {'stock_quantity': quantity})
+    return ingredient['id']
+
+
+def stock(db, name):
+    db.invalidate_cache('ingredients')
+    return next(i['stock_quantity'] for i in db.get_ingredients() if i['name'] == name)
+
+
+def test_parallel_orders_never_oversell(sqlite_db):
+    db = sqlite_db
+    db.reserve_stock = True
+    set_stock(db, 'eggs', 10)   # five portions
+    outcomes, lock = [], threading.Lock()
+
+    def writer():
+        for _ in range(5):
+            try:
+                result = 'committed' if db.add_order(CARBONARA, 1) else 'failed'
+            except OutOfStock as e:
+                assert e.ingredients == ['eggs']
+                result = 'out_of_stock'
+            with lock:
+                outcomes.append(result)
+
+    threads = [threading.Thread(target=writer) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert outcomes.count('committed') == 5
+    assert outcomes.count('out_of_stock') == 35
+    assert stock(db, 'eggs') == pytest.approx(0)
+
+
+def test_bulk_rejects_only_what_stock_cannot_cover(sqlite_db):
+    db = sqlite_db
+    db.reserve_stock = True
+    set_stock(db, 'eggs', 5)
+
+    result = db.add_orders_bulk([
+        {'dish_id': CARBONARA, 'quantity': 1},   # 2 eggs, 3 left
+        {'dish_id': CARBONARA, 'quantity': 2},   # needs 4
+        {'dish_id': 1, 'quantity': 1},           # no eggs
+        {'dish_id': CARBONARA, 'quantity': 1},   # 2 eggs, 1 left
+    ])
+
+    assert [r['status'] for r in result['results']] == ['created', 'error', 'created', 'created']
+    assert result['results'][1]['out_of_stock'] == ['eggs']
+    assert (result['created'], result['failed']) == (3, 1)
+    assert stock(db, 'eggs') == pytest.approx(1)
+
+
+def test_post_order_answers_409_when_stock_is_short(app_module, client, monkeypatch):
+    db = app_module.db
+    monkeypatch.setattr(db, 'reserve_stock', True)
+    eggs = set_stock(db, 'eggs', 1)
+    try:
+        response = client.post('/api/orders', json={'dish_id': CARBONARA, 'quantity': 1})
+        assert response.status_code == 409
+        assert response.get_json()['out_of_stock'] == ['eggs']
+        assert stock(db, 'eggs') == pytest.approx(1)
+    finally:
+        db.deliver_ingredient(eggs)
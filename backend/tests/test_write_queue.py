@@ -0,0 +1,176 @@
+import threading
+
+from write_queue import OrderWriteQueue
+
+
+class StubDatabase:
+    """Records add_orders_bulk batches; every order is created."""
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def add_orders_bulk(self, orders):
+        self.release.wait()
+        self.batches.append(list(orders))
+        return {
+            'created': len(orders), 'duplicates': 0, 'failed': 0,
+            'results': [{'index': i, 'status': 'created'} for i in range(len(orders))],
+        }
+
+
+def test_group_mode_flushes_a_single_order():
+    db = StubDatabase()
+    queue = OrderWriteQueue(db, mode='group', flush_interval_ms=5, max_batch=500)
+    try:
+        ticket = queue.submit(1, 2)
+        assert ticket.wait(2), 'a partial batch was never flushed'
+        assert ticket.status == 'committed'
+        assert len(db.batches) == 1 and db.batches[0][0]['dish_id'] == 1
+    finally:
+        queue.close()
+
+
+def test_queue_mode_writes_small_backlog(tmp_path):
+    db = StubDatabase()
+    queue = OrderWriteQueue(db, mode='queue', flush_interval_ms=5, max_batch=500,
+                            wal_path=str(tmp_path / 'wal.jsonl'), wal_fsync=False)
+    try:
+        tickets = [queue.submit(1, 1) for _ in range(3)]
+        assert all(t.wait(2) for t in tickets)
+        assert sum(len(b) for b in db.batches) == 3
+    finally:
+        queue.close()
+
+
+def test_withdraw_only_takes_back_queued_orders():
+    db = StubDatabase()
+    db.release.clear()   # hold the writer inside its first flush
+    queue = OrderWriteQueue(db, mode='group', flush_interval_ms=5, max_batch=500)
+    try:
+        first = queue.submit(1, 1)
+        while queue.depth():          # wait for the writer to pick it up
+            threading.Event().wait(0.01)
+        second = queue.submit(2, 1)
+        assert not queue.withdraw(first)   # in flight: may still commit
+        assert queue.withdraw(second)
+        assert second.status == 'rejected'
+        db.release.set()
+        assert first.wait(2) and first.status == 'committed'
+        assert all(o['dish_id'] == 1 for b in db.batches for o in b)
+    finally:
+        db.release.set()
+        queue.close()
+
+
+def test_client_idempotency_key_is_the_ack_id():
+    db = StubDatabase()
+    queue = OrderWriteQueue(db, mode='group', flush_interval_ms=5)
+    try:
+        ticket = queue.submit(1, 1, idempotency_key='pos-7-000123')
+        assert ticket.ack_id == 'pos-7-000123'
+        assert ticket.wait(2)
+        assert db.batches[0][0]['idempotency_key'] == 'pos-7-000123'
+    finally:
+        queue.close()
+
+
+class RaisingDatabase(StubDatabase):
+    """Raises (as bad recipe JSON would) for any batch holding dish 99."""
+
+    def add_orders_bulk(self, orders):
+        if any(o['dish_id'] == 99 for o in orders):
+            raise ValueError('Expecting value: line 1 column 1 (char 0)')
+        return super().add_orders_bulk(orders)
+
+
+def test_a_raising_batch_rejects_only_the_bad_order(tmp_path):
+    db = RaisingDatabase()
+    db.release.clear()   # let all three orders land in one batch
+    queue = OrderWriteQueue(db, mode='queue', flush_interval_ms=5, max_batch=500,
+                            wal_path=str(tmp_path / 'wal.jsonl'), wal_fsync=False)
+    try:
+        good, bad, other = queue.submit(1, 1), queue.submit(99, 1), queue.submit(2, 1)
+        db.release.set()
+        assert all(t.wait(2) for t in (good, bad, other))
+        assert (good.status, bad.status, other.status) == ('committed', 'rejected', 'committed')
+        assert 'could not be written' in bad.error
+
+        later = queue.submit(3, 1)   # the writer thread survived
+        assert later.wait(2) and later.status == 'committed'
+    finally:
+        queue.close()
+    assert (tmp_path / 'wal.jsonl').stat().st_size == 0   # the bad order isn't replayed
+
+
+class GatedDatabase(RaisingDatabase):
+    """Holds the writer when it writes dish 2 on its own."""
+
+    def __init__(self):
+        super().__init__()
+        self.reached, self.gate = threading.Event(), threading.Event()
+
+    def add_orders_bulk(self, orders):
+        if [o['dish_id'] for o in orders] == [2]:
+            self.reached.set()
+            self.gate.wait(2)
+        return super().add_orders_bulk(orders)
+
+
+def test_isolation_keeps_unwritten_orders_in_the_wal(tmp_path):
+    db = GatedDatabase()
+    db.release.clear()
+    wal = tmp_path / 'wal.jsonl'
+    queue = OrderWriteQueue(db, mode='queue', flush_interval_ms=5, max_batch=500,
+                            wal_path=str(wal), wal_fsync=False)
+    try:
+        tickets = [queue.submit(99, 1), queue.submit(1, 1), queue.submit(2, 1)]
+        db.release.set()
+        assert db.reached.wait(2)
+        # Dish 99 was rejected and dish 1 committed, but dish 2 is not written yet.
+        assert any('"dish_id": 2' in line for line in wal.read_text().splitlines())
+        db.gate.set()
+        assert all(t.wait(2) for t in tickets)
+    finally:
+        db.gate.set()
+        queue.close()
+    assert wal.stat().st_size == 0
+
+
+class FeedingDatabase(StubDatabase):
+    """Queues another order during each of its first `rounds` writes, so the
+    queue never drains, and records the WAL as each batch is written."""
+
+    def __init__(self, wal, rounds):
+        super().__init__()
+        self.wal, self.rounds, self.queue = wal, rounds, None
+        self.sizes, self.missing = [], 0
+
+    def add_orders_bulk(self, orders):
+        text = self.wal.read_text()
+        self.sizes.append(len(text))
+        self.missing += sum(o['idempotency_key'] not in text for o in orders)
+        if len(self.sizes) <= self.rounds:
+            self.queue.submit(1, 1)
+        return super().add_orders_bulk(orders)
+
+
+def test_wal_is_compacted_while_the_queue_never_drains(tmp_path):
+    wal = tmp_path / 'wal.jsonl'
+    db = FeedingDatabase(wal, rounds=60)
+    db.release.clear()
+    queue = OrderWriteQueue(db, mode='queue', flush_interval_ms=1, max_batch=1,
+                            wal_path=str(wal), wal_fsync=False, wal_compact_bytes=500)
+    db.queue = queue
+    try:
+        first = [queue.submit(1, 1), queue.submit(1, 1)]
+        db.release.set()
+        assert all(t.wait(2) for t in first)
+        while len(db.sizes) < 62:
+            threading.Event().wait(0.01)
+    finally:
+        queue.close()
+    assert db.missing == 0                      # orders being written were still in the WAL
+    assert max(db.sizes) < 1500                 # ~60 orders' worth without compaction
+    assert wal.stat().st_size == 0
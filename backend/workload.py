@@ -0,0 +1,157 @@
+"""Synthetic restaurant workload for benchmarks and capacity testing.
+
+generate() adds a menu of `dishes` synthetic dishes drawing on a shared
+ingredient pool, then `days` days of orders ending today. Orders follow a
+lunch/dinner hourly curve, busier Fridays and weekends, and a long-tailed
+dish popularity, so reports see realistic skew rather than uniform noise.
+The same seed gives the same data.
+
+Orders are bulk-inserted at the menu price without deducting stock
+(history, not live sales); rollups are rebuilt per day afterwards, exactly
+as Database.backfill_rollups would. Everything goes through Database's
+public query methods, so writes are timed and version counters move.
+"""
+import json
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from database import Database
+
+# Relative order volume per hour of day (sums to 1 after normalising).
+HOURLY_CURVE = np.array([
+    0.1, 0.05, 0.0, 0.0, 0.0, 0.0,     # 00-05
+    0.2, 0.6, 1.2, 1.0, 1.5, 4.5,      # 06-11
+    7.0, 5.5, 2.5, 1.8, 2.2, 4.0,      # 12-17
+    7.5, 8.0, 6.0, 3.5, 1.5, 0.5,      # 18-23
+])
+
+# Multiplier on orders_per_day, Monday first.
+WEEKDAY_FACTOR = np.array([0.85, 0.9, 0.9, 0.95, 1.15, 1.3, 1.1])
+
+DISH_PREFIX = 'Synthetic Dish'
+INGREDIENT_PREFIX = 'syn_ingredient'
+
+
+def _menu(rng: np.random.Generator, dishes: int, ingredients: int, recipe_size):
+    """(dish rows, ingredient rows) for the synthetic menu."""
+    low, high = recipe_size
+    ingredient_names = [f"{INGREDIENT_PREFIX}_{i:03d}" for i in range(1, ingredients + 1)]
+    dish_rows = []
+    for n in range(1, dishes + 1):
+        size   = int(rng.integers(low, min(high, ingredients) + 1))
+        picked = rng.choice(ingredients, size=size, replace=False)
+        recipe = {ingredient_names[i]: round(float(rng.uniform(0.01, 0.4)), 3) for i in picked}
+        price  = round(float(rng.uniform(4.5, 32.0)), 2)
+        dish_rows.append((f"{DISH_PREFIX} {n:03d}", price, json.dumps(recipe)))
+    units = ('kg', 'liter', 'pieces')
+    ingredient_rows = [(name, 100.0, units[i % len(units)], 25.0)
+                       for i, name in enumerate(ingredient_names)]
+    return dish_rows, ingredient_rows
+
+
+def _checked(result):
+    if result is None:
+        raise RuntimeError("database unavailable")
+    return result
+
+
+def _ensure_menu(db: Database, dish_rows, ingredient_rows) -> List[int]:
+    """Insert whatever part of the synthetic menu is missing; return its dish
+    ids. Each step only adds what isn't there yet, so a run that fails
+    halfway is completed by the next one."""
+    have = {row['name'] for row in _checked(db.execute_query("SELECT name FROM ingredients", fetch_all=True))}
+    new_ingredients = [row for row in ingredient_rows if row[0] not in have]
+    if new_ingredients:
+        _checked(db.execute_many(
+            "INSERT INTO ingredients (name, stock_quantity, unit, reorder_level) VALUES (%s, %s, %s, %s)",
+            new_ingredients, versions=('ingredients',),
+        ))
+
+    def dish_ids():
+        rows = _checked(db.execute_query("SELECT id, name FROM dishes", fetch_all=True))
+        return {row['name']: row['id'] for row in rows}
+
+    ids = dish_ids()
+    new_dishes = [row for row in dish_rows if row[0] not in ids]
+    if new_dishes:
+        _checked(db.execute_many(
+            "INSERT INTO dishes (name, price, ingredients) VALUES (%s, %s, %s)",
+            new_dishes, versions=('dishes',),
+        ))
+        ids = dish_ids()
+    if new_ingredients or new_dishes:
+        db.relink_recipes()
+    db.invalidate_cache()
+    return [ids[row[0]] for row in dish_rows]
+
+
+def day_orders(rng: np.random.Generator, day: date, dish_ids: List[int],
+               popularity: np.ndarray, orders_per_day: int,
+               until: Optional[datetime] = None) -> List[tuple]:
+    """One day's (dish_id, quantity, order_time, date) rows in time order.
+    With `until`, orders later than it are dropped (today's partial day)."""
+    count = int(rng.poisson(orders_per_day * WEEKDAY_FACTOR[day.weekday()]))
+    if count == 0:
+        return []
+    seconds = (rng.choice(24, size=count, p=HOURLY_CURVE / HOURLY_CURVE.sum()) * 3600
+               + rng.integers(0, 3600, size=count))
+    if until is not None:
+        seconds = seconds[seconds <= (until - datetime.combine(day, datetime.min.time())).total_seconds()]
+    seconds.sort()
+    dishes = np.asarray(dish_ids)[rng.choice(len(dish_ids), size=len(seconds), p=popularity)]
+    # Mostly single portions, with the occasional table order.
+    quantities = rng.choice([1, 2, 3, 4, 6], size=len(seconds), p=[0.62, 0.22, 0.09, 0.05, 0.02])
+
+    midnight = datetime.combine(day, datetime.min.time())
+    stamp = day.isoformat()
+    return [
+        (int(d), int(q), (midnight + timedelta(seconds=int(s))).strftime('%Y-%m-%d %H:%M:%S'), stamp)
+        for d, q, s in zip(dishes, quantities, seconds)
+    ]
+
+
+def generate(db: Database, days: int = 7, dishes: int = 200, orders_per_day: int = 100_000,
+             ingredients: int = 80, recipe_size=(2, 12), seed: int = 0,
+             end: Optional[date] = None, batch: int = 20_000) -> Dict:
+    """Add the synthetic menu and `days` days of orders ending at `end`
+    (today by default, cut off at the current time). Returns a summary."""
+    rng   = np.random.default_rng(seed)
+    end   = end or date.today()
+    now   = datetime.now()
+    first = end - timedelta(days=days - 1)
+
+    dish_rows, ingredient_rows = _menu(rng, dishes, ingredients, recipe_size)
+    dish_ids = _ensure_menu(db, dish_rows, ingredient_rows)
+    price_of = {dish_id: row[1] for dish_id, row in zip(dish_ids, dish_rows)}
+    # Zipf-like popularity: a few bestsellers and a long tail, in random menu order.
+    weights = 1.0 / np.arange(1, dishes + 1) ** 0.9
+    popularity = rng.permutation(weights / weights.sum())
+
+    started = time.perf_counter()
+    total   = 0
+    for n in range(days):
+        day  = first + timedelta(days=n)
+        rows = day_orders(rng, day, dish_ids, popularity, orders_per_day,
+                          until=now if day == now.date() else None)
+        for i in range(0, len(rows), batch):
+            _checked(db.execute_many(
+                """INSERT INTO orders (dish_id, quantity, order_time, date, unit_price)
+                   VALUES (%s, %s, %s, %s, %s)""",
+                [(*row, price_of[row[0]]) for row in rows[i:i + batch]],
+            ))
+        db.rebuild_rollup(day.isoformat())
+        total += len(rows)
+        print(f"  {day.isoformat()}: {len(rows):,} orders")
+
+    elapsed = time.perf_counter() - started
+    print(f"Generated {total:,} orders over {days} day(s) for {dishes} dishes in {elapsed:.1f}s.")
+    return {
+        'start': first.isoformat(),
+        'end': end.isoformat(),
+        'orders': total,
+        'dish_ids': dish_ids,
+        'seconds': round(elapsed, 2),
+    }
@@ -0,0 +1,375 @@
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Dict, Optional
+from database import Database
+
+
+class QueueFull(Exception):
+    """Raised when the write queue is at max_depth and cannot take more orders."""
+
+
+class Ticket:
+    """Handle for one queued order. `ack_id` doubles as its idempotency key."""
+
+    def __init__(self, ack_id: str, payload: Dict):
+        self.ack_id  = ack_id
+        self.payload = payload
+        self.status  = 'queued'
+        self.error   = None
+        self.out_of_stock = None   # ingredients short when rejected for stock
+        self.wal_end = None        # WAL offset just past its line ('queue' mode)
+        self._done   = threading.Event()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the order is committed or rejected. False on timeout."""
+        return self._done.wait(timeout)
+
+    def _finish(self, status: str, error: str = None):
+        self.status, self.error = status, error
+        self._done.set()
+
+
+class OrderWriteQueue:
+    """Write-behind buffer that turns many single orders into group commits.
+
+    Modes (WRITE_QUEUE_CONFIG['mode']):
+      'sync'  - no queue; callers use Database.add_order directly.
+      'group' - orders are queued and flushed in batches every
+                flush_interval_ms or max_batch orders; each caller waits for
+                the commit that contains its order, so an acknowledged order
+                is durable in MySQL. Nothing is written to a WAL: a caller
+                that stops waiting withdraws its order if it hasn't been
+                picked up yet (see withdraw) and must not report it accepted.
+      'queue' - callers return immediately (202) once the order is appended
+                (and optionally fsync'd) to a local WAL file; the WAL is
+                replayed at start-up, so acknowledged orders survive a crash.
+                The WAL is emptied whenever the queue drains and, under load
+                that never lets it drain, compacted once `wal_compact_bytes`
+                of it hold only committed or rejected orders.
+
+    Batches go through Database.add_orders_bulk with the ack id as the
+    idempotency key, which coalesces inventory deductions per batch and makes
+    WAL replay safe to repeat.
+
+    With `wal_per_process` (several workers, see wsgi.py) each process
+    appends to `<wal_path>.<pid>`, holding an exclusive lock on it while it
+    runs. At start-up a worker adopts the WAL of any worker that died
+    without draining: one it can lock is not owned by a live process.
+    """
+
+    def __init__(self, db: Database, mode: str = 'sync', flush_interval_ms: float = 5,
+                 max_batch: int = 500, max_depth: int = 50000,
+                 wal_path: Optional[str] = None, wal_fsync: bool = True,
+                 retry_delay: float = 1.0, ack_history: int = 100000,
+                 wal_per_process: bool = False, wal_compact_bytes: int = 1 << 20):
+        if mode not in ('sync', 'group', 'queue'):
+            raise ValueError(f"unknown write queue mode {mode!r}")
+        self.db          = db
+        self.mode        = mode
+        self.interval    = flush_interval_ms / 1000.0
+        self.max_batch   = max_batch
+        self.max_depth   = max_depth
+        self.wal_path    = wal_path if mode == 'queue' else None
+        self.wal_fsync   = wal_fsync
+        self.retry_delay = retry_delay
+        self.wal_per_process = wal_per_process
+        self.wal_compact_bytes = wal_compact_bytes
+
+        self._pending  = deque()
+        self._cond     = threading.Condition()
+        self._acks     = OrderedDict()  # ack_id -> Ticket, oldest evicted first
+        self._ack_max  = ack_history
+        self._closing  = False
+        self._wal      = None
+        self._wal_size = 0        # bytes in the WAL file
+        self._wal_settled = 0     # offset up to which every order is written or rejected
+        self._stats    = {'batches': 0, 'orders_written': 0, 'duplicates': 0,
+                          'rejected': 0, 'failed_flushes': 0, 'last_batch_size': 0,
+                          'max_depth_seen': 0}
+
+        if self.mode == 'sync':
+            return
+        if self.wal_path:
+            base = self.wal_path
+            if wal_per_process:
+                self.wal_path = f"{base}.{os.getpid()}"
+            self._replay_wal()
+            self._wal = open(self.wal_path, 'a', encoding='utf-8')
+            self._wal_size = os.fstat(self._wal.fileno()).st_size
+            if wal_per_process:
+                import fcntl  # POSIX only, like the multi-worker servers that need it
+                fcntl.flock(self._wal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._adopt_orphan_wals(base, fcntl)
+        self._thread = threading.Thread(target=self._run, name='order-writer', daemon=True)
+        self._thread.start()
+
+    # ── PRODUCERS ─────────────────────────────────────────────────────────────
+
+    def submit(self, dish_id: int, quantity: int, idempotency_key: Optional[str] = None) -> Ticket:
+        """Queue one order stamped with the current time. Raises QueueFull.
+
+        A client-supplied `idempotency_key` becomes the ack id, so a client
+        retrying after a timeout can't have its order counted twice.
+        """
+        payload = {
+            'dish_id': dish_id,
+            'quantity': quantity,
+            'order_time': datetime.now().isoformat(),
+            'idempotency_key': idempotency_key or uuid.uuid4().hex,
+        }
+        ticket = Ticket(payload['idempotency_key'], payload)
+
+        with self._cond:
+            if self._closing:
+                raise QueueFull("write queue is shutting down")
+            if len(self._pending) >= self.max_depth:
+                raise QueueFull(f"write queue is full ({self.max_depth} orders)")
+            if self._wal:
+                self._append_wal(ticket)
+                self._wal.flush()
+                if self.wal_fsync:
+                    os.fsync(self._wal.fileno())
+            self._pending.append(ticket)
+            self._remember(ticket)
+            depth = len(self._pending)
+            self._stats['max_depth_seen'] = max(self._stats['max_depth_seen'], depth)
+            # Wake the writer when work appears (it then waits up to
+            # flush_interval_ms for the batch to fill) and when a batch is full.
+            if depth == 1 or depth >= self.max_batch:
+                self._cond.notify()
+        return ticket
+
+    def withdraw(self, ticket: Ticket) -> bool:
+        """Take a still-queued order back out. False if the writer already
+        picked it up, in which case it may yet commit."""
+        with self._cond:
+            try:
+                self._pending.remove(ticket)
+            except ValueError:
+                return False
+        ticket._finish('rejected', 'withdrawn before it was written')
+        return True
+
+    def status(self, ack_id: str) -> Optional[Dict]:
+        with self._cond:
+            ticket = self._acks.get(ack_id)
+        if ticket is None:
+            return None
+        return {'ack_id': ack_id, 'status': ticket.status, 'error': ticket.error}
+
+    def _remember(self, ticket: Ticket):
+        self._acks[ticket.ack_id] = ticket
+        while len(self._acks) > self._ack_max:
+            self._acks.popitem(last=False)
+
+    # ── WRITER ────────────────────────────────────────────────────────────────
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._pending and not self._closing:
+                    # Timed, so a missed wake-up delays a flush instead of stalling it.
+                    self._cond.wait(max(self.interval, 0.5))
+                if not self._pending and self._closing:
+                    return
+                # Give a burst a moment to accumulate unless a batch is already full.
+                if len(self._pending) < self.max_batch and not self._closing:
+                    self._cond.wait(self.interval)
+                batch = [self._pending.popleft()
+                         for _ in range(min(self.max_batch, len(self._pending)))]
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch, retry=None, settle: bool = True) -> bool:
+        """Write one batch. False if its transaction failed and `retry` (by
+        default the batch) was put back in front of the queue. `settle`
+        False leaves the WAL alone, for a caller still holding unwritten
+        orders of its own."""
+        try:
+            result = self.db.add_orders_bulk([t.payload for t in batch])
+        except Exception as e:
+            return self._isolate(batch, e, settle)
+        if result is None:
+            # Whole transaction failed (DB down, deadlock): put the batch back
+            # in front, in order, and retry after a pause.
+            with self._cond:
+                self._stats['failed_flushes'] += 1
+                self._pending.extendleft(reversed(retry or batch))
+            time.sleep(self.retry_delay)
+            return False
+
+        for ticket, row in zip(batch, result['results']):
+            if row['status'] == 'error':
+                ticket.out_of_stock = row.get('out_of_stock')
+                ticket._finish('rejected', row.get('error'))
+            else:
+                ticket._finish('committed')
+
+        with self._cond:
+            self._stats['batches'] += 1
+            self._stats['orders_written'] += result['created']
+            self._stats['duplicates'] += result['duplicates']
+            self._stats['rejected'] += result['failed']
+            self._stats['last_batch_size'] = len(batch)
+            if settle:
+                self._settle_wal(batch)
+        return True
+
+    def _isolate(self, batch, error: Exception, settle: bool = True) -> bool:
+        """add_orders_bulk raised instead of failing its transaction: a bug or
+        bad data (a recipe that won't parse, a malformed WAL payload) that
+        would fail the same batch again. Write its orders one at a time so
+        only an order that raises on its own is rejected, and the writer
+        thread carries on. The WAL is settled once the whole batch is done:
+        until then its unwritten orders exist only in memory and the WAL."""
+        print(f"Order batch of {len(batch)} failed: {error!r}")
+        with self._cond:
+            self._stats['failed_flushes'] += 1
+        if len(batch) > 1:
+            for i, ticket in enumerate(batch):
+                if not self._flush([ticket], retry=batch[i:], settle=False):
+                    return False
+        else:
+            batch[0]._finish('rejected', f"could not be written: {error}")
+            with self._cond:
+                self._stats['rejected'] += 1
+        if settle:
+            with self._cond:
+                self._settle_wal(batch)
+        return True
+
+    def _append_wal(self, ticket: Ticket):
+        line = json.dumps(ticket.payload) + '\n'
+        self._wal.write(line)
+        self._wal_size += len(line.encode('utf-8'))
+        ticket.wal_end = self._wal_size
+
+    def _settle_wal(self, batch):
+        """Record that `batch` is committed or rejected. Batches are taken
+        from the front of the queue, so every order before it in the WAL is
+        settled too. Empty the WAL once nothing is queued, and compact it when
+        the settled part is large. Called with self._cond held."""
+        if not self._wal:
+            return
+        if not self._pending:
+            self._wal.truncate(0)
+            self._wal.seek(0)
+            self._wal_size = self._wal_settled = 0
+            return
+        self._wal_settled = max(self._wal_settled, batch[-1].wal_end or 0)
+        if self._wal_settled >= self.wal_compact_bytes and self._wal_settled * 2 >= self._wal_size:
+            self._compact_wal()
+
+    def _compact_wal(self):
+        """Replace the WAL with a copy of its unsettled tail. The copy is
+        written, fsync'd (and locked) under a name outside the per-process
+        glob before it is renamed over the WAL, so a crash leaves either
+        file complete. Called with self._cond held."""
+        self._wal.flush()
+        with open(self.wal_path, 'rb') as f:
+            f.seek(self._wal_settled)
+            tail = f.read()
+        head, name = os.path.split(self.wal_path)
+        tmp_path = os.path.join(head, f".{name}.compact")
+        wal = open(tmp_path, 'w', encoding='utf-8')
+        if self.wal_per_process:
+            import fcntl
+            fcntl.flock(wal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        wal.write(tail.decode('utf-8'))
+        wal.flush()
+        os.fsync(wal.fileno())
+        os.replace(tmp_path, self.wal_path)
+        self._wal.close()
+        self._wal = wal
+
+        shift = self._wal_settled
+        for ticket in self._pending:
+            if ticket.wal_end is not None:
+                ticket.wal_end -= shift
+        self._wal_size -= shift
+        self._wal_settled = 0
+
+    def _replay_wal(self):
+        """Re-queue orders acknowledged before a crash. Already-committed ones
+        come back as duplicates via their idempotency keys."""
+        if not os.path.exists(self.wal_path):
+            return
+        offset = 0
+        with open(self.wal_path, encoding='utf-8') as f:
+            for line in f:
+                offset += len(line.encode('utf-8'))
+                try:
+                    payload = json.loads(line)
+                except ValueError:
+                    continue  # torn final line from a crash mid-write
+                ticket = Ticket(payload['idempotency_key'], payload)
+                ticket.wal_end = offset
+                self._pending.append(ticket)
+                self._remember(ticket)
+        if self._pending:
+            print(f"Replaying {len(self._pending)} order(s) from {self.wal_path}")
+
+    def _adopt_orphan_wals(self, base: str, fcntl):
+        """Move orders from dead workers' WAL files (and a single-process
+        `base` file) into this process's WAL and queue."""
+        for path in [base] + sorted(glob.glob(f"{glob.escape(base)}.*")):
+            if path == self.wal_path or not os.path.exists(path):
+                continue
+            try:
+                f = open(path, 'r+', encoding='utf-8')
+            except OSError:
+                continue
+            with f:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue  # owned by a live worker
+                if os.fstat(f.fileno()).st_nlink == 0:
+                    continue  # another worker adopted it first
+                adopted = 0
+                for line in f:
+                    try:
+                        payload = json.loads(line)
+                    except ValueError:
+                        continue
+                    ticket = Ticket(payload['idempotency_key'], payload)
+                    self._append_wal(ticket)
+                    self._pending.append(ticket)
+                    self._remember(ticket)
+                    adopted += 1
+                self._wal.flush()
+                os.fsync(self._wal.fileno())
+                os.unlink(path)
+            if adopted:
+                print(f"Adopted {adopted} order(s) from {path}")
+
+    # ── LIFECYCLE / METRICS ───────────────────────────────────────────────────
+
+    def close(self, timeout: float = 30.0) -> bool:
+        """Stop accepting orders and drain the queue. True if fully drained."""
+        if self.mode == 'sync':
+            return True
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._thread.join(timeout)
+        drained = not self._thread.is_alive()
+        if self._wal and drained:
+            self._wal.close()
+            if self.wal_per_process:
+                os.unlink(self.wal_path)  # empty once drained; don't leave one per pid
+        return drained
+
+    def depth(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {'mode': self.mode, 'depth': len(self._pending), **self._stats}
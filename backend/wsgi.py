@@ -0,0 +1,17 @@
+"""Production WSGI entry point.
+
+    python manage.py init-db                 # once per deploy
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every gunicorn worker imports this module after forking (preload_app is
+off), so each worker opens its own connection pool and starts its own
+background threads; no socket or thread is inherited across fork. Schema
+creation and backfill are left to manage.py rather than repeated by every
+worker on start.
+"""
+from config import SERVER_CONFIG
+
+SERVER_CONFIG['init_schema']  = False
+SERVER_CONFIG['multiprocess'] = True
+
+from app import app, db, shutdown  # noqa: E402,F401
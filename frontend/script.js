@@ -7,6 +7,23 @@ function formatMoney(value) {
 
 let dishesPieChart, peakHoursChart, ingredientsChart, hourlyTrendChart;
 
+// Last response per URL, revalidated with If-None-Match: while the data is
+// unchanged the server answers 304 without querying and we reuse our copy.
+const etagCache = new Map();
+
+async function fetchJSON(url) {
+    const cached = etagCache.get(url);
+    const response = await fetch(url, {
+        headers: cached ? { 'If-None-Match': cached.etag } : {}
+    });
+    if (response.status === 304 && cached) return cached.data;
+    if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+    const data = await response.json();
+    const etag = response.headers.get('ETag');
+    if (etag) etagCache.set(url, { etag, data });
+    return data;
+}
+
 // Tab Switching Function
 function openTab(event, tabId) {
     // Hide all tab content
@@ -66,8 +83,81 @@ document.addEventListener('DOMContentLoaded', () => {
     loadRecentOrders();
     loadInventoryData();
     
-    // Auto-refresh every 30 seconds
-    setInterval(() => {
+    // Live updates over SSE; falls back to 30 s polling if unavailable
+    startLiveUpdates();
+});
+
+// ── LIVE UPDATES ─────────────────────────────────────────────────────────────
+
+let liveSource = null;
+let pollTimer = null;
+let recentOrders = [];             // newest first, as shown in the table
+const dishesById = new Map();      // orders reference dishes by id
+const liveInventory = new Map();   // ingredient id -> row
+
+function startLiveUpdates() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    liveSource = new EventSource(`${API_BASE_URL}/stream`);
+
+    liveSource.addEventListener('open', stopPolling);
+    liveSource.addEventListener('error', () => {
+        // EventSource reconnects on its own; poll until it succeeds.
+        startPolling();
+    });
+
+    liveSource.addEventListener('snapshot', e => {
+        const data = JSON.parse(e.data);
+        applyLiveReport(data.report);
+        liveInventory.clear();
+        (data.inventory || []).forEach(ing => liveInventory.set(ing.id, ing));
+        renderInventory(sortedLiveInventory());
+        // The snapshot has no order list; fetch it once per (re)connect.
+        loadRecentOrders();
+    });
+
+    liveSource.addEventListener('report', e => applyLiveReport(JSON.parse(e.data)));
+
+    liveSource.addEventListener('inventory', e => {
+        const data = JSON.parse(e.data);
+        (data.changed || []).forEach(ing => liveInventory.set(ing.id, ing));
+        (data.removed || []).forEach(id => liveInventory.delete(id));
+        renderInventory(sortedLiveInventory());
+    });
+
+    liveSource.addEventListener('orders', e => {
+        const data = JSON.parse(e.data);
+        const incoming = (data.orders || []).slice().reverse();
+        recentOrders = incoming.concat(recentOrders).slice(0, 10);
+        renderRecentOrders(recentOrders);
+    });
+
+    // Orders taken by another server process: re-fetch the list
+    liveSource.addEventListener('orders_changed', loadRecentOrders);
+}
+
+function sortedLiveInventory() {
+    return Array.from(liveInventory.values()).sort((a, b) => a.name.localeCompare(b.name));
+}
+
+function applyLiveReport(report) {
+    if (!report) return;
+    renderQuickStats(report);
+
+    // Only redraw analytics when the tab is showing today's date
+    const dateInput = document.getElementById('analytics-date');
+    const today = new Date().toISOString().split('T')[0];
+    if (document.getElementById('analytics-tab')?.classList.contains('active')
+            && dateInput && dateInput.value === today) {
+        updateAnalyticsCharts({ today: report });
+    }
+}
+
+function startPolling() {
+    if (pollTimer) return;
+    pollTimer = setInterval(() => {
         if (document.getElementById('order-tab')?.classList.contains('active')) {
             loadRecentOrders();
         }
@@ -78,7 +168,14 @@ document.addEventListener('DOMContentLoaded', () => {
             loadAnalyticsByDate();
         }
     }, 30000);
-});
+}
+
+function stopPolling() {
+    if (pollTimer) {
+        clearInterval(pollTimer);
+        pollTimer = null;
+    }
+}
 
 function updateCurrentDate() {
     const now = new Date();
@@ -91,9 +188,10 @@ function updateCurrentDate() {
 
 async function loadDishes() {
     try {
-        const response = await fetch(`${API_BASE_URL}/dishes`);
-        if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-        const dishes = await response.json();
+        const dishes = await fetchJSON(`${API_BASE_URL}/dishes`);
+        dishesById.clear();
+        dishes.forEach(dish => dishesById.set(dish.id, dish));
+        renderRecentOrders(recentOrders);
         
         const select = document.getElementById('dish-select');
         if (!select) return;
@@ -138,9 +236,11 @@ async function addOrder() {
         
         if (response.ok) {
             alert('Order added successfully!');
-            loadTodayAnalytics();
-            loadRecentOrders();
-            loadInventoryData();
+            if (!liveSource || liveSource.readyState !== EventSource.OPEN) {
+                loadTodayAnalytics();
+                loadRecentOrders();
+                loadInventoryData();
+            }
             dishSelect.value = '';
             quantity.value = 1;
         } else {
@@ -155,70 +255,77 @@ async function addOrder() {
 
 async function loadRecentOrders() {
     try {
-        const response = await fetch(`${API_BASE_URL}/analytics/today`);
-        if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-        const data = await response.json();
-        
-        // Get orders from today's data
-        const orders = data.orders || [];
-        const tbody = document.getElementById('recent-orders-body');
-        if (tbody) {
-            tbody.innerHTML = '';
-            
-            if (orders.length === 0) {
-                const row = tbody.insertRow();
-                row.innerHTML = '<td colspan="4" style="text-align: center;">No orders today</td>';
-            } else {
-                orders.slice(0, 10).forEach(order => {
-                    const row = tbody.insertRow();
-                    let timeString = order.order_time;
-                    try {
-                        const orderTime = new Date(order.order_time);
-                        if (!isNaN(orderTime.getTime())) {
-                            timeString = orderTime.toLocaleTimeString();
-                        }
-                    } catch (e) {}
-                    
-                    row.innerHTML = `
-                        <td>${timeString}</td>
-                        <td>${order.dish_name}</td>
-                        <td>${order.quantity}</td>
-                        <td>${formatMoney(order.price * order.quantity)}</td>
-                    `;
-                });
-            }
-        }
-        
-        // Update quick stats
-        const quickSales = document.getElementById('quick-sales');
-        const quickOrders = document.getElementById('quick-orders');
-        const popularDish = document.getElementById('popular-dish');
-        
-        if (quickSales) quickSales.textContent = formatMoney(data.today.total_sales);
-        if (quickOrders) quickOrders.textContent = data.today.total_orders || 0;
+        const [page, data] = await Promise.all([
+            fetchJSON(`${API_BASE_URL}/orders?limit=10`),
+            fetchJSON(`${API_BASE_URL}/analytics/today?fields=today`),
+        ]);
         
-        // Find most popular dish
-        const dishes = data.today.dishes_sold || {};
-        let popular = '-';
-        let maxQty = 0;
-        for (const [dish, qty] of Object.entries(dishes)) {
-            if (qty > maxQty) {
-                maxQty = qty;
-                popular = dish;
-            }
-        }
-        if (popularDish) popularDish.textContent = popular;
+        recentOrders = page.orders || [];
+        renderRecentOrders(recentOrders);
+        renderQuickStats(data.today);
         
     } catch (error) {
         console.error('Error loading recent orders:', error);
     }
 }
 
+function renderRecentOrders(orders) {
+    const tbody = document.getElementById('recent-orders-body');
+    if (!tbody) return;
+    tbody.innerHTML = '';
+    
+    if (orders.length === 0) {
+        const row = tbody.insertRow();
+        row.innerHTML = '<td colspan="4" style="text-align: center;">No orders today</td>';
+        return;
+    }
+    orders.forEach(order => {
+        const row = tbody.insertRow();
+        let timeString = order.order_time;
+        try {
+            const orderTime = new Date(order.order_time);
+            if (!isNaN(orderTime.getTime())) {
+                timeString = orderTime.toLocaleTimeString();
+            }
+        } catch (e) {}
+        
+        const dish = dishesById.get(order.dish_id);
+        // Charged price, stored with the order; older rows may lack it.
+        const unitPrice = order.unit_price ?? (dish ? dish.price : null);
+        row.innerHTML = `
+            <td>${timeString}</td>
+            <td>${dish ? dish.name : `Dish #${order.dish_id}`}</td>
+            <td>${order.quantity}</td>
+            <td>${unitPrice != null ? formatMoney(unitPrice * order.quantity) : '-'}</td>
+        `;
+    });
+}
+
+function renderQuickStats(today) {
+    today = today || {};
+    const quickSales = document.getElementById('quick-sales');
+    const quickOrders = document.getElementById('quick-orders');
+    const popularDish = document.getElementById('popular-dish');
+    
+    if (quickSales) quickSales.textContent = formatMoney(today.total_sales);
+    if (quickOrders) quickOrders.textContent = today.total_orders || 0;
+    
+    // Find most popular dish
+    const dishes = today.dishes_sold || {};
+    let popular = '-';
+    let maxQty = 0;
+    for (const [dish, qty] of Object.entries(dishes)) {
+        if (qty > maxQty) {
+            maxQty = qty;
+            popular = dish;
+        }
+    }
+    if (popularDish) popularDish.textContent = popular;
+}
+
 async function loadTodayAnalytics() {
     try {
-        const response = await fetch(`${API_BASE_URL}/analytics/today`);
-        if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-        const data = await response.json();
+        const data = await fetchJSON(`${API_BASE_URL}/analytics/today?fields=today,yesterday`);
         
         if (document.getElementById('analytics-tab')?.classList.contains('active')) {
             updateAnalyticsCharts(data);
@@ -242,9 +349,7 @@ async function loadAnalyticsByDate() {
     if (!date) return;
     
     try {
-        const response = await fetch(`${API_BASE_URL}/analytics/date/${date}`);
-        if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-        const data = await response.json();
+        const data = await fetchJSON(`${API_BASE_URL}/analytics/date/${date}`);
         
         updateAnalyticsCharts({ today: data });
         
@@ -254,14 +359,9 @@ async function loadAnalyticsByDate() {
         const prevDateStr = prevDate.toISOString().split('T')[0];
         
         try {
-            const prevResponse = await fetch(`${API_BASE_URL}/analytics/date/${prevDateStr}`);
-            if (prevResponse.ok) {
-                const prevData = await prevResponse.json();
-                if (prevData && prevData.total_orders !== undefined) {
-                    updateComparison(data, prevData);
-                } else {
-                    clearComparisonUI();
-                }
+            const prevData = await fetchJSON(`${API_BASE_URL}/analytics/date/${prevDateStr}`);
+            if (prevData && prevData.total_orders !== undefined) {
+                updateComparison(data, prevData);
             } else {
                 clearComparisonUI();
             }
@@ -631,72 +731,75 @@ function updateHourlyTrendChart(peakHours) {
 
 async function loadInventoryData() {
     try {
-        const response = await fetch(`${API_BASE_URL}/ingredients`);
-        if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-        const ingredients = await response.json();
+        const ingredients = await fetchJSON(`${API_BASE_URL}/ingredients`);
         
-        // Update inventory list
-        const inventoryList = document.getElementById('inventory-list');
-        if (inventoryList) {
-            inventoryList.innerHTML = '';
-            
-            let lowStockCount = 0;
-            let totalValue = 0;
-            
-            ingredients.forEach(ing => {
-                const item = document.createElement('div');
-                item.className = 'inventory-item';
-                
-                if (ing.status === 'Low') lowStockCount++;
-                
-                // Estimate value (simplified)
-                totalValue += ing.stock_quantity * 2; // Assuming $2 per unit average
-                
-                item.innerHTML = `
-                    <span class="name">${ing.name}</span>
-                    <div class="stock">
-                        <span class="quantity">${ing.stock_quantity}</span>
-                        <span class="unit">${ing.unit}</span>
-                        <span class="status ${ing.status.toLowerCase()}">${ing.status}</span>
-                    </div>
-                `;
-                inventoryList.appendChild(item);
-            });
+        liveInventory.clear();
+        ingredients.forEach(ing => liveInventory.set(ing.id, ing));
+        renderInventory(ingredients);
+        
+    } catch (error) {
+        console.error('Error loading inventory:', error);
+    }
+}
+
+function renderInventory(ingredients) {
+    const inventoryList = document.getElementById('inventory-list');
+    if (inventoryList) {
+        inventoryList.innerHTML = '';
+        
+        let lowStockCount = 0;
+        let totalValue = 0;
+        
+        ingredients.forEach(ing => {
+            const item = document.createElement('div');
+            item.className = 'inventory-item';
             
-            // Update summary
-            const lowStockCountEl = document.getElementById('low-stock-count');
-            const totalIngredientsEl = document.getElementById('total-ingredients');
-            const inventoryValueEl = document.getElementById('inventory-value');
+            if (ing.status === 'Low') lowStockCount++;
             
-            if (lowStockCountEl) lowStockCountEl.textContent = lowStockCount;
-            if (totalIngredientsEl) totalIngredientsEl.textContent = ingredients.length;
-            if (inventoryValueEl) inventoryValueEl.textContent = formatMoney(totalValue);
+            // Estimate value (simplified)
+            totalValue += ing.stock_quantity * 2; // Assuming $2 per unit average
             
-            // Show low stock alerts
-            const alertsDiv = document.getElementById('low-stock-alerts');
-            if (alertsDiv) {
-                if (lowStockCount > 0) {
-                    alertsDiv.classList.add('show');
-                    alertsDiv.innerHTML = '<h4><i class="fas fa-exclamation-triangle"></i> Low Stock Alerts</h4>';
-                    ingredients.filter(ing => ing.status === 'Low').forEach(ing => {
-                        alertsDiv.innerHTML += `
-                            <div class="alert-item">
-                                <strong>${ing.name}</strong>: Only ${ing.stock_quantity} ${ing.unit} remaining
-                                (Reorder at ${ing.reorder_level} ${ing.unit})
-                            </div>
-                        `;
-                    });
-                } else {
-                    alertsDiv.classList.remove('show');
-                }
+            item.innerHTML = `
+                <span class="name">${ing.name}</span>
+                <div class="stock">
+                    <span class="quantity">${ing.stock_quantity}</span>
+                    <span class="unit">${ing.unit}</span>
+                    <span class="status ${ing.status.toLowerCase()}">${ing.status}</span>
+                </div>
+            `;
+            inventoryList.appendChild(item);
+        });
+        
+        // Update summary
+        const lowStockCountEl = document.getElementById('low-stock-count');
+        const totalIngredientsEl = document.getElementById('total-ingredients');
+        const inventoryValueEl = document.getElementById('inventory-value');
+        
+        if (lowStockCountEl) lowStockCountEl.textContent = lowStockCount;
+        if (totalIngredientsEl) totalIngredientsEl.textContent = ingredients.length;
+        if (inventoryValueEl) inventoryValueEl.textContent = formatMoney(totalValue);
+        
+        // Show low stock alerts
+        const alertsDiv = document.getElementById('low-stock-alerts');
+        if (alertsDiv) {
+            if (lowStockCount > 0) {
+                alertsDiv.classList.add('show');
+                alertsDiv.innerHTML = '<h4><i class="fas fa-exclamation-triangle"></i> Low Stock Alerts</h4>';
+                ingredients.filter(ing => ing.status === 'Low').forEach(ing => {
+                    alertsDiv.innerHTML += `
+                        <div class="alert-item">
+                            <strong>${ing.name}</strong>: Only ${ing.stock_quantity} ${ing.unit} remaining
+                            (Reorder at ${ing.reorder_level} ${ing.unit})
+                        </div>
+                    `;
+                });
+            } else {
+                alertsDiv.classList.remove('show');
             }
-            
-            // Update chart
-            updateIngredientsChart(ingredients);
         }
         
-    } catch (error) {
-        console.error('Error loading inventory:', error);
+        // Update chart
+        updateIngredientsChart(ingredients);
     }
 }
 
@@ -819,9 +922,7 @@ async function updateReportPreview() {
     if (!date) return;
     
     try {
-        const response = await fetch(`${API_BASE_URL}/analytics/date/${date}`);
-        if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-        const data = await response.json();
+        const data = await fetchJSON(`${API_BASE_URL}/analytics/date/${date}`);
         
         const preview = document.getElementById('report-preview');
         if (preview) {
@@ -876,14 +977,16 @@ async function downloadReportRange() {
         return;
     }
     
+    if (end < start) {
+        alert('End date must not be before start date');
+        return;
+    }
+    
     try {
-        // If it's a single day, download that day's report
         if (start === end) {
             window.location.href = `${API_BASE_URL}/reports/download/${start}`;
         } else {
-            // For now, just download the start date
-            window.location.href = `${API_BASE_URL}/reports/download/${start}`;
-            alert('Date range downloading coming soon. Downloading report for start date.');
+            window.location.href = `${API_BASE_URL}/reports/download?start=${start}&end=${end}`;
         }
     } catch (error) {
         console.error('Error downloading report:', error);
@@ -900,10 +1003,17 @@ async function quickDownload(type) {
         yesterday.setDate(yesterday.getDate() - 1);
         date = yesterday.toISOString().split('T')[0];
         window.location.href = `${API_BASE_URL}/reports/download/${date}`;
-    } else if (type === 'today') {
-        window.location.href = `${API_BASE_URL}/reports/download/${today}`;
+    } else if (type === 'week' || type === 'month') {
+        // This week starts on Monday; this month on the 1st.
+        const start = new Date();
+        if (type === 'week') {
+            start.setDate(start.getDate() - ((start.getDay() + 6) % 7));
+        } else {
+            start.setDate(1);
+        }
+        const startStr = start.toISOString().split('T')[0];
+        window.location.href = `${API_BASE_URL}/reports/download?start=${startStr}&end=${today}`;
     } else {
-        alert(`${type} report feature coming soon! Downloading today's report for now.`);
         window.location.href = `${API_BASE_URL}/reports/download/${today}`;
     }
 }